@@ -0,0 +1,189 @@
+# status-transition analytics on BAJiraHelper frames: time in status, lead and cycle time, throughput.
+# Every metric is computed over whole columns (one timestamp parse, one sort, grouped sums), never
+# row by row, so a million transitions take seconds
+
+import numpy as np
+import pandas as pd
+
+# columns of the issue history DF, as built by BAJiraHelper
+G_HistoryColumns = ["Key", "Author", "DateTime", "FromStatus", "ToStatus"]
+
+# issue DF columns carried into every result, so teams and projects can be compared side by side
+G_IssueColumns = ["Key", "ProjectName", "Team"]
+
+G_Day = np.timedelta64(1, "D")
+
+class BAJiraAnalytics():
+    def __init__(self,pConfig,pLogger):
+        self.aConfig = pConfig
+        self.aLogger = pLogger
+        self.aLogger.debug("BAJiraAnalytics.init")
+        # an issue has started once it moves to a status outside Jira.TodoStatuses, and is resolved
+        # when it last moved into one of Jira.DoneStatuses and is still there
+        self.lTodo = self.aConfig.getParmDefault("Jira.TodoStatuses", ["To Do"])
+        self.lDone = self.aConfig.getParmDefault("Jira.DoneStatuses", ["Done"])
+        # pandas period alias throughput is counted per ("D", "W", "M", ...)
+        self.sPeriod = self.aConfig.getParmDefault("Jira.ThroughputPeriod", "W")
+
+    # Jira timestamps ("2025-01-31T09:30:00.000+0000") as naive UTC datetime64 in one pass; missing
+    # or 'unknown' values become NaT. Naive, because numpy hands tz-aware values out as objects
+    def parseTimes(self,pValues):
+        oTimes = pd.to_datetime(pd.Series(pValues, dtype=object), utc=True, format="ISO8601", errors="coerce")
+        return oTimes.dt.tz_convert(None).to_numpy(dtype="datetime64[ns]")
+
+    # the issue DF (one row per key, Created parsed) and its status transitions as arrays sorted by
+    # issue, then time. Keys are factorized once, issue keys first, so a transition's code is the row
+    # of its issue; transitions of issues missing from the issue DF are dropped, since their creation
+    # date and team are unknown
+    def prepare(self,pDFIssues,pDFHistory):
+        lColumns = G_IssueColumns + ["Status", "Created"]
+        if len(pDFIssues):
+            dfIssues = pDFIssues.drop_duplicates("Key", keep="last")[lColumns].reset_index(drop=True)
+        else:
+            dfIssues = pd.DataFrame({sColumn: pd.Series(dtype=object) for sColumn in lColumns})
+        aCreated = self.parseTimes(dfIssues["Created"])
+        if not len(pDFHistory):
+            pDFHistory = pd.DataFrame({sColumn: pd.Series(dtype=object) for sColumn in G_HistoryColumns})
+
+        iIssues = len(dfIssues)
+        aCodes, _ = pd.factorize(np.concatenate((dfIssues["Key"].to_numpy(dtype=object),
+                                                 pDFHistory["Key"].to_numpy(dtype=object))))
+        aIssue = aCodes[iIssues:]
+        aTimes = self.parseTimes(pDFHistory["DateTime"])
+        # one stable sort by issue, then time, so transitions stamped alike keep their changelog order
+        aOrder = np.lexsort((aTimes, aIssue))
+        aOrder = aOrder[aIssue[aOrder] < iIssues]
+        dTransitions = {"Issue": aIssue[aOrder], "DateTime": aTimes[aOrder],
+                        "FromStatus": pDFHistory["FromStatus"].to_numpy(dtype=object)[aOrder],
+                        "ToStatus": pDFHistory["ToStatus"].to_numpy(dtype=object)[aOrder]}
+        return dfIssues, aCreated, dTransitions
+
+    # per issue, the days spent in each status: one column per status, todo statuses first and done
+    # statuses last. Stays still open (the current status) run until pAsOf, default now
+    def getTimeInStatusDF(self,pDFIssues,pDFHistory,pAsOf=None):
+        self.aLogger.info("getTimeInStatusDF.Start")
+        dfIssues, aCreated, dTransitions = self.prepare(pDFIssues, pDFHistory)
+        dfDays = self.buildTimeInStatus(dfIssues, aCreated, dTransitions, pAsOf)
+        self.aLogger.info("getTimeInStatusDF.End.OK")
+        return pd.concat([dfIssues[G_IssueColumns], dfDays], axis=1)
+
+    # getCycleTimeDF and getTimeInStatusDF in one frame, one row per issue, parsing and sorting once
+    def getIssueMetricsDF(self,pDFIssues,pDFHistory,pAsOf=None):
+        self.aLogger.info("getIssueMetricsDF.Start")
+        dfIssues, aCreated, dTransitions = self.prepare(pDFIssues, pDFHistory)
+        dfCycle = self.buildCycleTime(dfIssues, aCreated, dTransitions)
+        dfDays = self.buildTimeInStatus(dfIssues, aCreated, dTransitions, pAsOf)
+        self.aLogger.info("getIssueMetricsDF.End.OK")
+        return pd.concat([dfCycle, dfDays], axis=1)
+
+    # the days columns of getTimeInStatusDF, in the row order of pDFIssues
+    def buildTimeInStatus(self,pDFIssues,pCreated,pTransitions,pAsOf):
+        oAsOf = pd.Timestamp.now(tz="UTC") if pAsOf is None else pd.Timestamp(pAsOf)
+        if oAsOf.tzinfo is not None:
+            oAsOf = oAsOf.tz_convert(None)
+        aIssue, aStatuses, aDays = self.getStays(pDFIssues, pCreated, pTransitions, oAsOf.to_datetime64())
+
+        # days summed per (issue, status) with one bincount over the flattened issue x status grid
+        aCodes, aNames = pd.factorize(aStatuses)
+        iStatuses = len(aNames)
+        # stays in a status without a name (factorized to -1) are left out
+        bNamed = aCodes >= 0
+        aGrid = np.bincount(aIssue[bNamed] * iStatuses + aCodes[bNamed], weights=aDays[bNamed],
+                            minlength=len(pDFIssues) * iStatuses).reshape(len(pDFIssues), iStatuses)
+        return pd.DataFrame(aGrid, columns=list(aNames))[self.orderStatuses(aNames)]
+
+    # every stay of every issue in one status, as arrays of issue row, status and days. A transition
+    # ends the stay in its FromStatus begun at the previous transition, or at creation for the first
+    # one; the stay in the last ToStatus (or, without any transition, the current status) is open
+    # until pAsOf. Stays with an unknown start are left out
+    def getStays(self,pDFIssues,pCreated,pTransitions,pAsOf):
+        aIssue = pTransitions["Issue"]
+        aTimes = pTransitions["DateTime"]
+        bFirst = np.ones(len(aIssue), dtype=bool)
+        bFirst[1:] = aIssue[1:] != aIssue[:-1]
+        bLast = np.ones(len(aIssue), dtype=bool)
+        bLast[:-1] = bFirst[1:]
+        bUntouched = np.ones(len(pDFIssues), dtype=bool)
+        bUntouched[aIssue] = False
+        aUntouched = np.flatnonzero(bUntouched)
+
+        aStarts = np.empty_like(aTimes)
+        aStarts[1:] = aTimes[:-1]
+        aStarts[bFirst] = pCreated[aIssue[bFirst]]
+        aStarts = np.concatenate((aStarts, aTimes[bLast], pCreated[aUntouched]))
+        aEnds = np.concatenate((aTimes, np.full(len(aStarts) - len(aTimes), pAsOf, dtype="datetime64[ns]")))
+        aIssues = np.concatenate((aIssue, aIssue[bLast], aUntouched))
+        aStatuses = np.concatenate((pTransitions["FromStatus"], pTransitions["ToStatus"][bLast],
+                                    pDFIssues["Status"].to_numpy(dtype=object)[aUntouched]))
+        aDays = np.maximum((aEnds - aStarts) / G_Day, 0.0)
+        bKnown = ~np.isnan(aDays)
+        return aIssues[bKnown], aStatuses[bKnown], aDays[bKnown]
+
+    # statuses in a fixed order whatever the data: todo statuses, the rest by name, done statuses
+    def orderStatuses(self,pStatuses):
+        lStatuses = list(pStatuses)
+        lFirst = [sStatus for sStatus in self.lTodo if sStatus in lStatuses]
+        lLast = [sStatus for sStatus in self.lDone if sStatus in lStatuses]
+        lMiddle = sorted(sStatus for sStatus in lStatuses if sStatus not in lFirst and sStatus not in lLast)
+        return lFirst + lMiddle + lLast
+
+    # per issue: Created, Started (first move out of the todo statuses), Resolved (last move into a
+    # done status, if the issue is still done), all UTC, LeadTimeDays (created to resolved) and
+    # CycleTimeDays (started to resolved)
+    def getCycleTimeDF(self,pDFIssues,pDFHistory):
+        self.aLogger.info("getCycleTimeDF.Start")
+        dfCycle = self.buildCycleTime(*self.prepare(pDFIssues, pDFHistory))
+        self.aLogger.info("getCycleTimeDF.End.OK")
+        return dfCycle
+
+    def buildCycleTime(self,pDFIssues,pCreated,pTransitions):
+        iIssues = len(pDFIssues)
+        aStarted = self.firstTransition(iIssues, pTransitions, ~np.isin(pTransitions["ToStatus"], self.lTodo))
+        aResolved = self.firstTransition(iIssues, pTransitions, np.isin(pTransitions["ToStatus"], self.lDone), True)
+        # an issue reopened since it was done is not resolved
+        aResolved[~pDFIssues["Status"].isin(self.lDone).to_numpy()] = np.datetime64("NaT")
+
+        dfCycle = pDFIssues[G_IssueColumns + ["Status"]].copy()
+        for sColumn, aTimes in (("Created", pCreated), ("Started", aStarted), ("Resolved", aResolved)):
+            dfCycle[sColumn] = pd.to_datetime(aTimes, utc=True)
+        dfCycle["LeadTimeDays"] = (aResolved - pCreated) / G_Day
+        dfCycle["CycleTimeDays"] = (aResolved - aStarted) / G_Day
+        return dfCycle
+
+    # per issue row, the time of its first transition matching pMask (the last with pLatest), or NaT.
+    # Transitions are sorted by issue, then time, so np.unique's first index per issue is the
+    # earliest match, and on the reversed arrays the latest
+    def firstTransition(self,pIssues,pTransitions,pMask,pLatest=False):
+        aIssue = pTransitions["Issue"][pMask]
+        aTimes = pTransitions["DateTime"][pMask]
+        if pLatest:
+            aIssue, aTimes = aIssue[::-1], aTimes[::-1]
+        aFound, aFirst = np.unique(aIssue, return_index=True)
+        aResult = np.full(pIssues, np.datetime64("NaT"), dtype="datetime64[ns]")
+        aResult[aFound] = aTimes[aFirst]
+        return aResult
+
+    # issues resolved per project, team and period (pPeriod, default Jira.ThroughputPeriod) from
+    # getCycleTimeDF's (or getIssueMetricsDF's) output, with their mean and median lead and cycle times. Every period between
+    # the first and last resolution is listed for every team, so periods without any are 0
+    def getThroughputDF(self,pDFCycle,pPeriod=None):
+        sPeriod = pPeriod or self.sPeriod
+        lGroups = ["ProjectName", "Team"]
+        dfDone = pDFCycle[pDFCycle["Resolved"].notna()]
+        if not len(dfDone):
+            return pd.DataFrame(columns=lGroups + ["Period", "Resolved", "MeanLeadTimeDays", "MedianLeadTimeDays",
+                                                   "MeanCycleTimeDays", "MedianCycleTimeDays"])
+        # periods are counted in UTC
+        srPeriod = dfDone["Resolved"].dt.tz_convert(None).dt.to_period(sPeriod).rename("Period")
+        dfThroughput = dfDone.groupby(lGroups + [srPeriod], sort=True).agg(
+            Resolved=("Key", "size"),
+            MeanLeadTimeDays=("LeadTimeDays", "mean"), MedianLeadTimeDays=("LeadTimeDays", "median"),
+            MeanCycleTimeDays=("CycleTimeDays", "mean"), MedianCycleTimeDays=("CycleTimeDays", "median"))
+
+        aPeriods = pd.period_range(srPeriod.min(), srPeriod.max(), freq=srPeriod.dt.freq)
+        lTeams = dfThroughput.index.droplevel("Period").unique()
+        oIndex = pd.MultiIndex.from_tuples([tTeam + (oPeriod,) for tTeam in lTeams for oPeriod in aPeriods],
+                                           names=lGroups + ["Period"])
+        dfThroughput = dfThroughput.reindex(oIndex)
+        dfThroughput["Resolved"] = dfThroughput["Resolved"].fillna(0).astype("int64")
+        return dfThroughput.reset_index()
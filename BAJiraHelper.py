@@ -3,10 +3,17 @@
 
 import requests
 from requests.auth import HTTPBasicAuth
+from requests.adapters import HTTPAdapter
+import os
 import json
+import time
+import itertools
+import collections
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-# decided to use JIRA lib for issue history ...
-from jira import JIRA
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 G_Fields = [
     {"Field":"ProjectName",  "Path":["fields","project","name"]},
@@ -27,6 +34,71 @@ G_Fields = [
     {"Field":"DueDate",      "Path":["fields","duedate"]},
     {"Field":"WatcherURL",   "Path":["fields","watches","self"]}
 ]
+
+# turns a G_Fields path into a function reading that value from an issue dict ('unknown' when missing)
+def compileExtractor(pPath):
+    lSteps = []
+    for sPart in pPath:
+        if '[0]' in sPart:
+            lSteps.append(sPart.replace("[0]", ""))
+            lSteps.append(0)
+        else:
+            lSteps.append(sPart)
+
+    def extract(dIssue):
+        oValue = dIssue
+        try:
+            for oStep in lSteps:
+                oValue = oValue[oStep]
+        except (KeyError, IndexError, TypeError):
+            return 'unknown'
+        return oValue
+    return extract, lSteps
+
+# turns a G_Fields path into a function reading that value from every issue in a list.
+# The common case is one comprehension with the lookups unrolled; only a list with a missing
+# value somewhere falls back to the per-issue extractor
+def compileColumnExtractor(pPath):
+    fExtract, lSteps = compileExtractor(pPath)
+    if len(lSteps) == 1:
+        sA, = lSteps
+        def fastPath(pIssues):
+            return [dIssue[sA] for dIssue in pIssues]
+    elif len(lSteps) == 2:
+        sA, sB = lSteps
+        def fastPath(pIssues):
+            return [dIssue[sA][sB] for dIssue in pIssues]
+    elif len(lSteps) == 3:
+        sA, sB, sC = lSteps
+        def fastPath(pIssues):
+            return [dIssue[sA][sB][sC] for dIssue in pIssues]
+    elif len(lSteps) == 4:
+        sA, sB, sC, sD = lSteps
+        def fastPath(pIssues):
+            return [dIssue[sA][sB][sC][sD] for dIssue in pIssues]
+    else:
+        def fastPath(pIssues):
+            return [fExtract(dIssue) for dIssue in pIssues]
+
+    def extractColumn(pIssues):
+        try:
+            return fastPath(pIssues)
+        except (KeyError, IndexError, TypeError):
+            return [fExtract(dIssue) for dIssue in pIssues]
+    return extractColumn
+
+# the Jira fields G_Fields reads, sent as fields= so the server returns nothing else
+G_FieldList = ",".join(dict.fromkeys(dField["Path"][1].replace("[0]", "") for dField in G_Fields
+                                     if dField["Path"][0] == "fields"))
+
+# read alongside G_Fields by the incremental sync to move its high-water mark
+G_UpdatedExtractor = compileColumnExtractor(["fields","updated"])
+
+# columns of the issue history DF
+G_HistoryColumns = ["Key", "Author", "DateTime", "FromStatus", "ToStatus"]
+
+# compiled once at import: field name -> column extractor
+G_Extractors = {dField["Field"]: compileColumnExtractor(dField["Path"]) for dField in G_Fields}
 class BAJiraHelper():
     def __init__(self,pConfig,pLogger):
         self.aConfig = pConfig
@@ -38,115 +110,421 @@ class BAJiraHelper():
         self.aFilter = "project=" + self.aConfig.getParm("Jira.Project") + " and created>=<CreatedDate>"
 
         self.aTeam = self.aConfig.getParm("Jira.Team")
+        # parallel requests, and how often / how patiently a throttled or failed request is retried
+        self.iThreads = self.aConfig.getParmDefault("Jira.Threads", 8)
+        self.iRetries = self.aConfig.getParmDefault("Jira.Retries", 5)
+        self.fBackoff = self.aConfig.getParmDefault("Jira.Backoff", 0.5)
+        self.fTimeout = self.aConfig.getParmDefault("Jira.Timeout", 30)
+        # "offset" pages /rest/api/2/search with startAt in parallel; "token" pulls /rest/api/3/search/jql
+        # with nextPageToken, one consistent result for the whole pull
+        self.sPagination = self.aConfig.getParmDefault("Jira.Pagination", "offset")
+        self.aSession = None
+        self.aSessionLock = threading.Lock()
+
+    # one pooled session for every request, so connections (and TLS) are reused across pages and threads
+    def getSession(self):
+        with self.aSessionLock:
+            if self.aSession is None:
+                oSession = requests.Session()
+                oSession.auth = HTTPBasicAuth(self.aUser, self.aToken)
+                oSession.headers.update({"Accept": "application/json"})
+                oAdapter = HTTPAdapter(pool_connections=self.iThreads, pool_maxsize=self.iThreads)
+                oSession.mount("http://", oAdapter)
+                oSession.mount("https://", oAdapter)
+                self.aSession = oSession
+        return self.aSession
+
+    # GET with retries: 429 waits for Retry-After, 5xx, timeouts and connection errors back off exponentially
+    def getWithRetry(self,pURL,pParams=None):
+        oSession = self.getSession()
+        for iAttempt in range(self.iRetries + 1):
+            fWait = self.fBackoff * (2 ** iAttempt)
+            try:
+                response = oSession.get(pURL, params=pParams, timeout=self.fTimeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if iAttempt == self.iRetries:
+                    raise
+                self.aLogger.warning("request failed, retrying in " + str(fWait) + "s: " + pURL)
+                time.sleep(fWait)
+                continue
+            if response.status_code != 429 and response.status_code < 500:
+                response.raise_for_status()
+                return response
+            if iAttempt == self.iRetries:
+                response.raise_for_status()
+            sRetryAfter = response.headers.get("Retry-After")
+            if response.status_code == 429 and sRetryAfter and sRetryAfter.isdigit():
+                fWait = max(fWait, float(sRetryAfter))
+            self.aLogger.warning("got " + str(response.status_code) + ", retrying in " + str(fWait) + "s: " + pURL)
+            time.sleep(fWait)
+
+    def getSearchPage(self,pURL,pFilter,pStart,pChunk,pExtra=None):
+        self.aLogger.debug("starting with record: " + str(pStart))
+        dQuery = {'jql': pFilter, "startAt": pStart, "maxResults": pChunk}
+        if pExtra:
+            dQuery.update(pExtra)
+        return json.loads(self.getWithRetry(pURL, dQuery).content)
+
+    # runs a search over every page: the first page tells us the total (and the page size the server
+    # really uses), the rest are fetched in parallel. pNarrow turns each page's issues into columns as
+    # soon as it arrives, so only one page of full issue dicts per thread is alive at a time.
+    # Returns the narrowed pages in page order
+    def searchAllPages(self,pFilter,pChunk,pNarrow,pExtra=None):
+        return list(self.iterSearchPages(pFilter, pChunk, pNarrow, pExtra))
+
+    # searchAllPages as a generator: yields each narrowed page in page order as soon as it and the pages
+    # before it are in. At most two pages per thread are fetched ahead of the consumer, so memory stays
+    # bounded by the lookahead however many pages the search has
+    def iterSearchPages(self,pFilter,pChunk,pNarrow,pExtra=None):
+        if self.sPagination == "token":
+            yield from self.iterTokenPages(pFilter, pChunk, pNarrow, pExtra)
+            return
+        sURL = self.aConfig.getParm("Jira.URL")
+        self.aLogger.debug(sURL + ":" + pFilter)
+        dFirst = self.getSearchPage(sURL, pFilter, 0, pChunk, pExtra)
+        iTotal = dFirst["total"]
+        iChunk = min(pChunk, dFirst.get("maxResults", pChunk)) or pChunk
+        rStarts = range(iChunk, iTotal, iChunk)
+        self.aLogger.debug("Total is: " + str(iTotal) + ", fetching " + str(len(rStarts)) + " more pages")
+        itStarts = iter(rStarts)
+
+        def fetch(iStart):
+            return pNarrow(self.getSearchPage(sURL, pFilter, iStart, iChunk, pExtra)["issues"])
+        with ThreadPoolExecutor(max_workers=self.iThreads) as oPool:
+            dqPending = collections.deque(oPool.submit(fetch, iStart)
+                                          for iStart in itertools.islice(itStarts, 2 * self.iThreads))
+            try:
+                yield pNarrow(dFirst["issues"])
+                dFirst = None
+                while dqPending:
+                    oPage = dqPending.popleft().result()
+                    for iStart in itertools.islice(itStarts, 1):
+                        dqPending.append(oPool.submit(fetch, iStart))
+                    yield oPage
+            finally:
+                # a consumer that stops early leaves nothing queued behind it
+                for oFuture in dqPending:
+                    oFuture.cancel()
+
+    def getTokenPage(self,pURL,pFilter,pToken,pChunk,pExtra=None):
+        dQuery = {'jql': pFilter, "maxResults": pChunk}
+        if pToken:
+            dQuery["nextPageToken"] = pToken
+        if pExtra:
+            dQuery.update(pExtra)
+        return json.loads(self.getWithRetry(pURL, dQuery).content)
+
+    # iterSearchPages over nextPageToken: each page names the next, so pages come one at a time, but the
+    # next one is requested before the current one is narrowed and handed on. The server pins the result
+    # at the first page, so issues changing mid-pull are neither skipped nor repeated
+    def iterTokenPages(self,pFilter,pChunk,pNarrow,pExtra=None):
+        sURL = self.aConfig.getParmDefault("Jira.TokenURL", self.aServer + "/rest/api/3/search/jql")
+        self.aLogger.debug(sURL + ":" + pFilter)
+        with ThreadPoolExecutor(max_workers=1) as oPool:
+            oNext = oPool.submit(self.getTokenPage, sURL, pFilter, None, pChunk, pExtra)
+            iPages = 0
+            while oNext is not None:
+                dPage = oNext.result()
+                sToken = dPage.get("nextPageToken")
+                oNext = None
+                if sToken and not dPage.get("isLast", False):
+                    oNext = oPool.submit(self.getTokenPage, sURL, pFilter, sToken, pChunk, pExtra)
+                iPages = iPages + 1
+                self.aLogger.debug("token page " + str(iPages) + ": " + str(len(dPage["issues"])) + " issues")
+                yield pNarrow(dPage["issues"])
 
     def getIssuesCreatedAfterDF(self,pStartDate):
         self.aLogger.info("getIssues.Start")
         sFilter = self.aFilter.replace("<CreatedDate>",pStartDate)
 
-        auth = HTTPBasicAuth(self.aUser, self.aToken)
-        dHeaders = {"Accept": "application/json"}
-        iStart = 0
         iChunk = self.aConfig.getParmDefault("Jira.Chunk", 100)
-        iTotal = 10
-        lFinal = []
-        sURL = self.aConfig.getParm("Jira.URL")
-        self.aLogger.debug(sURL + ":" + self.aFilter)
-        while iStart <= iTotal:
-            self.aLogger.debug("starting with record: " + str(iStart))
-            dQuery = {'jql': sFilter, "startAt": iStart, "maxResults": iChunk}
-            response = requests.request("GET", sURL, headers=dHeaders, auth=auth, params=dQuery)
-            # self.aLogger.info("response:"+response)
-            print(f"response:{response}")
-            iTotal = json.loads(response.text)["total"]
-            lIssues = json.loads(response.text)["issues"]
-            lFinal = lFinal + lIssues
-            self.aLogger.debug("Total is: " + str(iTotal) + ", running total is: " + str(len(lFinal)))
-            iStart = iStart + iChunk
-
-        return self.buildIssuesDFFromList(lFinal)
-
-     # builds a filtered and narrowed DF from a list of issues
+        lPages = self.searchAllPages(sFilter, iChunk, self.getIssueColumns, {"fields": G_FieldList})
+        self.aLogger.debug("running total is: " + str(sum(len(d["Key"]) for d in lPages)))
+
+        return self.buildIssuesDFFromColumns(lPages)
+
+    # getIssuesCreatedAfterDF one search page at a time: yields a DF of our team's issues per page (pages
+    # without any are skipped), so a pull of any size only holds the pages being fetched and consumed
+    def iterIssuesCreatedAfterDF(self,pStartDate):
+        sFilter = self.aFilter.replace("<CreatedDate>",pStartDate)
+        iChunk = self.aConfig.getParmDefault("Jira.Chunk", 100)
+        for dPage in self.iterSearchPages(sFilter, iChunk, self.getIssueColumns, {"fields": G_FieldList}):
+            if dPage["Key"]:
+                yield self.buildIssuesDFFromColumns([dPage])
+
+    # builds a filtered and narrowed DF from a list of issues
     def buildIssuesDFFromList(self,pIssues):
-        lIssues = []
-        for dIssue in pIssues:
-            dNewIssue = {}
-            for dField in G_Fields:
-                sField = dField["Field"]
-                lPath = dField["Path"]
-                try:
-                    oValue = dIssue[lPath[0]]
-                    for sPart in lPath[1:]:
-                        if '[0]' in sPart:
-                            oValue = oValue[sPart.replace("[0]", "")][0]
-                        else:
-                            oValue = oValue[sPart]
-                except:
-                    oValue = 'unknown'
-                dNewIssue[sField] = oValue
-            if dNewIssue["Team"] == self.aTeam:
-                lIssues.append(dNewIssue)
-        return pd.DataFrame(lIssues)
+        return self.buildIssuesDFFromColumns([self.getIssueColumns(pIssues)])
+
+    # narrows one page of issues to G_Fields columns, keeping only our team's issues
+    def getIssueColumns(self,pIssues):
+        return self.extractIssueColumns(self.filterTeam(pIssues))
+
+    def extractIssueColumns(self,pIssues):
+        return {sField: fExtractColumn(pIssues) for sField, fExtractColumn in G_Extractors.items()}
+
+    # aFilter for issues created since pStartDate, narrowed to our team so the server leaves out the rest.
+    # The team is a JQL string, where quotes and backslashes are escaped with a backslash
+    def getTeamFilter(self,pStartDate):
+        sTeam = self.aTeam.replace("\\", "\\\\").replace('"', '\\"')
+        return self.aFilter.replace("<CreatedDate>", pStartDate) + ' and cf[10001] = "' + sTeam + '"'
+
+    def filterTeam(self,pIssues):
+        lTeams = G_Extractors["Team"](pIssues)
+        if any(sTeam != self.aTeam for sTeam in lTeams):
+            pIssues = [dIssue for dIssue, sTeam in zip(pIssues, lTeams) if sTeam == self.aTeam]
+        return pIssues
+
+    # joins per-page columns into one DF without building a dict per row
+    def buildIssuesDFFromColumns(self,pPages):
+        dColumns = {sField: list(itertools.chain.from_iterable(dPage[sField] for dPage in pPages))
+                    for sField in G_Extractors}
+        if not dColumns["Key"]:
+            return pd.DataFrame()
+        return pd.DataFrame(dColumns)
 
     # get watchers for a list of issues found in DF
     def getWatchersDF(self,pDFIssues):
         self.aLogger.info("createWatchersDF.Start")
-        lAllWatchers = []
-        auth = HTTPBasicAuth(self.aConfig.getParm("Jira.User"), self.aConfig.getParm("Jira.Token"))
-        dHeaders = {"Accept": "application/json"}
-        for index, dIssue in pDFIssues.iterrows():
-            self.aLogger.debug("Requesting: " + str(dIssue["WatcherURL"]))
-            response = requests.request("GET", dIssue["WatcherURL"], headers=dHeaders, auth=auth)
-            lWatchers = json.loads(response.text)["watchers"]
-            for dWatcher in lWatchers:
-                dNewWatcher = {}
-                dNewWatcher["Issue key"] = dIssue["Key"]
-                dNewWatcher["Watchers"] = dWatcher["displayName"]
-                lAllWatchers.append(dNewWatcher)
-
+        dfWatchers = self.buildWatchersDF(pDFIssues)
         self.aLogger.info("createWatchersDF.End.OK")
-        return pd.DataFrame(lAllWatchers)
+        return dfWatchers
+
+    # getWatchersDF for a stream of issue DFs, e.g. from iterIssuesCreatedAfterDF: yields the watchers of
+    # each issue DF that has any
+    def iterWatchersDF(self,pIssueFrames):
+        for dfIssues in pIssueFrames:
+            dfWatchers = self.buildWatchersDF(dfIssues)
+            if len(dfWatchers):
+                yield dfWatchers
+
+    def buildWatchersDF(self,pDFIssues):
+        lKeys = pDFIssues["Key"].tolist() if len(pDFIssues) else []
+        lURLs = pDFIssues["WatcherURL"].tolist() if len(pDFIssues) else []
+
+        # Jira.Threads requests in flight over the shared session; map keeps issue order
+        def getWatcherNames(sURL):
+            self.aLogger.debug("Requesting: " + str(sURL))
+            return [dWatcher["displayName"] for dWatcher in self.getWithRetry(sURL).json()["watchers"]]
+        with ThreadPoolExecutor(max_workers=self.iThreads) as oPool:
+            lNames = list(oPool.map(getWatcherNames, lURLs))
+
+        lIssueKeys = [sKey for sKey, lWatchers in zip(lKeys, lNames) for _ in lWatchers]
+        lWatchers = list(itertools.chain.from_iterable(lNames))
+        if not lWatchers:
+            return pd.DataFrame()
+        return pd.DataFrame({"Issue key": lIssueKeys, "Watchers": lWatchers})
 
-    # this needs to loop ... to get more than 100 issues
+    # status transitions of our team's issues, read from the raw changelog JSON
     def getAllIssueHistoryDF(self,pStartDate):
         self.aLogger.info("getAllIssueHistoryDF.Start.OK")
-        sFilter = self.aFilter.replace("<CreatedDate>", pStartDate)
-        lAllChanges = []
-        lChanges = []
-
-        jira = JIRA(basic_auth=(self.aUser,self.aToken),options={'server': self.aServer})
-        iStart = 0
-        iChunk = 100
-        iSize = 200
-
-        while iSize >= iChunk:
-            self.aLogger.info("getNextChunkOfHistory")
-            issues = jira.search_issues(sFilter,maxResults=iChunk,startAt=iStart,expand='changelog')
-            for oIssue in issues:
-                # only need history for issues where Team = Toasted Snow
-                if oIssue.fields.customfield_10001 != None:
-                    if oIssue.fields.customfield_10001.name == self.aTeam:
-                        lChanges = self.getIssueHistory(oIssue)
-                        for o in lChanges:
-                            lAllChanges.append(o)
-            iSize = len(issues)
-            iStart  = iStart + iChunk
-
-        # convert final list to DF and return
-        dfIssueHistory = pd.DataFrame(lAllChanges)
+        lPages = list(self.iterHistoryPages(pStartDate))
+
+        # convert final columns to DF and return
+        dfIssueHistory = self.buildHistoryDFFromColumns(lPages)
         self.aLogger.info("getAllIssueHistoryDF.End.OK")
         return dfIssueHistory
 
+    # getAllIssueHistoryDF one search page at a time: yields a DF per page with any status transitions
+    def iterAllIssueHistoryDF(self,pStartDate):
+        for dPage in self.iterHistoryPages(pStartDate):
+            if dPage["Key"]:
+                yield self.buildHistoryDFFromColumns([dPage])
+
+    # history columns per search page of our team's issues created since pStartDate
+    def iterHistoryPages(self,pStartDate):
+        # only need history for issues where Team = Toasted Snow; let the server do that filtering
+        sFilter = self.getTeamFilter(pStartDate)
+        iChunk = self.aConfig.getParmDefault("Jira.HistoryChunk", 100)
+        # the changelog is all we read, so ask for as little else as possible
+        return self.iterSearchPages(sFilter, iChunk, self.getHistoryColumns,
+                                    {"expand": "changelog", "fields": "customfield_10001"})
+
+    # status transitions from one page of issues with an embedded changelog, as columns
+    def getHistoryColumns(self,pIssues):
+        dColumns = {sColumn: [] for sColumn in G_HistoryColumns}
+        lKey, lAuthor, lDateTime, lFrom, lTo = (dColumns[sColumn] for sColumn in G_HistoryColumns)
+        for dIssue in pIssues:
+            sKey = dIssue["key"]
+            dChangelog = dIssue.get("changelog") or {}
+            lHistories = dChangelog.get("histories", [])
+            # search embeds at most one page of changelog; page through the rest when there is more
+            if dChangelog.get("total", 0) > len(lHistories):
+                lHistories = lHistories + self.getRemainingHistories(sKey, len(lHistories))
+            for dHistory in lHistories:
+                for dItem in dHistory["items"]:
+                    if dItem["field"] == "status":
+                        dAuthor = dHistory.get("author") or {}
+                        lKey.append(sKey)
+                        lAuthor.append(dAuthor.get("displayName", dAuthor.get("name")))
+                        lDateTime.append(dHistory["created"])
+                        lFrom.append(dItem["fromString"])
+                        lTo.append(dItem["toString"])
+        return dColumns
+
+    def getRemainingHistories(self,pKey,pStart):
+        sURL = self.aServer + "/rest/api/2/issue/" + pKey + "/changelog"
+        lHistories = []
+        iStart = pStart
+        while True:
+            dPage = self.getWithRetry(sURL, {"startAt": iStart, "maxResults": 100}).json()
+            lHistories.extend(dPage["values"])
+            iStart = iStart + len(dPage["values"])
+            if dPage.get("isLast", True) or not dPage["values"]:
+                return lHistories
+
+    # one DF as an Arrow record batch. Every column the helper builds holds strings, so the schema is
+    # fixed by the column names and batches from different pages always match, even one whose column is
+    # all null
+    def toRecordBatch(self,pFrame):
+        oSchema = pa.schema([(sColumn, pa.string()) for sColumn in pFrame.columns])
+        return pa.RecordBatch.from_pandas(pFrame, schema=oSchema, preserve_index=False)
+
+    # a stream of DFs (from the iter...DF methods) as Arrow record batches
+    def iterRecordBatches(self,pFrames):
+        for dfFrame in pFrames:
+            yield self.toRecordBatch(dfFrame)
+
+    # writes one DF as part iPart of the Parquet dataset in directory pDir. The part is written under a
+    # hidden name and renamed into place, so a reader of the directory never sees a partial file
+    def writeParquetPart(self,pFrame,pDir,pPart):
+        sName = "part-" + str(pPart).zfill(5) + ".parquet"
+        sTemp = os.path.join(pDir, "." + sName + ".tmp")
+        pq.write_table(pa.Table.from_batches([self.toRecordBatch(pFrame)]), sTemp)
+        os.replace(sTemp, os.path.join(pDir, sName))
+        return len(pFrame)
+
+    # starts (or restarts) a Parquet dataset directory, removing the parts of an earlier export
+    def clearParquetParts(self,pDir):
+        os.makedirs(pDir, exist_ok=True)
+        for sName in os.listdir(pDir):
+            if sName.lstrip(".").startswith("part-"):
+                os.remove(os.path.join(pDir, sName))
+
+    # sink for a stream of DFs: one Parquet part per DF in pDir, readable as one table with
+    # pd.read_parquet(pDir) (or by a job picking up parts as they land). Returns the number of rows written
+    def writeParquetParts(self,pFrames,pDir):
+        self.clearParquetParts(pDir)
+        iRows = 0
+        for iPart, dfFrame in enumerate(pFrames):
+            iRows = iRows + self.writeParquetPart(dfFrame, pDir, iPart)
+        return iRows
+
+    # exports our team's issues created since pStartDate, their watchers and their history as Parquet
+    # datasets issues/, watchers/ and history/ under pPath (default Jira.ExportPath), one part per page.
+    # Memory stays at a few pages whatever the size of the project. A table with no rows has no parts.
+    # Returns the number of rows written per table
+    def exportToParquet(self,pStartDate,pPath=None):
+        self.aLogger.info("exportToParquet.Start")
+        sPath = pPath or self.aConfig.getParmDefault("Jira.ExportPath", "jira_export")
+        sIssues, sWatchers, sHistory = (os.path.join(sPath, sTable) for sTable in ("issues", "watchers", "history"))
+        for sDir in (sIssues, sWatchers):
+            self.clearParquetParts(sDir)
+        dRows = {"issues": 0, "watchers": 0}
+        # watchers are fetched per issue page, while the search keeps fetching the next pages
+        for iPart, dfIssues in enumerate(self.iterIssuesCreatedAfterDF(pStartDate)):
+            dRows["issues"] = dRows["issues"] + self.writeParquetPart(dfIssues, sIssues, iPart)
+            dfWatchers = self.buildWatchersDF(dfIssues)
+            if len(dfWatchers):
+                dRows["watchers"] = dRows["watchers"] + self.writeParquetPart(dfWatchers, sWatchers, iPart)
+            self.aLogger.debug("exported " + str(dRows["issues"]) + " issues")
+        dRows["history"] = self.writeParquetParts(self.iterAllIssueHistoryDF(pStartDate), sHistory)
+        self.aLogger.info("exportToParquet.End.OK: " + str(dRows))
+        return dRows
+
+    # incremental pull: issues, watchers and history are kept as Parquet files under Jira.SyncPath,
+    # and each run only fetches issues updated since the previous run's high-water mark, replacing
+    # their rows by key. The first run (or a new pStartDate) pulls everything.
+    # Issues deleted in Jira are not detected; run with a new start date to rebuild from scratch.
+    # Returns the merged (issues, watchers, history) DFs
+    def syncIncremental(self,pStartDate):
+        self.aLogger.info("syncIncremental.Start")
+        sPath = self.aConfig.getParmDefault("Jira.SyncPath", "jira_sync")
+        os.makedirs(sPath, exist_ok=True)
+        dState = self.readSyncState(sPath)
+        bFull = dState is None or dState.get("startDate") != pStartDate
+        sFilter = self.getTeamFilter(pStartDate)
+        if not bFull:
+            sFilter = sFilter + ' and updated >= "' + dState["watermark"] + '"'
+        fStarted = time.time()
+
+        # one search with the changelog expanded gives both the issue fields and the history
+        iChunk = self.aConfig.getParmDefault("Jira.HistoryChunk", 100)
+        lPages = self.searchAllPages(sFilter, iChunk, self.getChangedColumns,
+                                     {"expand": "changelog", "fields": G_FieldList + ",updated"})
+        dfIssues = self.buildIssuesDFFromColumns([dPage["issues"] for dPage in lPages])
+        dfHistory = self.buildHistoryDFFromColumns([dPage["history"] for dPage in lPages])
+        dfWatchers = self.getWatchersDF(dfIssues) if len(dfIssues) else pd.DataFrame()
+        lUpdated = list(itertools.chain.from_iterable(dPage["updated"] for dPage in lPages))
+        self.aLogger.info("syncIncremental: " + str(len(dfIssues)) + " issues changed" +
+                          ("" if bFull else " since " + dState["watermark"]))
+
+        lChanged = dfIssues["Key"].tolist() if len(dfIssues) else []
+        dfIssues = self.mergeSyncTable(sPath, "issues", dfIssues, "Key", lChanged, bFull)
+        dfWatchers = self.mergeSyncTable(sPath, "watchers", dfWatchers, "Issue key", lChanged, bFull)
+        dfHistory = self.mergeSyncTable(sPath, "history", dfHistory, "Key", lChanged, bFull)
+
+        # the state is written last, so a run that fails part way is simply repeated from the old mark
+        sWatermark = self.getWatermark(lUpdated, fStarted)
+        self.writeSyncState(sPath, {"startDate": pStartDate, "watermark": sWatermark, "lastRun": fStarted})
+        self.aLogger.info("syncIncremental.End.OK")
+        return dfIssues, dfWatchers, dfHistory
+
+    # issue columns, updated timestamps and history columns for one page of our team's issues
+    def getChangedColumns(self,pIssues):
+        pIssues = self.filterTeam(pIssues)
+        return {"issues": self.extractIssueColumns(pIssues), "updated": G_UpdatedExtractor(pIssues),
+                "history": self.getHistoryColumns(pIssues)}
+
+    def buildHistoryDFFromColumns(self,pPages):
+        dColumns = {sColumn: list(itertools.chain.from_iterable(dPage[sColumn] for dPage in pPages))
+                    for sColumn in G_HistoryColumns}
+        if not dColumns["Key"]:
+            return pd.DataFrame()
+        return pd.DataFrame(dColumns)
+
+    # JQL minutes are the resolution of the mark; step back Jira.SyncOverlapMinutes so changes made
+    # while the last run was reading are fetched again (merging by key makes the overlap harmless)
+    def getWatermark(self,pUpdated,pStarted):
+        lUpdated = [sUpdated for sUpdated in pUpdated if sUpdated and sUpdated != 'unknown']
+        if lUpdated:
+            oMark = pd.to_datetime(pd.Series(lUpdated), utc=True, format="ISO8601").max()
+        else:
+            oMark = pd.Timestamp(pStarted, unit="s", tz="UTC")
+        oMark = oMark - pd.Timedelta(minutes=self.aConfig.getParmDefault("Jira.SyncOverlapMinutes", 5))
+        # JQL dates are read in the Jira user's time zone
+        oMark = oMark.tz_convert(self.aConfig.getParmDefault("Jira.TimeZone", "UTC"))
+        return oMark.strftime("%Y/%m/%d %H:%M")
+
+    def readSyncState(self,pPath):
+        try:
+            with open(os.path.join(pPath, "state.json")) as f:
+                dState = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # a state without its tables (deleted or never written) means starting over
+        for sTable in ("issues", "watchers", "history"):
+            if not os.path.exists(os.path.join(pPath, sTable + ".parquet")):
+                return None
+        return dState
+
+    def writeSyncState(self,pPath,pState):
+        sFile = os.path.join(pPath, "state.json")
+        with open(sFile + ".tmp", "w") as f:
+            json.dump(pState, f, indent=4)
+        os.replace(sFile + ".tmp", sFile)
 
-    def getIssueHistory(self,pIssue):
-        lChanges = []
-        for history in pIssue.changelog.histories:
-            for item in history.items:
-                if item.field == "status":
-                    dChange = {}
-                    dChange["Key"] = pIssue.key
-                    dChange["Author"] = history.author
-                    dChange["DateTime"] = history.created
-                    dChange["FromStatus"] = item.fromString
-                    dChange["ToStatus"] = item.toString
-                    lChanges.append(dChange)
-        return lChanges
\ No newline at end of file
+    # replaces the rows of pChanged keys in the stored table with pNew and writes it back atomically
+    def mergeSyncTable(self,pPath,pTable,pNew,pKey,pChanged,pFull):
+        sFile = os.path.join(pPath, pTable + ".parquet")
+        if not pFull and os.path.exists(sFile):
+            dfOld = pd.read_parquet(sFile)
+            if len(dfOld) and pChanged:
+                dfOld = dfOld[~dfOld[pKey].isin(pChanged)]
+            lFrames = [dfFrame for dfFrame in (dfOld, pNew) if len(dfFrame.columns)]
+            dfMerged = pd.concat(lFrames, ignore_index=True) if lFrames else pd.DataFrame()
+        else:
+            dfMerged = pNew
+        dfMerged.to_parquet(sFile + ".tmp", index=False)
+        os.replace(sFile + ".tmp", sFile)
+        return dfMerged
@@ -1,9 +1,30 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request
+from werkzeug.wsgi import ClosingIterator
+import os
+import gc
 import random
 import datetime
 import uuid
 import logging
 import json
+import time
+from collections import namedtuple
+from functools import partial, wraps
+
+from jira_mock_jql import JQLError, parse_jql, query_clock
+from jira_mock_store import CHANGELOG_PAGE_SIZE, jira_now
+from jira_mock_columnar import ColumnarIssueStore
+from jira_mock_partitions import PartitionedIssueStore, load_projects
+from jira_mock_generator import generate_dataset, DEFAULT_DISTRIBUTIONS
+from jira_mock_snapshot import load_snapshot_store
+from jira_mock_throttle import load_profile
+from jira_mock_writes import WriteError, ReadOnlyStore, apply_updates, new_issue, requested_project, transitions, \
+    transition_target, BULK_CREATE_LIMIT
+from jira_mock_metrics import Metrics, AccessLog
+from jira_mock_profile import Profiler, phase
+from jira_mock_cursor import SearchCursors, TokenError, query_digest
+from jira_mock_http import make_etag, encoded_etag, http_date, not_modified, choose_encoding, compress, \
+    compress_stream, CompressedCache, COMPRESS_MIN_BYTES
 
 app = Flask(__name__)
 
@@ -15,105 +36,190 @@ logger = logging.getLogger(__name__)
 # Mock data configurations
 PROJECT_NAME = "MOCK"
 TEAM_NAME = "Toasted Snow"
-STATUSES = ["To Do", "In Progress", "Code Review", "Testing", "Done"]
-PRIORITIES = ["High", "Medium", "Low"]
-CATEGORIES = ["Bug", "Feature", "Task", "Improvement"]
-GROUPS = ["Frontend", "Backend", "Infrastructure", "Design"]
-SITES = ["Site A", "Site B", "Site C"]
-USERS = ["John Doe", "Jane Smith", "Bob Johnson", "Alice Brown", "Charlie Wilson"]
+USERS = DEFAULT_DISTRIBUTIONS["user"]
+# Every request is made as this user (see /myself); it creates issues and authors transitions
+CURRENT_USER = {"name": "test_user", "displayName": "Test User"}
+# Dataset size and seed; the same seed always produces the same issues and history
+ISSUE_COUNT = int(os.environ.get("JIRA_MOCK_ISSUES", 150))
+DATASET_SEED = int(os.environ.get("JIRA_MOCK_SEED", 42))
+# Projects of the site: a JSON list (inline or a file) of {"key", "name", "issues", "teams", "seed", "distributions"};
+# by default one project, PROJECT_NAME, of ISSUE_COUNT issues
+PROJECTS = load_projects(os.environ.get("JIRA_MOCK_PROJECTS"), ISSUE_COUNT, DATASET_SEED, PROJECT_NAME, TEAM_NAME)
+# Optional fixed "now" (YYYY-MM-DD) for datasets that must match across days; defaults to today (UTC)
+DATASET_ANCHOR = os.environ.get("JIRA_MOCK_ANCHOR")
+# Optional snapshot directory; when set the dataset is generated into it once and memory-mapped by every worker
+SNAPSHOT_PATH = os.environ.get("JIRA_MOCK_SNAPSHOT")
+# Search pages with at least this many issues are streamed instead of assembled in memory (0 streams every page)
+STREAM_MIN_RESULTS = int(os.environ.get("JIRA_MOCK_STREAM_MIN_RESULTS", 100))
+STREAM_CHUNK_BYTES = 64 * 1024
+ENCODE_BATCH = 64
+# Latency and rate-limit profile: a built-in name ("none", "cloud") or a JSON file, see jira_mock_throttle.py
+traffic = load_profile(os.environ.get("JIRA_MOCK_TRAFFIC"))
+# Compressed bodies of responses with an ETag are kept so repeat polls skip compression
+# Per-request logging is opt-in: JIRA_MOCK_ACCESS_LOG is the share of requests logged (0 = off, 1 = all)
+access_log = AccessLog(float(os.environ.get("JIRA_MOCK_ACCESS_LOG", 0)))
+metrics = Metrics()
+# Profiling is off unless JIRA_MOCK_PROFILE_DIR is set; then requests with an X-Mock-Profile header
+# and a JIRA_MOCK_PROFILE_RATE share of the rest are profiled, keeping the newest JIRA_MOCK_PROFILE_KEEP dumps
+profiler = Profiler(os.environ.get("JIRA_MOCK_PROFILE_DIR"), float(os.environ.get("JIRA_MOCK_PROFILE_RATE", 0)),
+                    int(os.environ.get("JIRA_MOCK_PROFILE_KEEP", 200)))
+# Served outside the traffic profile and not counted in the request metrics
+INTERNAL_ENDPOINTS = ("prometheus_metrics", "profile_summary")
+compressed_cache = CompressedCache(int(os.environ.get("JIRA_MOCK_COMPRESS_CACHE_MB", 64)) * 1024 * 1024)
+# Results of searches paged with nextPageToken, held from the first page to the last (or JIRA_MOCK_CURSOR_TTL seconds).
+# Any worker resumes a token another one issued, so they all sign tokens with JIRA_MOCK_CURSOR_SECRET
+cursors = SearchCursors(int(os.environ.get("JIRA_MOCK_CURSOR_CACHE_MB", 64)) * 1024 * 1024,
+                        float(os.environ.get("JIRA_MOCK_CURSOR_TTL", 900)),
+                        os.environ.get("JIRA_MOCK_CURSOR_SECRET", "jira-mock").encode())
 base_url = "http://localhost:5000"
 # base_url = "http://mockapigen-brheczbde3f6ewc2.centralindia-01.azurewebsites.net"
 azuer_url = "http://mockapigen-brheczbde3f6ewc2.centralindia-01.azurewebsites.net"
 # Storage for our mock data
-issues = []
-issue_history = {}
+store = None
+# Hash of the dataset settings; part of every ETag so a regenerated dataset never matches old tags
+dataset_version = None
 
-def generate_mock_issues(count=150):
-    """Generate a specified number of mock Jira issues"""
-    mock_issues = []
-    
-    for i in range(count):
-        issue_id = str(uuid.uuid4())
-        issue_key = f"{PROJECT_NAME}-{i+1}"
-        
-        # Create timestamps within the last 90 days
-        days_ago = random.randint(0, 90)
-        created_date = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days_ago)).strftime("%Y-%m-%dT%H:%M:%S.%f%z")
-        
-        # 50% chance of having a due date
-        due_date = None
-        if random.random() > 0.5:
-            due_days = random.randint(days_ago, days_ago + 30)
-            due_date = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days_ago) + 
-           datetime.timedelta(days=due_days)).strftime("%Y-%m-%dT%H:%M:%S.%f%z")
-        
-        # Create the issue
-        issue = {
-            "id": issue_id,
-            "key": issue_key,
-            "fields": {
-                "project": {"name": PROJECT_NAME},
-                "customfield_10001": {"name": TEAM_NAME},
-                "created": created_date,
-                "creator": {"displayName": random.choice(USERS)},
-                "reporter": {"displayName": random.choice(USERS)},
-                "assignee": {"displayName": random.choice(USERS)},
-                "status": {"name": random.choice(STATUSES)},
-                "priority": {"name": random.choice(PRIORITIES)},
-                "customfield_10078": {"value": random.choice(CATEGORIES)},
-                "summary": f"Mock issue {i+1} for testing",
-                "description": f"This is a detailed description for mock issue {i+1}",
-                "customfield_10046": {"value": random.choice(GROUPS)},
-                "customfield_10045": [{"value": random.choice(SITES)}],
-                "duedate": due_date,
-                "watches": {"self": f"{base_url}/rest/api/2/issue/{issue_key}/watchers"}
-            }
-        }
-        
-        mock_issues.append(issue)
-        
-        # Generate history for this issue
-        generate_issue_history(issue_key)
-    
-    return mock_issues
+# Routes are written against these framework-neutral types so that the Flask app
+# and the ASGI app (asgi_app.py) serve the same handlers from the same dataset
+MockRequest = namedtuple("MockRequest", ["method", "args", "data", "headers"])
+# issues/changelogs count the issues and expanded changelogs in the body, for payload-dependent latency
+MockResponse = namedtuple("MockResponse", ["status", "body", "headers", "issues", "changelogs"], defaults=[0, 0])
+# endpoint name -> handler, shared with asgi_app.py
+RESPONDERS = {}
 
-def generate_issue_history(issue_key):
-    """Generate mock history for a specific issue"""
-    history = []
-    
-    # Start with "To Do"
-    current_status = "To Do"
-    
-    # Between 0 and 5 status changes
-    num_changes = random.randint(0, 5)
-    
-    for i in range(num_changes):
-        # Get a new status different from the current one
-        next_statuses = [s for s in STATUSES if s != current_status]
-        if not next_statuses:
-            break
-            
-        next_status = random.choice(next_statuses)
-        
-        # Create a timestamp for this change
-        days_ago = random.randint(0, 80)  # Ensure it's within our 90-day window
-        change_date = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days_ago)).strftime("%Y-%m-%dT%H:%M:%S.%f%z")
-        history.append({
-            "Key": issue_key,
-            "Author": random.choice(USERS),
-            "DateTime": change_date,
-            "FromStatus": current_status,
-            "ToStatus": next_status
-        })
-        
-        current_status = next_status
-    
-    issue_history[issue_key] = history
+def json_response(value, status=200, headers=None):
+    """Encode value as a JSON MockResponse"""
+    return MockResponse(status, json.dumps(value, separators=(",", ":")).encode(), headers or {})
+
+def conditional(req, *parts, clock=None):
+    """Validators for a read identified by parts of the current dataset.
+
+    clock is the time a read that depends on it (a search with relative
+    dates) was evaluated at; it is part of the ETag and the read counts as
+    modified then. Returns (headers, response): response is a 304 when the
+    client's If-None-Match / If-Modified-Since still match, otherwise None
+    and the handler builds the body and sends headers with it.
+    """
+    etag = make_etag(dataset_version, *parts) if clock is None else make_etag(dataset_version, *parts, clock)
+    modified = store.modified if clock is None else max(store.modified, clock.timestamp())
+    headers = {"ETag": etag, "Last-Modified": http_date(modified)}
+    if not_modified(req.headers, etag, modified):
+        # Echo the tag the client holds, which may be the tag of a compressed representation
+        held = req.headers.get("If-None-Match", "")
+        if held and "," not in held and held.strip() != "*":
+            headers["ETag"] = held.strip()
+        return headers, MockResponse(304, b'', headers)
+    return headers, None
+
+def encode_response(req, response):
+    """Compress a 200 response with the best encoding the client accepts.
+
+    Responses with an ETag are cached compressed, so repeated polls of the
+    same page reuse the bytes; streamed bodies are compressed chunk by chunk.
+    """
+    body = response.body
+    if response.status != 200 or (isinstance(body, bytes) and len(body) < COMPRESS_MIN_BYTES):
+        return response
+    headers = dict(response.headers, Vary="Accept-Encoding")
+    encoding = choose_encoding(req.headers.get("Accept-Encoding"))
+    if encoding is None:
+        return response._replace(headers=headers)
+    headers["Content-Encoding"] = encoding
+    etag = response.headers.get("ETag")
+    if etag is None:
+        body = compress(body, encoding) if isinstance(body, bytes) else compress_stream(body, encoding)
+        return response._replace(body=body, headers=headers)
+    headers["ETag"] = encoded_etag(etag, encoding)
+    key = (etag, encoding)
+    cached = compressed_cache.get(key)
+    if cached is not None:
+        return response._replace(body=cached, headers=headers)
+    if isinstance(body, bytes):
+        body = compress(body, encoding)
+        compressed_cache.put(key, body)
+    else:
+        body = compress_stream(body, encoding, partial(compressed_cache.put, key))
+    return response._replace(body=body, headers=headers)
+
+def observe(endpoint, req, view_args, status, seconds, size):
+    metrics.observe(endpoint, req.method, status, seconds, size)
+    access_log.record(endpoint, req.method, view_args, req.args, status, seconds, size)
+
+def observed_stream(chunks, endpoint, req, view_args, status, started, delay):
+    """Pass a streamed body through, recording the request once the last chunk is out"""
+    def observed():
+        size = 0
+        for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+        observe(endpoint, req, view_args, status, time.perf_counter() - started + delay, size)
+    # Closing the body closes the stream it wraps, even if no chunk was ever asked for
+    return ClosingIterator(observed(), getattr(chunks, "close", None))
 
-@app.route('/rest/api/2/serverInfo', methods=['GET'])
-def server_info():
+def handle(endpoint, req, view_args):
+    response = RESPONDERS[endpoint](req, **view_args)
+    with phase("compression"):
+        return encode_response(req, response)
+
+def profiled(response, session):
+    """Finish a profiled request: bytes bodies get a Server-Timing header, streams finish after the last chunk"""
+    if isinstance(response.body, bytes):
+        response = response._replace(headers=dict(response.headers, **{"Server-Timing": session.timer.server_timing()}))
+        session.finish(response.status)
+        return response
+    return response._replace(body=session.stream(response.body, partial(session.finish, response.status)))
+
+def respond(endpoint, req, view_args):
+    """Run a handler under the traffic profile; returns the response and how long to hold it (seconds)"""
+    if endpoint in INTERNAL_ENDPOINTS:
+        return RESPONDERS[endpoint](req, **view_args), 0.0
+    started = time.perf_counter()
+    allowed, headers = traffic.admit(req)
+    if not allowed:
+        response, delay = json_response({"errorMessages": ["Rate limit exceeded."], "errors": {}}, 429, headers), 0.0
+    else:
+        session = profiler.start(endpoint, req.headers) if profiler.enabled else None
+        if session is None:
+            response = handle(endpoint, req, view_args)
+        else:
+            try:
+                response = session.call(partial(handle, endpoint, req, view_args))
+            except BaseException:
+                # The server answers a failed handler with a 500; the session must end either way
+                session.finish(500)
+                raise
+            response = profiled(response, session)
+        if headers:
+            response = response._replace(headers=dict(response.headers, **headers))
+        delay = traffic.delay(endpoint, response)
+    # Durations include the simulated delay, which the caller sleeps after this returns
+    if isinstance(response.body, bytes):
+        observe(endpoint, req, view_args, response.status, time.perf_counter() - started + delay, len(response.body))
+    else:
+        response = response._replace(body=observed_stream(response.body, endpoint, req, view_args, response.status,
+                                                          started, delay))
+    return response, delay
+
+def route(rule, methods=('GET',)):
+    """Register a handler taking a MockRequest (plus URL variables) and returning a MockResponse"""
+    def decorator(handler):
+        def view(**view_args):
+            req = MockRequest(request.method, request.args, request.get_json(silent=True), request.headers)
+            response, delay = respond(handler.__name__, req, view_args)
+            # Simulated latency holds this worker thread; asgi_app awaits it instead
+            if delay:
+                time.sleep(delay)
+            mimetype = None if "Content-Type" in response.headers else "application/json"
+            return app.response_class(response.body, status=response.status, headers=response.headers,
+                                      mimetype=mimetype)
+        app.add_url_rule(rule, handler.__name__, view, methods=list(methods))
+        RESPONDERS[handler.__name__] = handler
+        return handler
+    return decorator
+
+@route('/rest/api/2/serverInfo')
+def server_info(req):
     """Mock endpoint for Jira server info - required by the JIRA library"""
-    logger.info("Received server info request")
     
     response = {
         "baseUrl": base_url,
@@ -127,17 +233,21 @@ def server_info():
         "serverTitle": "Mock Jira API"
     }
     
-    return jsonify(response)
+    return json_response(response)
 
-@app.route('/rest/api/2/field', methods=['GET'])
-def get_fields():
+@route('/rest/api/2/field')
+def get_fields(req):
     """Mock endpoint for Jira fields - required by the JIRA library"""
-    logger.info("Received fields request")
+    headers, cached = conditional(req, "fields")
+    if cached:
+        return cached
     
     fields = [
         {"id": "summary", "name": "Summary", "custom": False, "orderable": True, "navigable": True, "searchable": True},
         {"id": "description", "name": "Description", "custom": False, "orderable": True, "navigable": True, "searchable": True},
         {"id": "status", "name": "Status", "custom": False, "orderable": True, "navigable": True, "searchable": True},
+        {"id": "created", "name": "Created", "custom": False, "orderable": False, "navigable": True, "searchable": True},
+        {"id": "updated", "name": "Updated", "custom": False, "orderable": False, "navigable": True, "searchable": True},
         {"id": "project", "name": "Project", "custom": False, "orderable": True, "navigable": True, "searchable": True},
         {"id": "priority", "name": "Priority", "custom": False, "orderable": True, "navigable": True, "searchable": True},
         {"id": "customfield_10001", "name": "Team", "custom": True, "orderable": True, "navigable": True, "searchable": True},
@@ -146,200 +256,432 @@ def get_fields():
         {"id": "customfield_10045", "name": "Site", "custom": True, "orderable": True, "navigable": True, "searchable": True}
     ]
     
-    return jsonify(fields)
+    return json_response(fields, headers=headers)
 
-@app.route('/rest/api/2/myself', methods=['GET'])
-def get_current_user():
+@route('/rest/api/2/myself')
+def get_current_user(req):
     """Mock endpoint for current user info - required by the JIRA library"""
-    logger.info("Received current user request")
     
     response = {
-        "self": f"{base_url}/rest/api/2/user?username=test_user",
-        "name": "test_user",
-        "displayName": "Test User",
+        "self": f"{base_url}/rest/api/2/user?username={CURRENT_USER['name']}",
+        "name": CURRENT_USER["name"],
+        "displayName": CURRENT_USER["displayName"],
         "active": True,
         "timeZone": "UTC",
         "groups": {"size": 1, "items": [{"name": "jira-users"}]},
         "applicationRoles": {"size": 1, "items": [{"name": "jira-users"}]}
     }
     
-    return jsonify(response)
+    return json_response(response)
 
-@app.route('/rest/api/2/search', methods=['GET', 'POST'])
-def search_issues():
+def page_chunk(positions, start, changelog, fields):
+    """Join encoded issues from positions[start:] up to about STREAM_CHUNK_BYTES; returns (chunk, next start)"""
+    chunk = []
+    size = 0
+    idx = start
+    while idx < len(positions) and size < STREAM_CHUNK_BYTES:
+        # Issues are encoded a batch at a time so the store can work column by column
+        for fragment in store.issues_json(positions[idx:idx + ENCODE_BATCH], changelog, fields):
+            if idx:
+                chunk.append(b',')
+            chunk.append(fragment)
+            size += len(fragment) + 1
+            idx += 1
+    return b''.join(chunk), idx
+
+def stream_search_page(prefix, positions, changelog, fields=None):
+    """Yield a search body: the envelope first, then the pre-encoded issues in chunks of STREAM_CHUNK_BYTES"""
+    yield prefix + b',"issues":['
+    idx = 0
+    while True:
+        # Timed chunk by chunk: a phase must not stay open across a yield
+        with phase("serialization"):
+            chunk, idx = page_chunk(positions, idx, changelog, fields)
+        if idx >= len(positions):
+            yield chunk + b']}'
+            return
+        yield chunk
+
+@route('/rest/api/2/search', methods=['GET', 'POST'])
+def search_issues(req):
     """Mock endpoint for Jira issue search - support for both GET and POST"""
-    logger.info(f"Received search request: {request.method}")
     
     # Parse parameters based on request method
-    if request.method == 'GET':
-        jql = request.args.get('jql', '')
-        start_at = int(request.args.get('startAt', 0))
-        max_results = int(request.args.get('maxResults', 50))
-        expand = request.args.get('expand', '')
+    if req.method == 'GET':
+        jql = req.args.get('jql', '')
+        start_at = int(req.args.get('startAt', 0))
+        max_results = int(req.args.get('maxResults', 50))
+        expand = req.args.get('expand', '')
+        fields = req.args.get('fields')
     else:  # POST
-        data = request.json
+        data = req.data or {}
         jql = data.get('jql', '')
         start_at = int(data.get('startAt', 0))
         max_results = int(data.get('maxResults', 50))
         expand = data.get('expand', '')
+        fields = data.get('fields')
     
-    logger.info(f"JQL: {jql}, StartAt: {start_at}, MaxResults: {max_results}, Expand: {expand}")
-    
-    # For simplicity, we'll ignore the JQL and just return paginated results
-    paginated_issues = issues[start_at:start_at + max_results]
+    # A search result changes only with the query or the data, so unchanged polls get a 304 before any work
+    expand_changelog = 'changelog' in expand
+    # Search returns navigable fields unless asked otherwise; projections are joined from per-field fragments
+    fields = store.select_fields(fields, default="*navigable")
+    try:
+        with phase("lookup"):
+            query = parse_jql(jql)
+    except JQLError as e:
+        return json_response({"errorMessages": [str(e)], "errors": {}}, 400)
+    # Relative dates ("-30d") move with the clock, so their results are tagged with, and evaluated at, the minute
+    # they resolve in
+    clock = query_clock(query)
+    headers, cached = conditional(req, "search", store.generation, jql, start_at, max_results, expand_changelog,
+                                  fields, clock=clock)
+    if cached:
+        return cached
     
-    # If changelog is requested in expand, add it to each issue
-    if 'changelog' in expand:
-        for issue in paginated_issues:
-            issue_key = issue['key']
-            histories = []
-            changes = issue_history.get(issue_key, [])
-            
-            for idx, change in enumerate(changes):
-                history = {
-                    "id": str(uuid.uuid4()),
-                    "author": {"displayName": change["Author"]},
-                    "created": change["DateTime"],
-                    "items": [
-                        {
-                            "field": "status",
-                            "fieldtype": "jira",
-                            "from": f"{idx}",
-                            "fromString": change["FromStatus"],
-                            "to": f"{idx+1}",
-                            "toString": change["ToStatus"]
-                        }
-                    ]
-                }
-                histories.append(history)
-            
-            issue["changelog"] = {
-                "startAt": 0,
-                "maxResults": 100,
-                "total": len(histories),
-                "histories": histories
-            }
+    try:
+        with phase("lookup"):
+            matches = store.search(query, now=clock)
+    except JQLError as e:
+        return json_response({"errorMessages": [str(e)], "errors": {}}, 400)
     
-    response = {
-        "expand": f"schema,names{',changelog' if 'changelog' in expand else ''}",
+    # Compose the response from the cached issue encodings; the shared issues are never modified
+    envelope = {
+        "expand": f"schema,names{',changelog' if expand_changelog else ''}",
         "startAt": start_at,
         "maxResults": max_results,
-        "total": len(issues),
-        "issues": paginated_issues
+        "total": len(matches)
     }
+    prefix = json.dumps(envelope, separators=(",", ":"))[:-1].encode()
+    page = matches[start_at:start_at + max_results]
+    body = stream_search_page(prefix, page, expand_changelog, fields)
     
-    return jsonify(response)
+    # Large pages are streamed with chunked transfer so memory and time-to-first-byte stay flat
+    if len(page) < STREAM_MIN_RESULTS:
+        body = b''.join(body)
+    return MockResponse(200, body, headers, len(page), len(page) if expand_changelog else 0)
+
+@route('/rest/api/3/search/jql', methods=['GET', 'POST'])
+def search_issues_jql(req):
+    """Mock endpoint for Jira Cloud's token-paginated search: nextPageToken instead of startAt, no total"""
+    if req.method == 'GET':
+        jql = req.args.get('jql', '')
+        token = req.args.get('nextPageToken') or None
+        max_results = int(req.args.get('maxResults', 50))
+        expand = req.args.get('expand', '')
+        fields = req.args.get('fields')
+    else:  # POST
+        data = req.data or {}
+        jql = data.get('jql', '')
+        token = data.get('nextPageToken') or None
+        max_results = int(data.get('maxResults', 50))
+        expand = data.get('expand', '')
+        fields = data.get('fields')
+    max_results = max(1, max_results)
+
+    expand_changelog = 'changelog' in expand
+    # Unlike /rest/api/2/search this returns only the issue id unless fields are requested
+    fields = store.select_fields(fields, default="id")
+    try:
+        with phase("lookup"):
+            query = parse_jql(jql)
+    except JQLError as e:
+        return json_response({"errorMessages": [str(e)], "errors": {}}, 400)
+    clock = query_clock(query)
+    headers, cached = conditional(req, "search/jql", store.generation, jql, token, max_results, expand_changelog,
+                                  fields, clock=clock)
+    if cached:
+        return cached
 
-@app.route('/rest/api/2/issue/<issue_key>/watchers', methods=['GET'])
-def get_watchers(issue_key):
+    try:
+        with phase("lookup"):
+            # Every page after the first is a slice of the result the first page pinned
+            # Positions are only meaningful in the dataset a token was issued for
+            page, next_token = cursors.page(token, query_digest(dataset_version, jql), max_results,
+                                            partial(store.search, query, now=clock))
+    except (JQLError, TokenError) as e:
+        return json_response({"errorMessages": [str(e)], "errors": {}}, 400)
+
+    envelope = {"isLast": next_token is None}
+    if next_token is not None:
+        envelope["nextPageToken"] = next_token
+    prefix = json.dumps(envelope, separators=(",", ":"))[:-1].encode()
+    body = stream_search_page(prefix, page, expand_changelog, fields)
+    if len(page) < STREAM_MIN_RESULTS:
+        body = b''.join(body)
+    return MockResponse(200, body, headers, len(page), len(page) if expand_changelog else 0)
+
+def issue_watchers(issue_key):
+    """Current watchers of an issue: the stored list once changed, otherwise 0-5 generated from the seed"""
+    watchers = store.watchers(issue_key)
+    if watchers is not None:
+        return watchers
+    rng = random.Random(f"{DATASET_SEED}:{issue_key}")
+    return [{
+        "self": f"{base_url}/rest/api/2/user?username={uuid.UUID(int=rng.getrandbits(128), version=4)}",
+        "name": f"user{rng.randint(1, 100)}",
+        "displayName": rng.choice(USERS),
+        "active": True
+    } for _ in range(rng.randint(0, 5))]
+
+def read_only_response():
+    return json_response({"errorMessages": ["This mock is serving a read-only snapshot; unset JIRA_MOCK_SNAPSHOT "
+                                            "to enable writes."], "errors": {}}, 405)
+
+def writes(handler):
+    """Answer a write the store rejects as read-only with a 405"""
+    @wraps(handler)
+    def write(req, **view_args):
+        try:
+            return handler(req, **view_args)
+        except ReadOnlyStore:
+            return read_only_response()
+    return write
+
+def issue_not_found():
+    return json_response({"errorMessages": ["Issue does not exist or you do not have permission to see it."],
+                          "errors": {}}, 404)
+
+@route('/rest/api/2/issue/<issue_key>/watchers')
+def get_watchers(req, issue_key):
     """Mock endpoint for Jira issue watchers"""
-    logger.info(f"Received watchers request for issue: {issue_key}")
-    
-    # Generate 0-5 random watchers
-    num_watchers = random.randint(0, 5)
-    watchers = []
-    
-    for _ in range(num_watchers):
-        watchers.append({
-            "self": f"{base_url}/rest/api/2/user?username={uuid.uuid4()}",
-            "name": f"user{random.randint(1, 100)}",
-            "displayName": random.choice(USERS),
-            "active": True
-        })
     
+    watchers = issue_watchers(issue_key)
     response = {
         "self": f"{base_url}/rest/api/2/issue/{issue_key}/watchers",
-        "isWatching": False,
+        "isWatching": any(watcher["name"] == CURRENT_USER["name"] for watcher in watchers),
         "watchCount": len(watchers),
         "watchers": watchers
     }
     
-    return jsonify(response)
+    return json_response(response)
+
+@route('/rest/api/2/issue/<issue_key>/watchers', methods=['POST'])
+@writes
+def add_watcher(req, issue_key):
+    """Mock endpoint for adding a watcher; the body is a JSON string username, defaulting to the current user"""
+    if store.position(issue_key) is None:
+        return issue_not_found()
+    name = req.data if isinstance(req.data, str) and req.data else CURRENT_USER["name"]
+    with store.write_lock:
+        watchers = [watcher for watcher in issue_watchers(issue_key) if watcher["name"] != name]
+        display_name = CURRENT_USER["displayName"] if name == CURRENT_USER["name"] else name
+        store.set_watchers(issue_key, watchers + [{"self": f"{base_url}/rest/api/2/user?username={name}",
+                                                   "name": name, "displayName": display_name, "active": True}])
+    return MockResponse(204, b'', {})
+
+@route('/rest/api/2/issue/<issue_key>/watchers', methods=['DELETE'])
+@writes
+def remove_watcher(req, issue_key):
+    """Mock endpoint for removing the watcher given by the username (or accountId) parameter"""
+    if store.position(issue_key) is None:
+        return issue_not_found()
+    name = req.args.get('username') or req.args.get('accountId')
+    if not name:
+        return json_response({"errorMessages": ["A username or accountId must be specified."], "errors": {}}, 400)
+    with store.write_lock:
+        store.set_watchers(issue_key, [watcher for watcher in issue_watchers(issue_key) if watcher["name"] != name])
+    return MockResponse(204, b'', {})
+
+def created_issue(issue):
+    return {"id": issue["id"], "key": issue["key"], "self": f"{base_url}/rest/api/2/issue/{issue['id']}"}
 
-@app.route('/rest/api/2/issue/<issue_key>', methods=['GET'])
-def get_issue(issue_key):
+@route('/rest/api/2/issue', methods=['POST'])
+@writes
+def create_issue(req):
+    """Mock endpoint for creating an issue in the project named by fields.project"""
+    # An unknown project is rejected by new_issue
+    partition = store.partition_for(requested_project(req.data)) or store.partitions[0]
+    # Keys are numbered by position in the project, so the next number must be taken and used under the write lock
+    with store.write_lock:
+        try:
+            issue = new_issue(len(partition) + 1, req.data, partition.project, base_url,
+                              CURRENT_USER["displayName"], jira_now(), partition.categories)
+        except WriteError as e:
+            return json_response(e.body(), 400)
+        store.add_issues([issue])
+    return json_response(created_issue(issue), 201)
+
+@route('/rest/api/2/issue/bulk', methods=['POST'])
+@writes
+def create_issues(req):
+    """Mock endpoint for bulk issue creation; valid issues are created even when others fail"""
+    updates = req.data.get('issueUpdates') if isinstance(req.data, dict) else None
+    if not isinstance(updates, list):
+        return json_response({"errorMessages": ["issueUpdates must be a list."], "errors": {}}, 400)
+    if len(updates) > BULK_CREATE_LIMIT:
+        return json_response({"errorMessages": [f"Bulk create is limited to {BULK_CREATE_LIMIT} issues."],
+                              "errors": {}}, 400)
+    created = []
+    errors = []
+    with store.write_lock:
+        now = jira_now()
+        # Issues created so far in this batch, per project
+        pending = {}
+        for idx, update in enumerate(updates):
+            partition = store.partition_for(requested_project(update)) or store.partitions[0]
+            number = len(partition) + pending.get(partition.project.key, 0) + 1
+            try:
+                created.append(new_issue(number, update, partition.project, base_url,
+                                         CURRENT_USER["displayName"], now, partition.categories))
+                pending[partition.project.key] = pending.get(partition.project.key, 0) + 1
+            except WriteError as e:
+                errors.append({"status": 400, "elementErrors": e.body(), "failedElementNumber": idx})
+        # One index update for the whole batch
+        if created:
+            store.add_issues(created)
+    response = {"issues": [created_issue(issue) for issue in created], "errors": errors}
+    return json_response(response, 201 if created or not errors else 400)
+
+@route('/rest/api/2/issue/<issue_key>')
+def get_issue(req, issue_key):
     """Mock endpoint for getting a specific Jira issue with changelog"""
-    logger.info(f"Received issue request: {issue_key}")
     
-    # Find the issue or return 404
-    found_issue = None
-    for issue in issues:
-        if issue['key'] == issue_key:
-            found_issue = issue.copy()
-            break
+    # Serve the cached encoding of the issue, with changelog if requested
+    expand_changelog = 'changelog' in req.args.get('expand', '')
+    with phase("lookup"):
+        pos = store.position(issue_key)
+    if pos is None:
+        return json_response({"error": "Issue not found"}, 404)
+    fields = store.select_fields(req.args.get('fields'))
+    headers, cached = conditional(req, "issue", pos, store.revision(pos), expand_changelog, fields)
+    if cached:
+        return cached
+    with phase("serialization"):
+        body = store.issue_json_at(pos, changelog=expand_changelog, fields=fields)
     
-    if not found_issue:
-        return jsonify({"error": "Issue not found"}), 404
+    return MockResponse(200, body, headers, 1, int(expand_changelog))
+
+@route('/rest/api/2/issue/<issue_key>', methods=['PUT'])
+@writes
+def edit_issue(req, issue_key):
+    """Mock endpoint for editing issue fields through "fields" and "update" """
+    with store.write_lock:
+        issue = store.get(issue_key)
+        if issue is None:
+            return issue_not_found()
+        try:
+            # An edit that changes nothing (no fields or update, or empty ones) is an error, not a new version
+            if isinstance(req.data, dict) and not req.data.get('fields') and not req.data.get('update'):
+                raise WriteError(messages=["The request body must contain fields or update."])
+            fields = apply_updates(issue["fields"], req.data, store.partition_of(issue_key).categories)
+        except WriteError as e:
+            return json_response(e.body(), 400)
+        store.replace_issue(dict(issue, fields=fields))
+    return MockResponse(204, b'', {})
+
+@route('/rest/api/2/issue/<issue_key>/transitions', methods=['GET', 'POST'])
+@writes
+def issue_transitions(req, issue_key):
+    """Mock endpoint for listing and performing status transitions; a transition is recorded in the changelog"""
+    issue = store.get(issue_key)
+    if issue is None:
+        return issue_not_found()
+    categories = store.partition_of(issue_key).categories
+    if req.method == 'GET':
+        return json_response({"expand": "transitions",
+                              "transitions": transitions(categories["status"], issue["fields"]["status"]["name"])})
+    data = req.data if isinstance(req.data, dict) else {}
+    with store.write_lock:
+        # Re-read under the lock: the issue may have moved on since the check above
+        issue = store.get(issue_key)
+        current = issue["fields"]["status"]["name"]
+        requested = data.get('transition')
+        target = transition_target(categories["status"], current, requested)
+        if target is None:
+            requested = requested.get('id') if isinstance(requested, dict) else requested
+            return json_response({"errorMessages": [f"Transition id '{requested}' is not valid for this issue."],
+                                  "errors": {}}, 400)
+        try:
+            fields = apply_updates(issue["fields"], {"fields": data.get('fields'), "update": data.get('update')},
+                                   categories)
+        except WriteError as e:
+            return json_response(e.body(), 400)
+        # The new status and its changelog entry are published together, stamped with one time
+        now = jira_now()
+        store.replace_issue(dict(issue, fields=dict(fields, status={"name": target})),
+                            [{"Key": issue_key, "Author": CURRENT_USER["displayName"], "DateTime": now,
+                              "FromStatus": current, "ToStatus": target}], now)
+    return MockResponse(204, b'', {})
+
+@route('/rest/api/2/issue/<issue_key>/changelog')
+def get_changelog(req, issue_key):
+    """Mock endpoint for paging through an issue's changelog"""
     
-    # Add changelog if requested
-    expand = request.args.get('expand', '')
-    if 'changelog' in expand:
-        histories = []
-        
-        # Get history for this issue
-        changes = issue_history.get(issue_key, [])
-        
-        for idx, change in enumerate(changes):
-            history = {
-                "id": str(uuid.uuid4()),
-                "author": {"displayName": change["Author"]},
-                "created": change["DateTime"],
-                "items": [
-                    {
-                        "field": "status",
-                        "fieldtype": "jira",
-                        "from": f"{idx}",
-                        "fromString": change["FromStatus"],
-                        "to": f"{idx+1}",
-                        "toString": change["ToStatus"]
-                    }
-                ]
-            }
-            histories.append(history)
-        
-        found_issue["changelog"] = {
-            "startAt": 0,
-            "maxResults": 100,
-            "total": len(histories),
-            "histories": histories
-        }
+    pos = store.position(issue_key)
+    if pos is None:
+        return json_response({"errorMessages": ["Issue does not exist or you do not have permission to see it."], "errors": {}}, 404)
     
-    return jsonify(found_issue)
+    start_at = int(req.args.get('startAt', 0))
+    max_results = int(req.args.get('maxResults', CHANGELOG_PAGE_SIZE))
+    headers, cached = conditional(req, "changelog", pos, store.revision(pos), start_at, max_results)
+    if cached:
+        return cached
+    page = store.changelog(issue_key, start_at, max_results)
+    is_last = start_at + len(page["histories"]) >= page["total"]
+    response = {
+        "self": f"{base_url}/rest/api/2/issue/{issue_key}/changelog?maxResults={max_results}&startAt={start_at}",
+        "maxResults": max_results,
+        "startAt": start_at,
+        "total": page["total"],
+        "isLast": is_last,
+        "values": page["histories"]
+    }
+    if not is_last:
+        response["nextPage"] = f"{base_url}/rest/api/2/issue/{issue_key}/changelog?maxResults={max_results}&startAt={start_at + max_results}"
+    
+    return json_response(response, headers=headers)
 
-@app.route('/rest/api/2/project', methods=['GET'])
-def get_projects():
+@route('/rest/api/2/project')
+def get_projects(req):
     """Mock endpoint for getting projects"""
-    logger.info("Received projects request")
+    headers, cached = conditional(req, "projects")
+    if cached:
+        return cached
     
+    # Projects sharing a category name share its id
+    categories = list(dict.fromkeys(project.category for project in PROJECTS))
     projects = [{
-        "self": f"{base_url}/rest/api/2/project/10000",
-        "id": "10000",
-        "key": PROJECT_NAME,
-        "name": PROJECT_NAME,
+        "self": f"{base_url}/rest/api/2/project/{project.id}",
+        "id": project.id,
+        "key": project.key,
+        "name": project.name,
         "avatarUrls": {
-            "48x48": f"{base_url}/secure/projectavatar?size=large&pid=10000",
-            "24x24": f"{base_url}/secure/projectavatar?size=small&pid=10000",
-            "16x16": f"{base_url}/secure/projectavatar?size=xsmall&pid=10000",
-            "32x32": f"{base_url}/secure/projectavatar?size=medium&pid=10000"
+            "48x48": f"{base_url}/secure/projectavatar?size=large&pid={project.id}",
+            "24x24": f"{base_url}/secure/projectavatar?size=small&pid={project.id}",
+            "16x16": f"{base_url}/secure/projectavatar?size=xsmall&pid={project.id}",
+            "32x32": f"{base_url}/secure/projectavatar?size=medium&pid={project.id}"
         },
         "projectCategory": {
-            "self": f"{base_url}/rest/api/2/projectCategory/10000",
-            "id": "10000",
-            "name": "MOCK Category",
+            "self": f"{base_url}/rest/api/2/projectCategory/{10000 + categories.index(project.category)}",
+            "id": str(10000 + categories.index(project.category)),
+            "name": project.category,
             "description": "Mock Project Category"
         }
-    }]
+    } for project in PROJECTS]
     
-    return jsonify(projects)
+    return json_response(projects, headers=headers)
 
-@app.route('/healthcheck', methods=['GET'])
-def healthcheck():
+@route('/healthcheck')
+def healthcheck(req):
     """Health check endpoint"""
-    return jsonify({"status": "UP", "timestamp": datetime.datetime.now().isoformat()})
+    return json_response({"status": "UP", "timestamp": datetime.datetime.now().isoformat()})
+
+@route('/metrics')
+def prometheus_metrics(req):
+    """Request counts, latency and size histograms and dataset gauges in the Prometheus text format"""
+    return MockResponse(200, metrics.render().encode(), {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+@route('/profile')
+def profile_summary(req):
+    """Per-endpoint summary of the requests profiled by this process: phase timings and top functions"""
+    if not profiler.enabled:
+        return json_response({"errorMessages": ["Profiling is off; set JIRA_MOCK_PROFILE_DIR to enable it."],
+                              "errors": {}}, 404)
+    return json_response(profiler.summary(req.args.get('sort', 'cumtime'), int(req.args.get('limit', 15))))
 
 # Helper function to handle direct API calls for the JIRA library
-@app.route('/rest/api/2/<path:subpath>', methods=['GET', 'POST', 'PUT', 'DELETE'])
-def api_catchall(subpath):
+@route('/rest/api/2/<path:subpath>', methods=['GET', 'POST', 'PUT', 'DELETE'])
+def api_catchall(req, subpath):
     """Catch-all handler for any other API endpoints not explicitly defined"""
     logger.warning(f"Received request for undefined endpoint: {subpath}")
     
@@ -349,18 +691,57 @@ def api_catchall(subpath):
         parts = subpath.split('/')
         if len(parts) > 1:
             issue_key = parts[1]
-            # Find the issue
-            for issue in issues:
-                if issue['key'] == issue_key:
-                    return jsonify(issue)
+            body = store.issue_json(issue_key)
+            if body is not None:
+                return MockResponse(200, body, {})
     
     # For any other endpoint, return a simple success response
-    return jsonify({"status": "success", "message": f"Mock API doesn't fully implement {subpath}", "path": subpath})
+    return json_response({"status": "success", "message": f"Mock API doesn't fully implement {subpath}", "path": subpath})
+
+def dataset_settings(project):
+    """Everything that determines a project's generated dataset, used to tell whether its snapshot is current"""
+    anchor = DATASET_ANCHOR or datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d")
+    settings = {"count": project.issues, "seed": project.seed, "anchor": anchor, "project": project.key,
+                "team": project.values("team")[0], "baseUrl": base_url}
+    # Only settings that differ from the defaults are added, so the default dataset keeps its snapshot and ETags
+    if project.distributions != {"team": [TEAM_NAME]}:
+        settings["distributions"] = project.distributions
+    if project.first_id != 10000:
+        settings["firstId"] = project.first_id
+    return settings
+
+def generate_mock_dataset(project):
+    """Generate the mock dataset of one project"""
+    settings = dataset_settings(project)
+    anchor = datetime.datetime.strptime(settings["anchor"], "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc)
+    return generate_dataset(project.issues, seed=project.seed, distributions=project.distributions,
+                            project=project.key, anchor=anchor, first_id=project.first_id)
+
+def load_partition(project):
+    """The store of one project: memory-mapped from its snapshot, or served from freshly generated columns"""
+    categories = {"status": project.values("status"), "priority": project.values("priority")}
+    if SNAPSHOT_PATH:
+        # Every project but a lone one gets a snapshot directory of its own
+        path = SNAPSHOT_PATH if len(PROJECTS) == 1 else os.path.join(SNAPSHOT_PATH, project.key)
+        return load_snapshot_store(path, dataset_settings(project), partial(generate_mock_dataset, project),
+                                   base_url, categories)
+    # Issues are served straight from the generated columns; JSON is built per response
+    return ColumnarIssueStore(generate_mock_dataset(project), base_url, categories)
 
 # Initialize data with the app context
 with app.app_context():
-    issues = generate_mock_issues(150)
-    logger.info(f"Initialized {len(issues)} mock Jira issues and their history")
+    settings = [dataset_settings(project) for project in PROJECTS]
+    dataset_version = make_etag(settings[0] if len(settings) == 1 else settings)
+    # One partition per project; a search only evaluates the projects its JQL can match
+    store = PartitionedIssueStore(PROJECTS, [load_partition(project) for project in PROJECTS])
+    metrics.gauge("dataset_issues", "Issues in the dataset", lambda: len(store))
+    metrics.gauge("dataset_histories", "Changelog histories in the dataset", store.history_count)
+    metrics.gauge("dataset_generation", "Changes applied to the dataset since it was loaded", lambda: store.generation)
+    metrics.gauge("json_cache_entries", "Pre-encoded issue bodies held in memory", store.cached_bodies)
+    metrics.gauge("compressed_cache_bytes", "Compressed response bytes cached", lambda: compressed_cache.size)
+    # The dataset lives for the whole process; keep it out of future garbage collections
+    gc.freeze()
+    logger.info(f"Initialized {len(store)} mock Jira issues and their history")
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,106 @@
+# ASGI entry point serving the same routes and dataset as the Flask app on an event loop.
+# Run with: uvicorn asgi_app:app --host 0.0.0.0 --port 8000 --workers 4
+import json
+import asyncio
+import logging
+from urllib.parse import parse_qsl
+
+from werkzeug.datastructures import Headers, MultiDict
+from werkzeug.exceptions import HTTPException
+
+import app as mock
+
+logger = logging.getLogger(__name__)
+
+# Flask's url_map already knows every route; werkzeug can match against it without Flask
+url_adapter = mock.app.url_map.bind("localhost")
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+def build_request(scope, body):
+    headers = Headers([(name.decode("latin-1"), value.decode("latin-1")) for name, value in scope["headers"]])
+    data = None
+    if body and "json" in headers.get("Content-Type", ""):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+    args = MultiDict(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True))
+    return mock.MockRequest(scope["method"], args, data, headers)
+
+
+def dispatch(req, path):
+    """Match path against the Flask routes and run the shared handler; returns (response, delay)"""
+    try:
+        endpoint, view_args = url_adapter.match(path, req.method)
+    except HTTPException as e:
+        return mock.json_response({"errorMessages": [e.description], "errors": {}}, e.code), 0.0
+    return mock.respond(endpoint, req, view_args)
+
+
+async def send_response(send, response):
+    headers = [(name.lower().encode("latin-1"), str(value).encode("latin-1"))
+               for name, value in response.headers.items()]
+    if "Content-Type" not in response.headers:
+        headers.append((b"content-type", b"application/json"))
+    body = response.body
+    if isinstance(body, bytes):
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": response.status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+        return
+    # Streamed bodies go out chunk by chunk; chunks are encoded off the loop, like the handlers
+    chunks = iter(body)
+    try:
+        await send({"type": "http.response.start", "status": response.status, "headers": headers})
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        # A client gone mid-stream still releases what the body holds (a profiling session, say)
+        close = getattr(body, "close", None)
+        if close is not None:
+            close()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            logger.info(f"ASGI app serving {len(mock.store)} mock Jira issues")
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI application"""
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+    body = await read_body(receive)
+    if body is None:
+        return
+    req = build_request(scope, body)
+    # Handlers are synchronous; run them on the default executor so a slow search never stalls the loop
+    response, delay = await asyncio.to_thread(dispatch, req, scope["path"])
+    # Simulated latency parks the request on the loop without holding a worker or CPU
+    if delay:
+        await asyncio.sleep(delay)
+    await send_response(send, response)
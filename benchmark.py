@@ -0,0 +1,374 @@
+# Benchmarks the mock server and the BAJiraHelper client against generated datasets.
+#
+#   python benchmark.py                              # 1k, 100k and 1M issues, default scenarios
+#   python benchmark.py --sizes 1000 --concurrency 1 8 --output results.json
+#   python benchmark.py --sizes 100000 --projects 20  # the same issues spread over 20 projects
+#   python benchmark.py --compare old.json new.json  # print the relative change of every metric
+#
+# Every run starts the server locally (gunicorn, like startup.sh, or uvicorn) on a snapshot of the
+# generated dataset, drives each scenario at each concurrency level and writes one JSON document
+# with the git commit, settings and a result row per (size, scenario, concurrency).
+import os
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import itertools
+import contextlib
+import subprocess
+import threading
+import importlib.util
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from jira_mock_config import Config, setup_logger
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PROJECT = "MOCK"
+TEAM = "Toasted Snow"
+
+# Scenario -> (path, query params); "{key}" is replaced by a random issue key per request
+SCENARIOS = {
+    "search": ("/rest/api/2/search", {"jql": f"project={PROJECT}", "maxResults": 100}),
+    "search_changelog": ("/rest/api/2/search", {"jql": f"project={PROJECT}", "maxResults": 100, "expand": "changelog"}),
+    "search_jql": ("/rest/api/2/search", {"jql": f'project={PROJECT} AND status in ("In Progress", "Code Review") '
+                                                 f'AND created >= -30d ORDER BY created DESC', "maxResults": 100}),
+    "issue": ("/rest/api/2/issue/{key}", {}),
+    "issue_changelog": ("/rest/api/2/issue/{key}", {"expand": "changelog"}),
+    "watchers": ("/rest/api/2/issue/{key}/watchers", {}),
+}
+DEFAULT_SCENARIOS = ["search", "search_changelog", "search_jql", "issue", "watchers"]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def process_tree(pid):
+    """pid and all its descendants"""
+    pids = [pid]
+    for current in pids:
+        try:
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pids += [int(child) for child in f.read().split()]
+        except OSError:
+            pass
+    return pids
+
+
+def memory_usage(pid):
+    """RSS and PSS (KB) summed over the server's process tree.
+
+    RSS counts the shared snapshot mapping once per worker; PSS splits it
+    between them, so PSS is the better estimate of total memory used.
+    """
+    rss = pss = 0
+    for current in process_tree(pid):
+        try:
+            with open(f"/proc/{current}/smaps_rollup") as f:
+                for line in f:
+                    name, value = line.split(":", 1)
+                    if name == "Rss":
+                        rss += int(value.split()[0])
+                    elif name == "Pss":
+                        pss += int(value.split()[0])
+        except OSError:
+            pass
+    return {"rssKb": rss, "pssKb": pss}
+
+
+def project_sizes(size, projects):
+    """(key, issues) of the projects a size-issue dataset is spread over.
+
+    The first project is PROJECT and the n-th has about 1/n of its issues,
+    so a few large projects sit next to many small ones as on a real site.
+    """
+    if projects == 1:
+        return [(PROJECT, size)]
+    weights = 1 / np.arange(1, projects + 1)
+    counts = np.maximum(1, (size * weights / weights.sum()).astype(int))
+    counts[0] += size - counts.sum()
+    return [(PROJECT if n == 0 else f"P{n + 1}", int(count)) for n, count in enumerate(counts)]
+
+
+class Server:
+    """The mock server running in a subprocess on a generated dataset"""
+
+    def __init__(self, projects, port, server, workers, snapshot_dir, seed):
+        self.url = f"http://127.0.0.1:{port}"
+        size = sum(count for _, count in projects)
+        name = f"snapshot-{size}" if len(projects) == 1 else f"snapshot-{size}-{len(projects)}p"
+        env = dict(os.environ, JIRA_MOCK_ISSUES=str(size), JIRA_MOCK_SEED=str(seed),
+                   JIRA_MOCK_SNAPSHOT=os.path.join(snapshot_dir, name))
+        env.pop("JIRA_MOCK_TRAFFIC", None)
+        env.pop("JIRA_MOCK_ACCESS_LOG", None)
+        env.pop("JIRA_MOCK_PROJECTS", None)
+        if len(projects) > 1:
+            env["JIRA_MOCK_PROJECTS"] = json.dumps([{"key": key, "issues": count} for key, count in projects])
+        if server == "gunicorn":
+            command = [sys.executable, "-m", "gunicorn", "--preload", "-w", str(workers), "-b", f"127.0.0.1:{port}",
+                       "app:app"]
+        else:
+            command = [sys.executable, "-m", "uvicorn", "asgi_app:app", "--host", "127.0.0.1", "--port", str(port),
+                       "--workers", str(workers), "--log-level", "warning"]
+        self.started = time.perf_counter()
+        self.process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+                                        stderr=subprocess.DEVNULL)
+
+    def wait_ready(self, timeout):
+        while time.perf_counter() - self.started < timeout:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {self.process.returncode}")
+            try:
+                if requests.get(f"{self.url}/healthcheck", timeout=1).status_code == 200:
+                    return time.perf_counter() - self.started
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"Server not ready after {timeout}s")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def summarize(latencies, errors, elapsed, received):
+    latencies = np.asarray(latencies) * 1000
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(count / elapsed, 1) if elapsed else None,
+        "p50Ms": round(float(np.percentile(latencies, 50)), 2) if count else None,
+        "p95Ms": round(float(np.percentile(latencies, 95)), 2) if count else None,
+        "p99Ms": round(float(np.percentile(latencies, 99)), 2) if count else None,
+        "maxMs": round(float(latencies.max()), 2) if count else None,
+        "mbReceived": round(received / 1e6, 2),
+    }
+
+
+def run_scenario(url, scenario, projects, concurrency, total, seed):
+    """Send total requests for scenario from concurrency threads, each with its own keep-alive session"""
+    path, params = SCENARIOS[scenario]
+    rng = random.Random(seed)
+    # Issues are requested uniformly across the whole dataset, so projects in proportion to their size
+    chosen = rng.choices(projects, weights=[count for _, count in projects], k=total)
+    keys = [f"{key}-{rng.randint(1, count)}" for key, count in chosen]
+    tickets = itertools.count()
+    latencies = []
+    counts = {"errors": 0, "bytes": 0}
+    lock = threading.Lock()
+
+    def worker():
+        session = requests.Session()
+        mine = []
+        errors = received = 0
+        while True:
+            i = next(tickets)
+            if i >= total:
+                break
+            target = url + path.replace("{key}", keys[i])
+            began = time.perf_counter()
+            try:
+                response = session.get(target, params=params, timeout=120)
+                received += len(response.content)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            mine.append(time.perf_counter() - began)
+            errors += not ok
+        with lock:
+            latencies.extend(mine)
+            counts["errors"] += errors
+            counts["bytes"] += received
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, counts["errors"], time.perf_counter() - began, counts["bytes"])
+
+
+def helper_config(url, chunk, project=PROJECT):
+    config = Config()
+    config.setParm("Jira.Server", url)
+    config.setParm("Jira.URL", f"{url}/rest/api/2/search")
+    config.setParm("Jira.Project", project)
+    config.setParm("Jira.Team", TEAM)
+    config.setParm("Jira.Chunk", chunk)
+    return config
+
+
+def run_helper(url, watcher_issues, chunk):
+    """Time the BAJiraHelper entry points end to end against the running server"""
+    from BAJiraHelper import BAJiraHelper
+
+    logger = setup_logger()
+    logger.setLevel("WARNING")
+    helper = BAJiraHelper(helper_config(url, chunk), logger)
+    start_date = (datetime.now() - timedelta(days=90)).strftime("%Y-%m-%d")
+    results = {}
+    # The helper prints every page it receives; keep that out of the timings' output
+    with contextlib.redirect_stdout(io.StringIO()):
+        began = time.perf_counter()
+        issues = helper.getIssuesCreatedAfterDF(start_date)
+        results["getIssuesCreatedAfterDF"] = {"seconds": round(time.perf_counter() - began, 3), "rows": len(issues)}
+        sample = issues.head(watcher_issues)
+        began = time.perf_counter()
+        watchers = helper.getWatchersDF(sample)
+        results["getWatchersDF"] = {"seconds": round(time.perf_counter() - began, 3), "rows": len(watchers),
+                                    "issues": len(sample)}
+        began = time.perf_counter()
+        history = helper.getAllIssueHistoryDF(start_date)
+        results["getAllIssueHistoryDF"] = {"seconds": round(time.perf_counter() - began, 3), "rows": len(history)}
+    return results
+
+
+def run_project_pulls(url, projects, chunk):
+    """Time getIssuesCreatedAfterDF for every project at once, one helper per project, as a multi-project job runs"""
+    from BAJiraHelper import BAJiraHelper
+
+    logger = setup_logger()
+    logger.setLevel("WARNING")
+    start_date = (datetime.now() - timedelta(days=90)).strftime("%Y-%m-%d")
+
+    def pull(project):
+        helper = BAJiraHelper(helper_config(url, chunk, project), logger)
+        began = time.perf_counter()
+        rows = len(helper.getIssuesCreatedAfterDF(start_date))
+        return rows, time.perf_counter() - began
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        began = time.perf_counter()
+        with ThreadPoolExecutor(len(projects)) as pool:
+            pulls = list(pool.map(pull, [key for key, _ in projects]))
+        elapsed = time.perf_counter() - began
+    return {"projectPulls": {"seconds": round(elapsed, 3), "rows": sum(rows for rows, _ in pulls),
+                             "projects": len(projects),
+                             "slowestProjectSeconds": round(max(seconds for _, seconds in pulls), 3)}}
+
+
+def benchmark(args):
+    server_kind = args.server
+    if server_kind == "auto":
+        server_kind = "gunicorn" if importlib.util.find_spec("gunicorn") else "uvicorn"
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "settings": {"server": server_kind, "workers": args.workers, "requests": args.requests,
+                     "seed": args.seed, "concurrency": args.concurrency, "scenarios": args.scenarios,
+                     "projects": args.projects},
+        "results": [],
+        "helper": [],
+    }
+    for size in args.sizes:
+        projects = project_sizes(size, args.projects)
+        server = Server(projects, args.port, server_kind, args.workers, args.snapshot_dir, args.seed)
+        try:
+            startup = server.wait_ready(args.startup_timeout)
+            memory = memory_usage(server.process.pid)
+            print(f"{size} issues: ready in {startup:.1f}s, RSS {memory['rssKb'] // 1024} MB, "
+                  f"PSS {memory['pssKb'] // 1024} MB", flush=True)
+            report["results"].append(dict({"size": size, "scenario": "startup", "concurrency": 0,
+                                           "seconds": round(startup, 3)}, **memory))
+            for scenario in args.scenarios:
+                # One untimed pass warms the encoded-issue caches, as a long-running server would be
+                run_scenario(server.url, scenario, projects, 1, min(args.requests, 20), args.seed)
+                for concurrency in args.concurrency:
+                    row = run_scenario(server.url, scenario, projects, concurrency, args.requests, args.seed)
+                    row.update(memory_usage(server.process.pid))
+                    row = dict({"size": size, "scenario": scenario, "concurrency": concurrency}, **row)
+                    report["results"].append(row)
+                    print(f"  {scenario:<17} c={concurrency:<3} {row['rps']:>8} req/s  p50 {row['p50Ms']}ms  "
+                          f"p95 {row['p95Ms']}ms  p99 {row['p99Ms']}ms  errors {row['errors']}", flush=True)
+            if size <= args.helper_limit:
+                helper = run_helper(server.url, args.watcher_issues, args.chunk)
+                if len(projects) > 1:
+                    helper.update(run_project_pulls(server.url, projects, args.chunk))
+                report["helper"].append({"size": size, "results": helper})
+                for name, result in helper.items():
+                    print(f"  {name:<24} {result['seconds']}s  {result['rows']} rows", flush=True)
+        finally:
+            server.stop()
+    return report
+
+
+def compare(old_path, new_path):
+    """Print the relative change of each metric between two result files"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    before = {(row["size"], row["scenario"], row["concurrency"]): row for row in old["results"]}
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    for row in new["results"]:
+        key = (row["size"], row["scenario"], row["concurrency"])
+        if key not in before:
+            continue
+        changes = []
+        for metric in ("rps", "p50Ms", "p99Ms", "pssKb", "seconds"):
+            if row.get(metric) and before[key].get(metric):
+                changes.append(f"{metric} {(row[metric] / before[key][metric] - 1) * 100:+.1f}%")
+        print(f"{key[0]:>8} {key[1]:<17} c={key[2]:<3} " + "  ".join(changes))
+    helper_before = {entry["size"]: entry["results"] for entry in old.get("helper", [])}
+    for entry in new.get("helper", []):
+        for name, result in entry["results"].items():
+            previous = helper_before.get(entry["size"], {}).get(name)
+            if previous and previous["seconds"]:
+                print(f"{entry['size']:>8} {name:<24} seconds {(result['seconds'] / previous['seconds'] - 1) * 100:+.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the mock Jira server and the BAJiraHelper client")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=DEFAULT_SCENARIOS)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--projects", type=int, default=1,
+                        help="spread each dataset over this many projects of decreasing size")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario and concurrency level")
+    parser.add_argument("--server", choices=["auto", "gunicorn", "uvicorn"], default="auto")
+    parser.add_argument("--workers", type=int, default=4)
+    # The server's URLs (watchers, changelog pages) point at localhost:5000, so the helper needs that port
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--snapshot-dir", default=os.path.join(ROOT, ".benchmark"))
+    parser.add_argument("--startup-timeout", type=float, default=600)
+    parser.add_argument("--helper-limit", type=int, default=100000,
+                        help="only time the BAJiraHelper functions for datasets up to this size")
+    parser.add_argument("--watcher-issues", type=int, default=200, help="issues passed to getWatchersDF")
+    parser.add_argument("--chunk", type=int, default=100, help="Jira.Chunk page size for the helper")
+    parser.add_argument("--output", default=None, help="results file (default benchmark-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    report = benchmark(args)
+    output = args.output or os.path.join(ROOT, f"benchmark-{report['commit'] or 'local'}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import json
+import time
+import itertools
+
+import numpy as np
+
+from jira_mock_generator import CATEGORY_COLUMNS, format_timestamp, format_timestamps
+from jira_mock_store import IssueStore, CHANGELOG_PAGE_SIZE, build_histories, changelog_page, join_issue
+from jira_mock_profile import phase
+
+
+def _encoded(value):
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def _member(name):
+    return json.dumps(name).encode() + b':'
+
+
+class _Field:
+    """Encodes one field of generated issues as "name":value members, for one position or an array of them"""
+
+    def __init__(self, one, many=None):
+        self.one = one
+        self.many = many or (lambda positions: [one(pos) for pos in positions.tolist()])
+
+
+def _constant(name, value):
+    fragment = _member(name) + _encoded(value)
+    return _Field(lambda pos: fragment, lambda positions: [fragment] * len(positions))
+
+
+def _category(name, codes, values):
+    table = [_member(name) + _encoded(value) for value in values]
+    return _Field(lambda pos: table[codes[pos]], lambda positions: [table[code] for code in codes[positions].tolist()])
+
+
+def _date(name, stamps):
+    prefix = _member(name) + b'"'
+    null = _member(name) + b'null'
+
+    def one(pos):
+        value = stamps[pos]
+        return null if value < 0 else prefix + format_timestamp(value).encode() + b'"'
+
+    def many(positions):
+        values = stamps[positions]
+        text = format_timestamps(np.maximum(values, 0)).tolist()
+        return [null if value < 0 else prefix + stamp.encode() + b'"' for value, stamp in zip(values.tolist(), text)]
+    return _Field(one, many)
+
+
+class ColumnarIssueStore(IssueStore):
+    """IssueStore serving a MockDataset's columns directly.
+
+    Issues are never held as dicts: each field of a response is taken from a
+    per-value table of pre-encoded fragments or formatted from a date column,
+    so an issue costs its column entries (tens of bytes) plus history rows.
+    Issues created or changed after loading are kept as dicts in an overlay,
+    and appended history next to the generated rows.
+    """
+
+    def __init__(self, dataset, base_url, categories=None, orders=None, modified=None):
+        self.dataset = dataset
+        self.base_url = base_url
+        self.key_prefix = f"{dataset.project}-"
+        self.first_id = dataset.first_id
+        self.count = len(dataset)
+        self.issues = None
+        self.issue_history = None
+        self.issue_changelogs = None
+        # position -> issue dict for issues created or replaced since loading
+        self.edited = {}
+        # key -> (flat rows, changelog histories) appended since loading
+        self.appended = {}
+        self.encoders = self.build_encoders()
+        self.head_format = b'{"id":"%d","key":' + _encoded(self.key_prefix)[:-1].replace(b'%', b'%%') + \
+            b'%d","fields":{'
+        self.init_state(categories, list(self.encoders), modified)
+        self.load_indexes(dataset.index_columns(), orders)
+        self.status_names = [_encoded(name) for name in dataset.categories["status"]]
+        self.user_names = [_encoded(name) for name in dataset.categories["user"]]
+
+    def build_encoders(self):
+        """field -> _Field encoding its "field":value members, in issue order"""
+        dataset = self.dataset
+        shared = {}
+        for column, (distribution, attribute) in CATEGORY_COLUMNS.items():
+            values = [{attribute: name} for name in dataset.categories[distribution]]
+            if column == "customfield_10045":
+                values = [[value] for value in values]
+            shared[column] = _category(column, dataset.codes[column], values)
+        watches = _member("watches") + b'{"self":' + \
+            _encoded(f"{self.base_url}/rest/api/2/issue/{self.key_prefix}")[:-1].replace(b'%', b'%%') + \
+            b'%d/watchers"}'
+        summary = _member("summary") + b'"Mock issue '
+        description = _member("description") + b'"This is a detailed description for mock issue '
+        # Same fields in the same order as MockDataset.to_issues
+        return {
+            "project": _constant("project", {"name": dataset.project}),
+            "customfield_10001": shared["customfield_10001"],
+            "created": _date("created", dataset.created),
+            "updated": _date("updated", dataset.updated),
+            "creator": shared["creator"],
+            "reporter": shared["reporter"],
+            "assignee": shared["assignee"],
+            "status": shared["status"],
+            "priority": shared["priority"],
+            "customfield_10078": shared["customfield_10078"],
+            "summary": _Field(lambda pos: summary + b'%d for testing"' % (pos + 1)),
+            "description": _Field(lambda pos: description + b'%d"' % (pos + 1)),
+            "customfield_10046": shared["customfield_10046"],
+            "customfield_10045": shared["customfield_10045"],
+            "duedate": _date("duedate", dataset.due),
+            "watches": _Field(lambda pos: watches % (pos + 1)),
+        }
+
+    def __len__(self):
+        return self.count
+
+    def rebuild_indexes(self):
+        self.load_indexes(self.dataset.index_columns())
+        if self.edited:
+            self.publish(sorted(self.edited))
+
+    def position(self, key):
+        # Keys are <project>-<n> for position n - 1, so no key map is needed
+        if not key.startswith(self.key_prefix):
+            return None
+        number = key[len(self.key_prefix):]
+        if not number.isdigit() or not 0 < int(number) <= len(self):
+            return None
+        return int(number) - 1
+
+    def key_at(self, pos):
+        return f"{self.key_prefix}{pos + 1}"
+
+    def issue_at(self, pos):
+        issue = self.edited.get(pos)
+        return json.loads(self.encode_issue(pos)) if issue is None else issue
+
+    def set_issue(self, pos, issue):
+        self.edited[pos] = issue
+
+    def issue_head(self, pos):
+        return self.head_format % (self.first_id + pos, pos + 1)
+
+    def encode_issue(self, pos):
+        issue = self.edited.get(pos)
+        if issue is not None:
+            return _encoded(issue)
+        return join_issue(self.issue_head(pos), [field.one(pos) for field in self.encoders.values()])
+
+    def project_issue(self, pos, fields):
+        if pos in self.edited:
+            return super().project_issue(pos, fields)
+        encoders = self.encoders
+        return join_issue(self.issue_head(pos), [encoders[name].one(pos) for name in fields if name in encoders])
+
+    def issue_json_at(self, pos, changelog=False, fields=None):
+        # Built per response from the columns; caching the bytes would cost the memory the columns save
+        body = self.encode_issue(pos) if fields is None else self.project_issue(pos, fields)
+        if changelog:
+            body = body[:-1] + b',"changelog":' + self.encode_changelog(pos) + b'}'
+        return body
+
+    def issues_json(self, positions, changelog=False, fields=None):
+        """Encoded JSON of the issues at positions, in order, with each field encoded for all of them at once"""
+        positions = np.asarray(positions, dtype=np.int64)
+        bodies = [None] * len(positions)
+        if not self.edited and (not len(positions) or positions.max() < len(self.dataset)):
+            generated = range(len(positions))
+        else:
+            generated = []
+            for idx, pos in enumerate(positions.tolist()):
+                if pos < len(self.dataset) and pos not in self.edited:
+                    generated.append(idx)
+                else:
+                    bodies[idx] = self.issue_json_at(pos, changelog, fields)
+            if not generated:
+                return bodies
+        chosen = positions if len(generated) == len(positions) else positions[generated]
+        names = self.encoders if fields is None else [name for name in fields if name in self.encoders]
+        columns = [self.encoders[name].many(chosen) for name in names]
+        rows = zip(*columns) if columns else [()] * len(chosen)
+        for idx, pos, row in zip(generated, chosen.tolist(), rows):
+            body = join_issue(self.issue_head(pos), row)
+            if changelog:
+                body = body[:-1] + b',"changelog":' + self.encode_changelog(pos) + b'}'
+            bodies[idx] = body
+        return bodies
+
+    def history_bounds(self, pos):
+        """Generated history rows of the issue at pos (none for issues created since loading)"""
+        if pos >= len(self.dataset):
+            return 0, 0
+        first, last = self.dataset.history_offsets[pos:pos + 2].tolist()
+        return first, last
+
+    def history_count(self):
+        return int(self.dataset.history_offsets[-1]) + sum(len(rows) for rows, _ in self.appended.values())
+
+    def changelog(self, key, start_at=0, max_results=CHANGELOG_PAGE_SIZE):
+        pos = self.position(key)
+        if pos is None:
+            return changelog_page([], start_at, max_results, 0)
+        first, last = self.history_bounds(pos)
+        appended = self.appended.get(key, ((), []))[1]
+        histories = []
+        if start_at < last - first:
+            start = first + start_at
+            rows = self.dataset.history_rows(key, start, min(start + max_results, last))
+            histories = build_histories(rows, itertools.count(self.first_id + start), start_at)
+        skip = max(0, start_at - (last - first))
+        histories += appended[skip:skip + max_results - len(histories)]
+        return changelog_page(histories, start_at, max_results, last - first + len(appended))
+
+    def encode_changelog(self, pos):
+        with phase("changelog"):
+            key = self.key_at(pos)
+            if key in self.appended or pos >= len(self.dataset):
+                return _encoded(self.changelog(key))
+            # Formatted straight from the history columns; the same bytes as encoding build_histories' dicts
+            first, last = self.history_bounds(pos)
+            stop = min(last, first + CHANGELOG_PAGE_SIZE)
+            dataset = self.dataset
+            statuses = self.status_names
+            users = self.user_names
+            histories = [
+                b'{"id":"%d","author":{"displayName":%s},"created":"%s","items":[{"field":"status",'
+                b'"fieldtype":"jira","from":"%d","fromString":%s,"to":"%d","toString":%s}]}'
+                % (self.first_id + row, users[author], format_timestamp(created).encode(), row - first,
+                   statuses[from_status], row - first + 1, statuses[to_status])
+                for row, author, created, from_status, to_status in zip(
+                    range(first, stop), dataset.history_authors[first:stop].tolist(),
+                    dataset.history_created[first:stop].tolist(), dataset.history_from[first:stop].tolist(),
+                    dataset.history_to[first:stop].tolist())]
+            return b'{"startAt":0,"maxResults":%d,"total":%d,"histories":[%s]}' % (
+                stop - first, last - first, b','.join(histories))
+
+    def add_issues(self, issues):
+        with self.write_lock:
+            start = len(self)
+            positions = list(range(start, start + len(issues)))
+            for pos, issue in zip(positions, issues):
+                self.edited[pos] = issue
+            # Counted only once the issues are in place, so their keys never resolve to nothing
+            self.count += len(issues)
+            self.add_field_names(issues)
+            self.publish(positions)
+            self.generation += 1
+            self.modified = time.time()
+            return positions
+
+    def extended_history(self, key, changes):
+        if self.next_history_id is None:
+            self.next_history_id = self.first_id + self.history_count()
+        first, last = self.history_bounds(self.position(key))
+        rows, histories = self.appended.get(key, ([], []))
+        added = build_histories(changes, itertools.count(self.next_history_id), last - first + len(rows))
+        self.next_history_id += len(changes)
+        return rows + changes, histories + added
+
+    def set_history(self, key, history):
+        self.appended[key] = history
@@ -0,0 +1,136 @@
+import json
+import time
+import base64
+import hashlib
+import hmac
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+
+class TokenError(ValueError):
+    """A nextPageToken that is malformed or was issued for a different query"""
+
+
+def query_digest(*parts):
+    """Short digest of the parts of a query a token is only valid for"""
+    return hashlib.sha1(json.dumps(parts, separators=(",", ":")).encode()).hexdigest()[:16]
+
+
+def sign(secret, fields):
+    return hmac.new(secret, json.dumps(fields, separators=(",", ":")).encode(), hashlib.sha256).hexdigest()[:16]
+
+
+def encode_token(cursor, offset, last, digest, secret=b""):
+    # offset is where the next page starts; last is the position of the last issue already served.
+    # The token carries all a worker needs to resume the search, signed so that it can trust it
+    fields = [cursor, offset, last, digest]
+    raw = json.dumps(fields + [sign(secret, fields)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_token(token, digest, secret=b""):
+    """(cursor, offset, last) from a token; raises TokenError unless it is well formed, signed with secret and
+    issued for digest"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        cursor, offset, last, issued_for, signature = json.loads(raw)
+        valid = hmac.compare_digest(signature, sign(secret, [cursor, offset, last, issued_for]))
+        offset, last = int(offset), int(last)
+    except (ValueError, TypeError):
+        raise TokenError("The nextPageToken is not valid.") from None
+    if not valid:
+        raise TokenError("The nextPageToken is not valid.")
+    if issued_for != digest or offset < 0:
+        raise TokenError("The nextPageToken does not belong to this query.")
+    return cursor, offset, last
+
+
+class SearchCursors:
+    """Result lists of token-paginated searches, kept from their first page to their last.
+
+    A cursor pins the positions a search matched when its first page was
+    served, so each later page is a slice of the same list: it costs the page
+    and not the search, and the pull sees one consistent result however the
+    data changes meanwhile (bodies are still the latest, as with offset
+    paging). Cursors are dropped after their last page, after ttl seconds
+    unused, or least recently used first beyond max_bytes. A token whose
+    cursor is gone (expired, or opened by another worker process) resumes
+    from a fresh search, after the last issue it served, and reopens the
+    cursor under its id so that worker serves the following pages from it.
+    Tokens are signed with secret, which every worker must share.
+    """
+
+    def __init__(self, max_bytes, ttl, secret=b""):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.secret = secret
+        # cursor -> (positions, last used)
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def open(self, positions, cursor=None):
+        cursor = cursor or uuid.uuid4().hex[:16]
+        with self.lock:
+            # Two pages of one pull resumed at once reopen the same cursor
+            replaced = self.entries.pop(cursor, None)
+            if replaced is not None:
+                self.size -= replaced[0].nbytes
+            self.entries[cursor] = (positions, time.monotonic())
+            self.size += positions.nbytes
+            self.evict()
+        return cursor
+
+    def get(self, cursor):
+        with self.lock:
+            self.evict()
+            entry = self.entries.get(cursor)
+            if entry is None:
+                return None
+            self.entries[cursor] = (entry[0], time.monotonic())
+            self.entries.move_to_end(cursor)
+            return entry[0]
+
+    def close(self, cursor):
+        with self.lock:
+            entry = self.entries.pop(cursor, None)
+            if entry is not None:
+                self.size -= entry[0].nbytes
+
+    def evict(self):
+        # Called with the lock held. Entries are in order of last use, so expired ones are at the front
+        expired = time.monotonic() - self.ttl
+        while self.entries and (self.size > self.max_bytes or next(iter(self.entries.values()))[1] < expired):
+            _, (positions, _) = self.entries.popitem(last=False)
+            self.size -= positions.nbytes
+
+    def page(self, token, digest, max_results, search):
+        """The positions of one page and the token of the next (None on the last page).
+
+        token is None for the first page, which runs search() and opens a
+        cursor on its result; later pages slice the cursor.
+        """
+        if token is None:
+            matches = search()
+            cursor, offset = self.open(matches), 0
+        else:
+            cursor, offset, last = decode_token(token, digest, self.secret)
+            matches = self.get(cursor)
+            if matches is None:
+                matches = search()
+                served = np.flatnonzero(matches == last)
+                # The last issue served no longer matches: fall back to the offset
+                offset = int(served[0]) + 1 if len(served) else min(offset, len(matches))
+                cursor = self.open(matches, cursor)
+        page = matches[offset:offset + max_results]
+        end = offset + len(page)
+        if end >= len(matches):
+            self.close(cursor)
+            return page, None
+        return page, encode_token(cursor, end, int(page[-1]), digest, self.secret)
@@ -0,0 +1,275 @@
+import gc
+import time
+import datetime
+import itertools
+
+import numpy as np
+
+from jira_mock_store import build_histories
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+# Field distributions: lists are drawn uniformly, {value: weight} dicts by weight
+DEFAULT_DISTRIBUTIONS = {
+    "status": ["To Do", "In Progress", "Code Review", "Testing", "Done"],
+    "priority": ["High", "Medium", "Low"],
+    "category": ["Bug", "Feature", "Task", "Improvement"],
+    "group": ["Frontend", "Backend", "Infrastructure", "Design"],
+    "site": ["Site A", "Site B", "Site C"],
+    "user": ["John Doe", "Jane Smith", "Bob Johnson", "Alice Brown", "Charlie Wilson"],
+    "created_days": 90,      # issues are created within this many days before the anchor
+    "due_probability": 0.5,  # share of issues with a due date
+    "due_days": 30,          # due dates fall within this many days after the anchor
+    "max_changes": 5,        # status changes per issue are drawn from 0..max_changes
+}
+
+# Dataset column -> (distribution it is drawn from, attribute holding the value in the issue)
+CATEGORY_COLUMNS = {
+    "customfield_10001": ("team", "name"),
+    "status": ("status", "name"),
+    "priority": ("priority", "name"),
+    "assignee": ("user", "displayName"),
+    "reporter": ("user", "displayName"),
+    "creator": ("user", "displayName"),
+    "customfield_10078": ("category", "value"),
+    "customfield_10046": ("group", "value"),
+    "customfield_10045": ("site", "value"),
+}
+
+
+def _values_and_weights(distribution):
+    if isinstance(distribution, dict):
+        values = list(distribution)
+        weights = np.array([distribution[value] for value in values], dtype=np.float64)
+        return values, weights / weights.sum()
+    return list(distribution), None
+
+
+def format_timestamps(epoch_ms):
+    """Format epoch ms as Jira timestamps ("2024-01-31T10:00:00.000000+0000") in one batch"""
+    text = np.datetime_as_string(np.asarray(epoch_ms).astype("datetime64[ms]"), unit="us")
+    return np.char.add(text, "+0000")
+
+
+# Day number -> "YYYY-MM-DDT"; datasets span a few hundred days, so this stays small
+_day_strings = {}
+# Lookup tables beat per-call number formatting by several times
+_TWO_DIGITS = [f"{value:02d}" for value in range(60)]
+_MILLIS = [f".{value:03d}000+0000" for value in range(1000)]
+
+
+def format_timestamp(epoch_ms):
+    """Format one epoch ms value exactly as format_timestamps does, without the array overhead"""
+    days, ms = divmod(int(epoch_ms), DAY_MS)
+    day = _day_strings.get(days)
+    if day is None:
+        day = _day_strings[days] = time.strftime("%Y-%m-%dT", time.gmtime(days * 86400))
+    seconds, ms = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return day + _TWO_DIGITS[hours] + ":" + _TWO_DIGITS[minutes] + ":" + _TWO_DIGITS[seconds] + _MILLIS[ms]
+
+
+class MockDataset:
+    """Column-oriented mock issues and status history.
+
+    Categorical columns hold int codes into categories[distribution], dates
+    are epoch ms, and history rows for issue i live in
+    history_*[history_offsets[i]:history_offsets[i + 1]]. Issue i has id
+    first_id + i and history row r has id first_id + r, so datasets of
+    different projects can be given id ranges that never overlap.
+    """
+
+    def __init__(self, project, categories, codes, created, updated, due, history_offsets,
+                 history_authors, history_from, history_to, history_created, first_id=10000):
+        self.project = project
+        self.first_id = first_id
+        self.categories = categories
+        self.codes = codes
+        self.created = created
+        self.updated = updated
+        self.due = due
+        self.history_offsets = history_offsets
+        self.history_authors = history_authors
+        self.history_from = history_from
+        self.history_to = history_to
+        self.history_created = history_created
+
+    def __len__(self):
+        return len(self.created)
+
+    def keys(self, start=0, stop=None):
+        stop = len(self) if stop is None else stop
+        return [f"{self.project}-{i + 1}" for i in range(start, stop)]
+
+    def index_columns(self):
+        """Return the columns an IssueStore can index without walking issue dicts"""
+        count = len(self)
+        columns = {
+            "project": (np.zeros(count, dtype=np.int32), [self.project]),
+            "created": (self.created, np.zeros(count, dtype=bool)),
+            "updated": (self.updated, np.zeros(count, dtype=bool)),
+            "duedate": (np.where(self.due < 0, 0, self.due), self.due < 0),
+        }
+        for column, (distribution, _) in CATEGORY_COLUMNS.items():
+            columns[column] = (self.codes[column], self.categories[distribution])
+        return columns
+
+    def history_rows(self, key, start_row, stop_row):
+        """Return flat status history rows (Key/Author/DateTime/FromStatus/ToStatus) for a range of history rows"""
+        users = self.categories["user"]
+        statuses = self.categories["status"]
+        changed = format_timestamps(self.history_created[start_row:stop_row]).tolist()
+        return [{
+            "Key": key,
+            "Author": users[author],
+            "DateTime": changed[row],
+            "FromStatus": statuses[from_status],
+            "ToStatus": statuses[to_status]
+        } for row, (author, from_status, to_status) in enumerate(zip(
+            self.history_authors[start_row:stop_row].tolist(),
+            self.history_from[start_row:stop_row].tolist(),
+            self.history_to[start_row:stop_row].tolist()))]
+
+    def to_issues(self, base_url, start=0, stop=None):
+        """Materialize Jira-shaped issues, flat status history rows and changelog histories.
+
+        Only issues start..stop are built, so large datasets can be processed in
+        slices. Dicts for categorical values are shared between issues; nothing
+        in the store mutates issues in place, so sharing them is safe.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        keys = self.keys(start, stop)
+        created = format_timestamps(self.created[start:stop]).tolist()
+        updated = format_timestamps(self.updated[start:stop]).tolist()
+        due_ms = self.due[start:stop]
+        due = np.where(due_ms < 0, None, format_timestamps(np.maximum(due_ms, 0))).tolist()
+        shared = {}
+        for column, (distribution, attribute) in CATEGORY_COLUMNS.items():
+            values = [{attribute: name} for name in self.categories[distribution]]
+            if column == "customfield_10045":
+                values = [[value] for value in values]
+            shared[column] = [values[code] for code in self.codes[column][start:stop].tolist()]
+        project = {"name": self.project}
+
+        # Millions of new containers would otherwise trigger repeated full collections
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            issues = []
+            for i, key in enumerate(keys):
+                number = start + i + 1
+                issues.append({
+                    "id": str(self.first_id + number - 1),
+                    "key": key,
+                    "fields": {
+                        "project": project,
+                        "customfield_10001": shared["customfield_10001"][i],
+                        "created": created[i],
+                        "updated": updated[i],
+                        "creator": shared["creator"][i],
+                        "reporter": shared["reporter"][i],
+                        "assignee": shared["assignee"][i],
+                        "status": shared["status"][i],
+                        "priority": shared["priority"][i],
+                        "customfield_10078": shared["customfield_10078"][i],
+                        "summary": f"Mock issue {number} for testing",
+                        "description": f"This is a detailed description for mock issue {number}",
+                        "customfield_10046": shared["customfield_10046"][i],
+                        "customfield_10045": shared["customfield_10045"][i],
+                        "duedate": due[i],
+                        "watches": {"self": f"{base_url}/rest/api/2/issue/{key}/watchers"}
+                    }
+                })
+
+            offsets = self.history_offsets[start:stop + 1].tolist()
+            rows = self.history_rows(None, offsets[0], offsets[-1])
+            issue_history = {}
+            issue_changelogs = {}
+            # History ids are first_id + the global history row, so every slice agrees
+            history_ids = itertools.count(self.first_id + offsets[0])
+            for i, key in enumerate(keys):
+                history = rows[offsets[i] - offsets[0]:offsets[i + 1] - offsets[0]]
+                for row in history:
+                    row["Key"] = key
+                issue_history[key] = history
+                issue_changelogs[key] = build_histories(history, history_ids)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return issues, issue_history, issue_changelogs
+
+
+def generate_dataset(count, seed=None, distributions=None, project="MOCK", team="Toasted Snow", anchor=None,
+                     first_id=10000):
+    """Generate count issues with every random column drawn in bulk.
+
+    The result depends only on (count, seed, distributions, project, team,
+    anchor, first_id); anchor is the "now" dates are drawn back from and
+    defaults to the start of the current UTC day. Issues belong to team unless
+    distributions has a "team" distribution to draw teams from.
+    """
+    settings = dict(DEFAULT_DISTRIBUTIONS, team=[team])
+    settings.update(distributions or {})
+    if anchor is None:
+        anchor = datetime.datetime.now(datetime.timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    anchor_ms = int(anchor.timestamp() * 1000)
+    rng = np.random.default_rng(seed)
+
+    categories = {}
+    weights = {}
+    for name in ("status", "priority", "category", "group", "site", "user", "team"):
+        categories[name], weights[name] = _values_and_weights(settings[name])
+    codes = {column: rng.choice(len(categories[distribution]), size=count, p=weights[distribution]).astype(np.int32)
+             for column, (distribution, _) in CATEGORY_COLUMNS.items() if distribution != "team"}
+
+    created = anchor_ms - rng.integers(0, settings["created_days"] * DAY_MS, size=count, dtype=np.int64)
+    age_days = (anchor_ms - created) // DAY_MS
+    has_due = rng.random(count) < settings["due_probability"]
+    due_offsets = (age_days + rng.integers(0, settings["due_days"] + 1, size=count)) * DAY_MS
+    due = np.where(has_due, created + due_offsets, -1)
+
+    # History: every issue starts in the first status and moves to a different status at each change
+    lengths = rng.integers(0, settings["max_changes"] + 1, size=count)
+    history_offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(lengths, out=history_offsets[1:])
+    total = int(history_offsets[-1])
+    owners = np.repeat(np.arange(count), lengths)
+    steps = np.arange(total) - history_offsets[owners]
+    status_count = len(categories["status"])
+    shifts = rng.integers(1, status_count, size=total) if status_count > 1 else np.zeros(total, dtype=np.int64)
+    history_from = np.empty(total, dtype=np.int32)
+    history_to = np.empty(total, dtype=np.int32)
+    current = np.zeros(count, dtype=np.int64)
+    for step in range(int(lengths.max(initial=0))):
+        rows = np.flatnonzero(steps == step)
+        issues_at_step = owners[rows]
+        history_from[rows] = current[issues_at_step]
+        current[issues_at_step] = (current[issues_at_step] + shifts[rows]) % status_count
+        history_to[rows] = current[issues_at_step]
+    # An issue with history is in the status its last change moved it to
+    has_history = lengths > 0
+    codes["status"][has_history] = current[has_history]
+    history_authors = rng.choice(len(categories["user"]), size=total, p=weights["user"]).astype(np.int32)
+    # Change times fall between creation and the anchor, in chronological order per issue.
+    # Normalised cumulative exponential gaps give sorted uniform times without sorting.
+    gaps = rng.exponential(size=total + count)
+    sums = np.concatenate(([0.0], np.cumsum(gaps)))
+    gap_offsets = history_offsets + np.arange(count + 1)
+    starts = sums[gap_offsets[:-1]]
+    widths = sums[gap_offsets[1:]] - starts
+    fractions = (sums[gap_offsets[owners] + steps + 1] - starts[owners]) / widths[owners]
+    history_created = created[owners] + (fractions * (anchor_ms - created[owners])).astype(np.int64)
+    # An issue was last updated by its latest status change, or when it was created
+    updated = created.copy()
+    updated[has_history] = history_created[history_offsets[1:][has_history] - 1]
+
+    # Teams are drawn last, so a seed gives the same issues whether or not teams are configured
+    if len(categories["team"]) > 1:
+        codes["customfield_10001"] = rng.choice(len(categories["team"]), size=count,
+                                                p=weights["team"]).astype(np.int32)
+    else:
+        codes["customfield_10001"] = np.zeros(count, dtype=np.int32)
+
+    return MockDataset(project, categories, codes, created, updated, due, history_offsets,
+                       history_authors, history_from, history_to, history_created, first_id)
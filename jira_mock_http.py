@@ -0,0 +1,153 @@
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+from jira_mock_profile import phase
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip is offered
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed; the headers would outweigh the saving
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def make_etag(*parts):
+    """Strong ETag for a response determined entirely by parts (dataset version, query, ...)"""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def encoded_etag(etag, encoding):
+    """ETag of the compressed representation; the same content under another encoding gets another tag"""
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _strip_etag(tag):
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    if "-" in tag:
+        tag = tag.rsplit("-", 1)[0] + '"'
+    return tag
+
+
+def http_date(timestamp):
+    return formatdate(timestamp, usegmt=True)
+
+
+def not_modified(headers, etag, modified):
+    """Whether a conditional request's validators still match etag / modified (epoch seconds).
+
+    If-None-Match wins over If-Modified-Since, as in RFC 9110.
+    """
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match:
+        if if_none_match.strip() == "*":
+            return True
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        # Weak comparison: a W/ prefix added by a proxy or an encoding suffix from encoded_etag still matches
+        return any(_strip_etag(tag) == etag for tag in candidates)
+    if_modified_since = headers.get("If-Modified-Since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(modified) <= since
+    return False
+
+
+def choose_encoding(accept_encoding):
+    """Pick br or gzip from an Accept-Encoding header, or None for identity"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def _compressor(encoding):
+    if encoding == "br":
+        return brotli.Compressor(quality=BROTLI_QUALITY)
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    compressor = _compressor(encoding)
+    return compressor.compress(body) + compressor.flush()
+
+
+def compress_stream(chunks, encoding, on_complete=None):
+    """Compress an iterable of chunks on the fly; on_complete gets the whole compressed body at the end"""
+    compressor = _compressor(encoding)
+    # brotli's Compressor has process/finish, zlib's compressobj compress/flush
+    feed = compressor.process if encoding == "br" else compressor.compress
+    finish = compressor.finish if encoding == "br" else compressor.flush
+    produced = [] if on_complete else None
+    for chunk in chunks:
+        with phase("compression"):
+            data = feed(chunk)
+        if data:
+            if produced is not None:
+                produced.append(data)
+            yield data
+    with phase("compression"):
+        data = finish()
+    if produced is not None:
+        produced.append(data)
+        on_complete(b"".join(produced))
+    yield data
+
+
+class CompressedCache:
+    """LRU of compressed bodies keyed by (etag, encoding), bounded by total bytes.
+
+    Repeat polls of a hot page then cost a dict lookup instead of a compression.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes // 4:
+            return
+        with self.lock:
+            if key in self.entries:
+                return
+            self.entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
@@ -0,0 +1,387 @@
+import re
+import datetime
+from collections import namedtuple
+
+import numpy as np
+
+# Parsed query tree
+Query = namedtuple("Query", ["where", "order_by"])
+Clause = namedtuple("Clause", ["field", "op", "values"])
+And = namedtuple("And", ["children"])
+Or = namedtuple("Or", ["children"])
+Not = namedtuple("Not", ["child"])
+SortKey = namedtuple("SortKey", ["field", "descending"])
+
+# Tokens are (kind, text); kind is one of word, string, op, lparen, rparen, comma
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<op>!=|>=|<=|=|>|<|!~|~)
+      | (?P<lparen>\()
+      | (?P<rparen>\))
+      | (?P<comma>,)
+      | (?P<word>[^\s=!<>~(),"']+(?:\(\))?)
+    )""", re.VERBOSE)
+
+_RELATIVE_RE = re.compile(r"^([+-]?)(\d+)([wdhm])$")
+_RELATIVE_UNITS = {"w": "weeks", "d": "days", "h": "hours", "m": "minutes"}
+_DATE_FORMATS = ["%Y-%m-%d %H:%M", "%Y/%m/%d %H:%M", "%Y-%m-%d", "%Y/%m/%d"]
+
+
+class JQLError(ValueError):
+    """Raised for JQL that cannot be parsed or refers to unknown fields"""
+
+
+def _tokenize(jql):
+    tokens = []
+    pos = 0
+    jql = jql.rstrip()
+    while pos < len(jql):
+        match = _TOKEN_RE.match(jql, pos)
+        if not match or match.end() == pos:
+            raise JQLError(f"Error in the JQL Query: unexpected character at position {pos}")
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "string":
+            text = re.sub(r"\\(.)", r"\1", text[1:-1])
+        tokens.append((kind, text))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, jql):
+        self.tokens = _tokenize(jql)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def next(self):
+        token = self.peek()
+        if token[0] is None:
+            raise JQLError("Error in the JQL Query: the query ended unexpectedly")
+        self.pos += 1
+        return token
+
+    def at_keyword(self, *keywords):
+        kind, text = self.peek()
+        return kind == "word" and text.lower() in keywords
+
+    def expect_keyword(self, keyword):
+        if not self.at_keyword(keyword):
+            raise JQLError(f"Error in the JQL Query: expecting '{keyword.upper()}' but got '{self.peek()[1]}'")
+        self.pos += 1
+
+    def parse(self):
+        where = None
+        if self.peek()[0] is not None and not self.at_keyword("order"):
+            where = self.parse_or()
+        order_by = []
+        if self.at_keyword("order"):
+            self.pos += 1
+            self.expect_keyword("by")
+            while True:
+                field = self.parse_field()
+                descending = False
+                if self.at_keyword("asc", "desc"):
+                    descending = self.next()[1].lower() == "desc"
+                order_by.append(SortKey(field, descending))
+                if self.peek()[0] != "comma":
+                    break
+                self.pos += 1
+        if self.peek()[0] is not None:
+            raise JQLError(f"Error in the JQL Query: unexpected '{self.peek()[1]}'")
+        return Query(where, order_by)
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.at_keyword("or"):
+            self.pos += 1
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while self.at_keyword("and"):
+            self.pos += 1
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else And(children)
+
+    def parse_not(self):
+        if self.at_keyword("not"):
+            self.pos += 1
+            return Not(self.parse_not())
+        if self.peek()[0] == "lparen":
+            self.pos += 1
+            node = self.parse_or()
+            if self.next()[0] != "rparen":
+                raise JQLError("Error in the JQL Query: expecting ')'")
+            return node
+        return self.parse_clause()
+
+    def parse_field(self):
+        kind, text = self.next()
+        if kind not in ("word", "string"):
+            raise JQLError(f"Error in the JQL Query: expecting a field name but got '{text}'")
+        return text
+
+    def parse_value(self):
+        kind, text = self.next()
+        if kind not in ("word", "string"):
+            raise JQLError(f"Error in the JQL Query: expecting a value but got '{text}'")
+        return text
+
+    def parse_clause(self):
+        field = self.parse_field()
+        kind, text = self.peek()
+        if kind == "op":
+            self.pos += 1
+            return Clause(field, text, [self.parse_value()])
+        if self.at_keyword("in", "not", "is"):
+            keyword = self.next()[1].lower()
+            if keyword == "is":
+                op = "is"
+                if self.at_keyword("not"):
+                    self.pos += 1
+                    op = "is not"
+                if not self.at_keyword("empty", "null"):
+                    raise JQLError("Error in the JQL Query: expecting EMPTY or NULL after IS")
+                self.pos += 1
+                return Clause(field, op, [])
+            op = "in"
+            if keyword == "not":
+                self.expect_keyword("in")
+                op = "not in"
+            if self.next()[0] != "lparen":
+                raise JQLError(f"Error in the JQL Query: expecting '(' after {op.upper()}")
+            values = [self.parse_value()]
+            while self.peek()[0] == "comma":
+                self.pos += 1
+                values.append(self.parse_value())
+            if self.next()[0] != "rparen":
+                raise JQLError("Error in the JQL Query: expecting ')'")
+            return Clause(field, op, values)
+        raise JQLError(f"Error in the JQL Query: expecting an operator after '{field}' but got '{text}'")
+
+
+def parse_jql(jql):
+    """Parse a JQL string into a Query of Clause/And/Or/Not nodes"""
+    return _Parser(jql or "").parse()
+
+
+def parse_jql_date(value, now=None):
+    """Convert a JQL date literal ("2024-01-31", "2024/01/31 10:00", "-30d", "now()") to epoch ms (UTC)"""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    text = value.strip()
+    lowered = text.lower()
+    if lowered in ("now()", "now"):
+        return int(now.timestamp() * 1000)
+    if lowered == "startofday()":
+        return int(now.replace(hour=0, minute=0, second=0, microsecond=0).timestamp() * 1000)
+    match = _RELATIVE_RE.match(lowered)
+    if match:
+        sign, amount, unit = match.groups()
+        delta = datetime.timedelta(**{_RELATIVE_UNITS[unit]: int(amount)})
+        return int((now - delta if sign == "-" else now + delta).timestamp() * 1000)
+    for fmt in _DATE_FORMATS:
+        try:
+            parsed = datetime.datetime.strptime(text, fmt).replace(tzinfo=datetime.timezone.utc)
+            return int(parsed.timestamp() * 1000)
+        except ValueError:
+            continue
+    raise JQLError(f"Date value '{value}' for JQL is invalid. Valid formats include: 'yyyy/MM/dd HH:mm', "
+                   f"'yyyy-MM-dd HH:mm', 'yyyy/MM/dd', 'yyyy-MM-dd', or a period format e.g. '-5d'.")
+
+
+def is_relative_date(value):
+    """Whether a JQL date literal depends on when the query runs ("-30d", "now()", "startOfDay()")"""
+    lowered = value.strip().lower()
+    return lowered in ("now()", "now", "startofday()") or bool(_RELATIVE_RE.match(lowered))
+
+
+def _clauses(node):
+    if isinstance(node, Clause):
+        yield node
+    elif isinstance(node, (And, Or)):
+        for child in node.children:
+            yield from _clauses(child)
+    elif isinstance(node, Not):
+        yield from _clauses(node.child)
+
+
+def query_clock(query, now=None):
+    """The time a parsed query's relative dates resolve against, truncated to the minute; None when it has none.
+
+    Results of such a query change as time passes, so this belongs in
+    anything a result is cached under, and the search is evaluated at the
+    same instant so the result matches its tag. Minutes are the resolution
+    of JQL dates.
+    """
+    if not any(is_relative_date(value) for clause in _clauses(query.where) for value in clause.values):
+        return None
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    return now.replace(second=0, microsecond=0)
+
+
+class _Evaluator:
+    """Evaluates a parsed query against the indexes of an IssueStore.
+
+    AND nodes materialize their most selective child from the indexes and
+    filter that candidate set with the remaining children, so the work done
+    is proportional to the smallest posting list rather than the dataset.
+    """
+
+    def __init__(self, store, now=None):
+        self.store = store
+        self.now = now or datetime.datetime.now(datetime.timezone.utc)
+
+    def index(self, field):
+        index = self.store.index_for(field)
+        if index is None:
+            raise JQLError(f"Field '{field}' does not exist or you do not have permission to view it.")
+        return index
+
+    def clause_bounds(self, clause):
+        """Translate a date clause into an inclusive (low, high) epoch ms range"""
+        value = parse_jql_date(clause.values[0], self.now)
+        if clause.op == ">=":
+            return value, None
+        if clause.op == ">":
+            return value + 1, None
+        if clause.op == "<=":
+            return None, value
+        if clause.op == "<":
+            return None, value - 1
+        if clause.op == "=":
+            return value, value
+        raise JQLError(f"The operator '{clause.op}' is not supported by the '{clause.field}' field.")
+
+    def key_positions(self, index, clause):
+        if clause.op not in ("=", "!=", "in", "not in"):
+            raise JQLError(f"The operator '{clause.op}' is not supported by the '{clause.field}' field.")
+        return index.positions_for(clause.values)
+
+    def category_codes(self, index, clause):
+        if clause.op not in ("=", "!=", "in", "not in"):
+            raise JQLError(f"The operator '{clause.op}' is not supported by the '{clause.field}' field.")
+        return index.codes_for(clause.values)
+
+    def estimate(self, node):
+        if isinstance(node, Clause):
+            index = self.index(node.field)
+            if node.op in ("is", "is not"):
+                count = index.null_count()
+                return count if node.op == "is" else len(self.store) - count
+            if index.kind == "key":
+                count = len(self.key_positions(index, node))
+                return count if node.op in ("=", "in") else len(self.store) - count
+            if index.kind == "date":
+                if node.op == "!=":
+                    return len(self.store)
+                return index.range_count(*self.clause_bounds(node))
+            count = sum(index.posting_size(code) for code in self.category_codes(index, node))
+            return count if node.op in ("=", "in") else len(self.store) - count
+        if isinstance(node, And):
+            return min(self.estimate(child) for child in node.children)
+        if isinstance(node, Or):
+            return min(len(self.store), sum(self.estimate(child) for child in node.children))
+        return len(self.store)
+
+    def materialize(self, node):
+        """Return the sorted positions matching node"""
+        if isinstance(node, Clause):
+            index = self.index(node.field)
+            if node.op in ("is", "is not"):
+                return self.filter(node, self.store.all_positions()) if node.op == "is not" \
+                    else index.null_positions()
+            if index.kind == "key":
+                positions = self.key_positions(index, node)
+                return positions if node.op in ("=", "in") else self.filter(node, self.store.all_positions())
+            if index.kind == "date":
+                if node.op == "!=":
+                    return self.filter(node, self.store.all_positions())
+                return index.range_positions(*self.clause_bounds(node))
+            codes = self.category_codes(index, node)
+            if node.op in ("!=", "not in"):
+                return self.filter(node, self.store.all_positions())
+            postings = [index.postings(code) for code in codes]
+            if not postings:
+                return np.empty(0, dtype=np.int64)
+            if len(postings) == 1:
+                return postings[0]
+            return np.unique(np.concatenate(postings))
+        if isinstance(node, And):
+            children = sorted(node.children, key=self.estimate)
+            candidates = self.materialize(children[0])
+            for child in children[1:]:
+                if len(candidates) == 0:
+                    break
+                candidates = self.filter(child, candidates)
+            return candidates
+        if isinstance(node, Or):
+            parts = [self.materialize(child) for child in node.children]
+            return np.unique(np.concatenate(parts))
+        return self.filter(node, self.store.all_positions())
+
+    def filter(self, node, candidates):
+        return candidates[self.mask(node, candidates)]
+
+    def mask(self, node, candidates):
+        """Vectorized test of node against each candidate position"""
+        if isinstance(node, Clause):
+            index = self.index(node.field)
+            if node.op in ("is", "is not"):
+                nulls = index.null_mask(candidates)
+                return nulls if node.op == "is" else ~nulls
+            if index.kind == "key":
+                mask = np.isin(candidates, self.key_positions(index, node))
+                return mask if node.op in ("=", "in") else ~mask
+            if index.kind == "date":
+                keys = index.keys[candidates]
+                if node.op == "!=":
+                    return (keys != parse_jql_date(node.values[0], self.now)) & ~index.null_mask(candidates)
+                low, high = self.clause_bounds(node)
+                mask = ~index.null_mask(candidates)
+                if low is not None:
+                    mask &= keys >= low
+                if high is not None:
+                    mask &= keys <= high
+                return mask
+            codes = self.category_codes(index, node)
+            mask = np.isin(index.codes[candidates], codes)
+            if node.op in ("!=", "not in"):
+                # Jira never matches empty values with negative operators
+                mask = ~mask & (index.codes[candidates] >= 0)
+            return mask
+        if isinstance(node, And):
+            mask = np.ones(len(candidates), dtype=bool)
+            for child in node.children:
+                mask &= self.mask(child, candidates)
+            return mask
+        if isinstance(node, Or):
+            mask = np.zeros(len(candidates), dtype=bool)
+            for child in node.children:
+                mask |= self.mask(child, candidates)
+            return mask
+        return ~self.mask(node.child, candidates)
+
+    def order(self, positions, order_by):
+        if not order_by or len(positions) < 2:
+            return positions
+        sort_keys = []
+        for key in reversed(order_by):
+            index = self.index(key.field)
+            values = index.sort_keys(positions)
+            sort_keys.append(-values if key.descending else values)
+        return positions[np.lexsort(sort_keys)]
+
+
+def evaluate_jql(query, store, now=None):
+    """Return the positions in store matching query, in result order; relative dates resolve against now"""
+    evaluator = _Evaluator(store, now)
+    if query.where is None:
+        positions = store.all_positions()
+    else:
+        positions = evaluator.materialize(query.where)
+    return evaluator.order(positions, query.order_by)
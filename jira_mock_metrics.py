@@ -0,0 +1,127 @@
+import queue
+import random
+import bisect
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _labels(names, values):
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}" if pairs else ""
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition layout"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{labels[:-1]},le="{bound}"}} {cumulative}')
+        cumulative += self.counts[-1]
+        lines.append(f'{name}_bucket{labels[:-1]},le="+Inf"}} {cumulative}')
+        lines.append(f"{name}_sum{labels} {self.total}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+
+class Metrics:
+    """Per-process request metrics rendered in the Prometheus text format.
+
+    Each request costs a lock and a few list increments; nothing is formatted
+    until /metrics is scraped. Gauges are callables read at scrape time.
+    """
+
+    LABELS = ("endpoint", "method", "status")
+
+    def __init__(self, prefix="jira_mock"):
+        self.prefix = prefix
+        self.requests = {}
+        self.latency = {}
+        self.sizes = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+
+    def gauge(self, name, description, read):
+        self.gauges[name] = (description, read)
+
+    def observe(self, endpoint, method, status, seconds, size):
+        key = (endpoint, method, status)
+        with self.lock:
+            if key not in self.requests:
+                self.requests[key] = 0
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.sizes[key] = Histogram(SIZE_BUCKETS)
+            self.requests[key] += 1
+            self.latency[key].observe(seconds)
+            self.sizes[key].observe(size)
+
+    def render(self):
+        prefix = self.prefix
+        lines = [f"# HELP {prefix}_requests_total Requests served, by route and status",
+                 f"# TYPE {prefix}_requests_total counter"]
+        with self.lock:
+            keys = sorted(self.requests)
+            for key in keys:
+                lines.append(f"{prefix}_requests_total{_labels(self.LABELS, key)} {self.requests[key]}")
+            lines += [f"# HELP {prefix}_request_duration_seconds Time to serve a request, including simulated latency",
+                      f"# TYPE {prefix}_request_duration_seconds histogram"]
+            for key in keys:
+                lines += self.latency[key].render(f"{prefix}_request_duration_seconds", _labels(self.LABELS, key))
+            lines += [f"# HELP {prefix}_response_size_bytes Response body size as sent",
+                      f"# TYPE {prefix}_response_size_bytes histogram"]
+            for key in keys:
+                lines += self.sizes[key].render(f"{prefix}_response_size_bytes", _labels(self.LABELS, key))
+        for name, (description, read) in self.gauges.items():
+            lines += [f"# HELP {prefix}_{name} {description}", f"# TYPE {prefix}_{name} gauge",
+                      f"{prefix}_{name} {read()}"]
+        return "\n".join(lines) + "\n"
+
+
+class _DeferredQueueHandler(QueueHandler):
+    # QueueHandler.prepare formats the message in the caller; leave that to the listener thread
+    def prepare(self, record):
+        return record
+
+
+class AccessLog:
+    """Sampled per-request log written off the request path.
+
+    Records go through a queue to a listener thread, so a request never
+    waits on log formatting or I/O. A sample rate of 0 turns it off.
+    """
+
+    def __init__(self, sample_rate, name="jira_mock.access"):
+        self.sample_rate = sample_rate
+        self.logger = logging.getLogger(name)
+        self.listener = None
+        if sample_rate <= 0:
+            return
+        records = queue.SimpleQueue()
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(message)s'))
+        self.listener = QueueListener(records, handler)
+        self.logger.addHandler(_DeferredQueueHandler(records))
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.listener.start()
+
+    def record(self, endpoint, method, view_args, args, status, seconds, size):
+        if self.sample_rate <= 0 or (self.sample_rate < 1 and random.random() >= self.sample_rate):
+            return
+        self.logger.info("%s %s %s %s -> %s %.1fms %dB", method, endpoint, view_args, dict(args), status,
+                         seconds * 1000, size)
@@ -0,0 +1,326 @@
+import os
+import json
+import re
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from jira_mock_generator import DEFAULT_DISTRIBUTIONS
+from jira_mock_jql import JQLError, Clause, And, Or, Not, parse_jql, evaluate_jql
+from jira_mock_store import CATEGORY_FIELDS, FIELD_ALIASES, DATE_FIELDS, KEY_FIELDS, parse_fields, changelog_page
+
+# A global position is partition number << PARTITION_BITS | position in the partition
+PARTITION_BITS = 40
+LOCAL_MASK = (1 << PARTITION_BITS) - 1
+# Issue and history ids of the n-th project start at 10000 + n * ID_STRIDE, so ids stay unique across projects
+ID_STRIDE = 10 ** 8
+# Jira project keys: an upper case letter, then upper case letters, digits or underscores
+PROJECT_KEY = re.compile(r"[A-Z][A-Z0-9_]+")
+
+
+class Project(namedtuple("Project", ["key", "name", "id", "issues", "seed", "distributions", "first_id",
+                                     "category"])):
+    """One project of the mock site; distributions are generate_dataset's, always including "team" """
+    __slots__ = ()
+
+    def values(self, distribution):
+        """Values of one of the project's distributions, e.g. its statuses or teams"""
+        return list(self.distributions.get(distribution, DEFAULT_DISTRIBUTIONS.get(distribution, ())))
+
+
+def load_projects(spec, issues, seed, key="MOCK", team="Toasted Snow"):
+    """The projects configured by spec (JIRA_MOCK_PROJECTS): a JSON list, or a JSON file holding one.
+
+    Each entry has a key and optionally name, category, issues, seed, teams
+    (a list or {team: weight}) and distributions. Entries default to issues
+    issues and team, the category "<key> Category" and the n-th to seed + n.
+    Without spec there is one project, key.
+    """
+    if not spec:
+        entries = [{"key": key}]
+    elif os.path.exists(spec):
+        with open(spec) as f:
+            entries = json.load(f)
+    else:
+        entries = json.loads(spec)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("JIRA_MOCK_PROJECTS must be a non-empty JSON list of projects")
+    projects = []
+    for number, entry in enumerate(entries):
+        if not PROJECT_KEY.fullmatch(str(entry.get("key", ""))):
+            raise ValueError(f"Project {number} needs a key of upper case letters and digits, got {entry.get('key')!r}")
+        if any(project.key == entry["key"] for project in projects):
+            raise ValueError(f"Project key {entry['key']} is configured twice")
+        teams = entry.get("teams") or [team]
+        distributions = dict(entry.get("distributions") or {}, team=[teams] if isinstance(teams, str) else teams)
+        projects.append(Project(entry["key"], entry.get("name", entry["key"]), str(10000 + number),
+                                int(entry.get("issues", issues)), int(entry.get("seed", seed + number)),
+                                distributions, 10000 + number * ID_STRIDE,
+                                entry.get("category", f"{entry['key']} Category")))
+    return projects
+
+
+def _project_only(node):
+    """Whether node tests nothing but the project, so the partitions it matches are exactly its scope"""
+    if isinstance(node, Clause):
+        return FIELD_ALIASES.get(node.field.lower()) == "project"
+    if isinstance(node, (And, Or)):
+        return all(_project_only(child) for child in node.children)
+    return _project_only(node.child)
+
+
+class PartitionedIssueStore:
+    """Issues of several projects, each held by a store of its own: a partition.
+
+    Positions are global (see PARTITION_BITS), so with one project they are
+    the positions of its store. A search evaluates only the partitions its
+    project clauses allow and, when ordered, merges their results on sort keys
+    comparable across partitions. Reads go straight to the partitions; writes
+    go to the partition of the issue under write_lock. Each partition store
+    gets a project attribute holding its Project.
+    """
+
+    def __init__(self, projects, partitions):
+        self.projects = projects
+        self.partitions = partitions
+        self.numbers = {project.key: number for number, project in enumerate(projects)}
+        # Issue keys sort by project key, then number
+        self.key_ranks = {self.numbers[key]: rank for rank, key in enumerate(sorted(self.numbers))}
+        self.write_lock = threading.RLock()
+        for project, partition in zip(projects, partitions):
+            partition.project = project
+        # A value of a strict field is valid in every partition once any project has it, as on a real
+        # site: "status = Doing" must not fail in a project without that status, nor "project in (A, B)" in A
+        for field, (_, _, strict) in CATEGORY_FIELDS.items():
+            if strict and len(partitions) > 1:
+                values = list(dict.fromkeys(value for partition in partitions
+                                            for value in partition.view.indexes[field].categories))
+                for partition in partitions:
+                    partition.declare_values(field, values)
+
+    def __len__(self):
+        return sum(len(partition) for partition in self.partitions)
+
+    @property
+    def read_only(self):
+        return any(partition.read_only for partition in self.partitions)
+
+    @property
+    def generation(self):
+        return sum(partition.generation for partition in self.partitions)
+
+    @property
+    def modified(self):
+        return max(partition.modified for partition in self.partitions)
+
+    @property
+    def field_names(self):
+        names = {}
+        for partition in self.partitions:
+            names.update(dict.fromkeys(partition.field_names))
+        return list(names)
+
+    def select_fields(self, spec, default="*all"):
+        return parse_fields(spec, self.field_names, default)
+
+    def history_count(self):
+        return sum(partition.history_count() for partition in self.partitions)
+
+    def cached_bodies(self):
+        return sum(len(partition.json_cache) for partition in self.partitions)
+
+    def partition_of(self, key):
+        """The partition an issue key belongs to, or None"""
+        number = self.numbers.get(key.rpartition("-")[0])
+        return None if number is None else self.partitions[number]
+
+    def partition_for(self, project):
+        """The partition of the project with this key, name or id (in any case), or None"""
+        if not isinstance(project, str):
+            return None
+        number = self.project_number(project)
+        return None if number is None else self.partitions[number]
+
+    def project_number(self, value):
+        value = value.lower()
+        for number, project in enumerate(self.projects):
+            if value in (project.key.lower(), project.name.lower(), project.id):
+                return number
+        return None
+
+    def locate(self, pos):
+        return self.partitions[pos >> PARTITION_BITS], pos & LOCAL_MASK
+
+    def position(self, key):
+        number = self.numbers.get(key.rpartition("-")[0])
+        if number is None:
+            return None
+        pos = self.partitions[number].position(key)
+        return None if pos is None else number << PARTITION_BITS | pos
+
+    def key_at(self, pos):
+        partition, local = self.locate(pos)
+        return partition.key_at(local)
+
+    def issue_at(self, pos):
+        partition, local = self.locate(pos)
+        return partition.issue_at(local)
+
+    def get(self, key):
+        partition = self.partition_of(key)
+        return None if partition is None else partition.get(key)
+
+    def revision(self, pos):
+        partition, local = self.locate(pos)
+        return partition.revision(local)
+
+    def issue_json(self, key, changelog=False, fields=None):
+        partition = self.partition_of(key)
+        return None if partition is None else partition.issue_json(key, changelog, fields)
+
+    def issue_json_at(self, pos, changelog=False, fields=None):
+        partition, local = self.locate(pos)
+        return partition.issue_json_at(local, changelog, fields)
+
+    def issues_json(self, positions, changelog=False, fields=None):
+        """Encoded JSON of the issues at positions, in order, each partition encoding its own in one batch"""
+        positions = np.asarray(positions, dtype=np.int64)
+        numbers = positions >> PARTITION_BITS
+        if not len(positions) or (numbers == numbers[0]).all():
+            number = int(numbers[0]) if len(positions) else 0
+            return self.partitions[number].issues_json(positions & LOCAL_MASK, changelog, fields)
+        bodies = [None] * len(positions)
+        for number in np.unique(numbers).tolist():
+            chosen = np.flatnonzero(numbers == number)
+            encoded = self.partitions[number].issues_json(positions[chosen] & LOCAL_MASK, changelog, fields)
+            for idx, body in zip(chosen.tolist(), encoded):
+                bodies[idx] = body
+        return bodies
+
+    def changelog(self, key, start_at=0, max_results=None):
+        partition = self.partition_of(key)
+        if partition is None:
+            return changelog_page([], start_at, max_results, 0)
+        return partition.changelog(key, start_at, max_results) if max_results is not None \
+            else partition.changelog(key, start_at)
+
+    def watchers(self, key):
+        partition = self.partition_of(key)
+        return None if partition is None else partition.watchers(key)
+
+    def set_watchers(self, key, watchers):
+        with self.write_lock:
+            self.partition_of(key).set_watchers(key, watchers)
+
+    def replace_issue(self, issue, changes=(), now=None):
+        with self.write_lock:
+            self.partition_of(issue["key"]).replace_issue(issue, changes, now)
+
+    def append_history(self, key, changes):
+        with self.write_lock:
+            self.partition_of(key).append_history(key, changes)
+
+    def add_issues(self, issues):
+        """Add new issues to the partitions of their keys; returns their global positions in order"""
+        with self.write_lock:
+            batches = {}
+            for idx, issue in enumerate(issues):
+                batches.setdefault(self.numbers[issue["key"].rpartition("-")[0]], []).append(idx)
+            positions = [None] * len(issues)
+            for number, chosen in batches.items():
+                added = self.partitions[number].add_issues([issues[idx] for idx in chosen])
+                for idx, pos in zip(chosen, added):
+                    positions[idx] = number << PARTITION_BITS | pos
+            return positions
+
+    def search(self, jql, now=None):
+        """Return the global positions of the issues matching jql (text or a parsed Query), in result order"""
+        query = parse_jql(jql) if isinstance(jql, str) else jql
+        query = query._replace(where=self.resolve_projects(query.where))
+        results = []
+        # Searching any partition gives the right result, so with none in scope one still validates the query
+        for number in sorted(self.scope(query.where)) or [0]:
+            # Each partition is searched in the view its sort keys are later read from
+            view = self.partitions[number].view
+            local = evaluate_jql(query, view, now)
+            if len(local):
+                results.append((number, view, local))
+        if not results:
+            return np.empty(0, dtype=np.int64)
+        positions = np.concatenate([local + (number << PARTITION_BITS) for number, _, local in results])
+        if len(results) == 1 or not query.order_by:
+            # Partitions are searched in order and each result is in position order, or already sorted
+            return positions
+        return positions[np.lexsort(self.sort_keys(query.order_by, results))]
+
+    def resolve_projects(self, node):
+        """node with the values of project clauses replaced by project keys; unknown projects are an error"""
+        if isinstance(node, Clause):
+            if FIELD_ALIASES.get(node.field.lower()) != "project" or node.op in ("is", "is not"):
+                return node
+            keys = []
+            for value in node.values:
+                number = self.project_number(value)
+                if number is None:
+                    raise JQLError(f"The value '{value}' does not exist for the field 'project'.")
+                keys.append(self.projects[number].key)
+            return node._replace(values=keys)
+        if isinstance(node, (And, Or)):
+            return node._replace(children=[self.resolve_projects(child) for child in node.children])
+        if isinstance(node, Not):
+            return node._replace(child=self.resolve_projects(node.child))
+        return node
+
+    def scope(self, node):
+        """Numbers of the partitions node can match; every partition unless its project or key clauses narrow it"""
+        everything = set(range(len(self.partitions)))
+        if node is None:
+            return everything
+        if isinstance(node, Clause):
+            if FIELD_ALIASES.get(node.field.lower()) == "issuekey" and node.op in ("=", "in"):
+                # An issue key names its project
+                return {self.numbers[prefix] for prefix in (value.upper().rpartition("-")[0] for value in node.values)
+                        if prefix in self.numbers}
+            if FIELD_ALIASES.get(node.field.lower()) != "project" or node.op not in ("=", "!=", "in", "not in"):
+                # Every issue has a project, so "project is empty" matches nothing in any partition
+                return set() if node.op == "is" and FIELD_ALIASES.get(node.field.lower()) == "project" \
+                    else everything
+            named = {self.numbers[key] for key in node.values}
+            return named if node.op in ("=", "in") else everything - named
+        if isinstance(node, And):
+            return set.intersection(*[self.scope(child) for child in node.children])
+        if isinstance(node, Or):
+            return set.union(*[self.scope(child) for child in node.children])
+        # A negation narrows only what is exact: a partition outside an AND's scope may still match part of it
+        return everything - self.scope(node.child) if _project_only(node.child) else everything
+
+    def sort_keys(self, order_by, results):
+        """lexsort keys for results of several partitions, category ranks made comparable across them"""
+        sort_keys = []
+        for key in reversed(order_by):
+            field = FIELD_ALIASES.get(key.field.lower())
+            indexes = [view.indexes[field] for _, view, _ in results]
+            if field in DATE_FIELDS:
+                values = np.concatenate([index.sort_keys(local) for index, (_, _, local) in zip(indexes, results)])
+            elif field in KEY_FIELDS:
+                values = np.concatenate([index.sort_keys(local) | self.key_ranks[number] << PARTITION_BITS
+                                         for index, (number, _, local) in zip(indexes, results)])
+            else:
+                ranks = self.merged_ranks(indexes)
+                values = np.concatenate([rank[index.codes[local]]
+                                         for rank, index, (_, _, local) in zip(ranks, indexes, results)])
+            sort_keys.append(-values if key.descending else values)
+        return sort_keys
+
+    def merged_ranks(self, indexes):
+        """Per category index, its codes mapped to ranks in one order for all of them (empty, code -1, last).
+
+        The order is the one a single index uses: the first index's declared
+        categories as declared, then every other value by name.
+        """
+        declared = [name.lower() for name in indexes[0].categories[:indexes[0].declared]]
+        names = {name.lower() for index in indexes for name in index.categories} - set(declared)
+        ranked = {name: rank for rank, name in enumerate(declared + sorted(names))}
+        return [np.array([ranked[name.lower()] for name in index.categories] + [len(ranked)], dtype=np.int32)
+                for index in indexes]
@@ -0,0 +1,250 @@
+import os
+import time
+import random
+import pstats
+import cProfile
+import threading
+import contextvars
+
+# Request header that profiles a request: "timers" for phase timers only, anything else adds cProfile
+PROFILE_HEADER = "X-Mock-Profile"
+
+# The timer of the request being handled in this thread or task, if it is being timed
+_current = contextvars.ContextVar("jira_mock_timer", default=None)
+
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def phase(name):
+    """Time the enclosed block as part name of the current request.
+
+    Phases are exclusive: time in a nested phase is not counted in the outer
+    one. When the request is not being timed this returns a shared no-op, so
+    the hooks can stay in the request path.
+    """
+    timer = _current.get()
+    return _NULL_PHASE if timer is None else _Phase(timer, name)
+
+
+class _Phase:
+    __slots__ = ("timer", "name")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.timer.switch()
+        self.timer.stack.append(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.switch()
+        self.timer.stack.pop()
+        return False
+
+
+class RequestTimer:
+    """Seconds spent per phase of one request; time outside any phase counts as "other" """
+
+    def __init__(self):
+        self.totals = {}
+        self.stack = []
+        self.mark = time.perf_counter()
+
+    def switch(self):
+        now = time.perf_counter()
+        current = self.stack[-1] if self.stack else "other"
+        self.totals[current] = self.totals.get(current, 0.0) + now - self.mark
+        self.mark = now
+
+    def pause(self):
+        self.switch()
+
+    def resume(self):
+        self.mark = time.perf_counter()
+
+    def server_timing(self):
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.totals.items())
+
+
+class ProfileSession:
+    """Profiling of one request; paused while a streamed body waits on the client"""
+
+    def __init__(self, profiler, endpoint, with_cprofile):
+        self.profiler = profiler
+        self.endpoint = endpoint
+        self.timer = RequestTimer()
+        self.cprofile = cProfile.Profile() if with_cprofile else None
+        self.started = time.perf_counter()
+        self.token = None
+
+    def resume(self):
+        self.timer.resume()
+        self.token = _current.set(self.timer)
+        if self.cprofile:
+            self.cprofile.enable()
+
+    def pause(self):
+        if self.cprofile:
+            self.cprofile.disable()
+        _current.reset(self.token)
+        self.timer.pause()
+
+    def call(self, function):
+        self.resume()
+        try:
+            return function()
+        finally:
+            self.pause()
+
+    def stream(self, chunks, on_complete):
+        """Profile the production of each chunk of a streamed body, then finish"""
+        return _ProfiledStream(self, chunks, on_complete)
+
+    def finish(self, status):
+        self.profiler.record(self, status, time.perf_counter() - self.started)
+
+
+class _ProfiledStream:
+    """A streamed body produced under a session.
+
+    on_complete runs once: after the last chunk, when producing a chunk fails,
+    or when the body is closed, even if it was never iterated, so a dropped
+    response never keeps the profiler busy.
+    """
+
+    def __init__(self, session, chunks, on_complete):
+        self.session = session
+        self.chunks = iter(chunks)
+        self.on_complete = on_complete
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.on_complete is None:
+            raise StopIteration
+        try:
+            self.session.resume()
+            try:
+                return next(self.chunks)
+            finally:
+                self.session.pause()
+        except BaseException:
+            # StopIteration included: the body is complete
+            self.close()
+            raise
+
+    def close(self):
+        on_complete, self.on_complete = self.on_complete, None
+        if on_complete is None:
+            return
+        try:
+            close = getattr(self.chunks, "close", None)
+            if close is not None:
+                close()
+        finally:
+            on_complete()
+
+
+class Profiler:
+    """Opt-in per-request profiling.
+
+    Off unless a directory is configured. Then requests carrying
+    PROFILE_HEADER, plus a sampled share of the rest, run under phase timers
+    and (unless the header asks for timers only) cProfile. Profiles are
+    dumped to the directory, keeping the newest keep files, and aggregated
+    per endpoint for summary(). One request is profiled at a time per process;
+    others arriving meanwhile run unprofiled.
+    """
+
+    def __init__(self, directory=None, rate=0.0, keep=200):
+        self.enabled = bool(directory)
+        self.directory = directory
+        self.rate = rate
+        self.keep = keep
+        self.busy = threading.Lock()
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.sequence = 0
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    def start(self, endpoint, headers):
+        """A ProfileSession if this request should be profiled, otherwise None"""
+        requested = headers.get(PROFILE_HEADER)
+        if not requested and not (self.rate > 0 and random.random() < self.rate):
+            return None
+        if not self.busy.acquire(blocking=False):
+            return None
+        return ProfileSession(self, endpoint, requested != "timers")
+
+    def record(self, session, status, seconds):
+        try:
+            stats = None
+            if session.cprofile:
+                stats = pstats.Stats(session.cprofile)
+                self.dump(session, status, seconds)
+            with self.lock:
+                summary = self.endpoints.setdefault(session.endpoint, {"requests": 0, "seconds": 0.0,
+                                                                       "phases": {}, "stats": None})
+                summary["requests"] += 1
+                summary["seconds"] += seconds
+                for name, value in session.timer.totals.items():
+                    summary["phases"][name] = summary["phases"].get(name, 0.0) + value
+                if stats is not None:
+                    if summary["stats"] is None:
+                        summary["stats"] = stats
+                    else:
+                        summary["stats"].add(stats)
+        finally:
+            self.busy.release()
+
+    def dump(self, session, status, seconds):
+        with self.lock:
+            self.sequence += 1
+            sequence = self.sequence
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        name = f"{stamp}-{os.getpid()}-{sequence:06d}-{session.endpoint}-{status}-{seconds * 1000:.0f}ms.prof"
+        session.cprofile.dump_stats(os.path.join(self.directory, name))
+        # Names start with the time, so the oldest sort first
+        files = sorted(entry for entry in os.listdir(self.directory) if entry.endswith(".prof"))
+        for stale in files[:max(0, len(files) - self.keep)]:
+            try:
+                os.remove(os.path.join(self.directory, stale))
+            except OSError:
+                pass
+
+    def summary(self, sort="cumtime", limit=15):
+        """Per-endpoint request counts, mean phase times (ms) and the top functions by sort"""
+        column = {"cumtime": 3, "tottime": 2, "calls": 1}.get(sort, 3)
+        endpoints = {}
+        with self.lock:
+            for endpoint, summary in self.endpoints.items():
+                requests = summary["requests"]
+                top = []
+                if summary["stats"] is not None:
+                    rows = sorted(summary["stats"].stats.items(), key=lambda item: item[1][column], reverse=True)
+                    top = [{"function": f"{path}:{line}({function})", "calls": calls,
+                            "tottime": round(tottime, 6), "cumtime": round(cumtime, 6)}
+                           for (path, line, function), (_, calls, tottime, cumtime, _) in rows[:limit]]
+                endpoints[endpoint] = {
+                    "requests": requests,
+                    "meanMs": round(summary["seconds"] / requests * 1000, 3),
+                    "phasesMeanMs": {name: round(value / requests * 1000, 3)
+                                     for name, value in summary["phases"].items()},
+                    "top": top,
+                }
+        files = sorted(entry for entry in os.listdir(self.directory) if entry.endswith(".prof"))
+        return {"directory": self.directory, "rate": self.rate, "keep": self.keep,
+                "recent": files[-20:][::-1], "endpoints": endpoints}
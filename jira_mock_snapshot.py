@@ -0,0 +1,215 @@
+import os
+import json
+import mmap
+import shutil
+
+import numpy as np
+
+from jira_mock_generator import MockDataset, CATEGORY_COLUMNS
+from jira_mock_store import CATEGORY_FIELDS, DATE_FIELDS, CHANGELOG_PAGE_SIZE, changelog_page, encode_issue_parts, \
+    join_issue
+from jira_mock_columnar import ColumnarIssueStore
+from jira_mock_writes import ReadOnlyStore
+from jira_mock_profile import phase
+
+# Bump when the on-disk layout or the generated data changes so stale snapshots are rebuilt
+SNAPSHOT_VERSION = 5
+DATASET_ARRAYS = ["created", "updated", "due", "history_offsets", "history_authors", "history_from", "history_to",
+                  "history_created"]
+
+
+def _encode(value):
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def write_snapshot(path, dataset, base_url, settings, chunk_size=50000):
+    """Write dataset to a snapshot directory at path.
+
+    A snapshot holds the dataset columns and prebuilt index orders as .npy
+    files, plus every issue (and its first changelog page) already encoded as
+    JSON in one blob with an offsets array. Per-issue field bounds locate each
+    "name":value member inside the encoded issue, so field projections are
+    slices too. It is written to a temporary directory and renamed into place,
+    so readers never see a partial snapshot.
+    """
+    staging = f"{os.path.abspath(path)}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    for name in DATASET_ARRAYS:
+        np.save(os.path.join(staging, f"{name}.npy"), getattr(dataset, name))
+    for column, codes in dataset.codes.items():
+        np.save(os.path.join(staging, f"codes.{column}.npy"), codes)
+    columns = dataset.index_columns()
+    for field in CATEGORY_FIELDS:
+        np.save(os.path.join(staging, f"order.{field}.npy"), np.argsort(columns[field][0], kind="stable"))
+    for field in DATE_FIELDS:
+        keys, nulls = columns[field]
+        present = np.flatnonzero(~nulls)
+        np.save(os.path.join(staging, f"order.{field}.npy"), present[np.argsort(keys[present], kind="stable")])
+
+    count = len(dataset)
+    issue_offsets = np.zeros(count + 1, dtype=np.int64)
+    changelog_offsets = np.zeros(count + 1, dtype=np.int64)
+    field_names = None
+    field_bounds = None
+    with open(os.path.join(staging, "issues.json.bin"), "wb") as issue_file, \
+            open(os.path.join(staging, "changelogs.json.bin"), "wb") as changelog_file:
+        for start in range(0, count, chunk_size):
+            issues, _, changelogs = dataset.to_issues(base_url, start, start + chunk_size)
+            for i, issue in enumerate(issues):
+                pos = start + i
+                head, names, fragments = encode_issue_parts(issue)
+                if field_names is None:
+                    field_names = names
+                    field_bounds = np.zeros((count, len(names) + 1), dtype=np.int32)
+                elif names != field_names:
+                    raise ValueError(f"Issue {issue['key']} has fields {names}, expected {field_names}")
+                encoded = join_issue(head, fragments)
+                # bounds[j] is where fragment j starts; the last one points just past the closing "}" of fields
+                # so fragment j is always encoded[bounds[j]:bounds[j + 1] - 1]
+                lengths = [len(head)] + [len(fragment) + 1 for fragment in fragments]
+                field_bounds[pos] = np.cumsum(lengths)
+                issue_file.write(encoded)
+                issue_offsets[pos + 1] = issue_offsets[pos] + len(encoded)
+                histories = changelogs[issue["key"]]
+                encoded = _encode(changelog_page(histories[:CHANGELOG_PAGE_SIZE], 0, CHANGELOG_PAGE_SIZE,
+                                                 len(histories)))
+                changelog_file.write(encoded)
+                changelog_offsets[pos + 1] = changelog_offsets[pos] + len(encoded)
+    np.save(os.path.join(staging, "issues.offsets.npy"), issue_offsets)
+    np.save(os.path.join(staging, "changelogs.offsets.npy"), changelog_offsets)
+    np.save(os.path.join(staging, "issues.fields.npy"),
+            field_bounds if field_bounds is not None else np.zeros((0, 1), dtype=np.int32))
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "settings": settings,
+        "count": count,
+        "project": dataset.project,
+        "firstId": dataset.first_id,
+        "categories": dataset.categories,
+        "fields": field_names or [],
+    }
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=4)
+
+    # Swap the finished snapshot into place; processes holding the old files keep their mappings
+    retired = f"{os.path.abspath(path)}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.rename(path, retired)
+    os.rename(staging, path)
+    shutil.rmtree(retired, ignore_errors=True)
+
+
+def read_meta(path):
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def ensure_snapshot(path, settings, build_dataset, base_url):
+    """Make sure a snapshot for settings exists at path, building it at most once.
+
+    An exclusive file lock serialises concurrent callers (e.g. gunicorn workers
+    started without --preload): the first one builds, the rest wait and reuse it.
+    """
+    import fcntl
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{os.path.abspath(path)}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            meta = read_meta(path)
+            if meta and meta["version"] == SNAPSHOT_VERSION and meta["settings"] == settings:
+                return False
+            write_snapshot(path, build_dataset(), base_url, settings)
+            return True
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _map_file(filename):
+    with open(filename, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class Snapshot:
+    """A snapshot directory opened read-only; every array and blob is memory-mapped"""
+
+    def __init__(self, path):
+        self.path = path
+        self.meta = read_meta(path)
+        if not self.meta or self.meta["version"] != SNAPSHOT_VERSION:
+            raise ValueError(f"No usable snapshot at {path}")
+
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        self.dataset = MockDataset(self.meta["project"], self.meta["categories"],
+                                   {column: load(f"codes.{column}") for column in CATEGORY_COLUMNS},
+                                   *[load(name) for name in DATASET_ARRAYS], first_id=self.meta["firstId"])
+        self.orders = {field: load(f"order.{field}") for field in list(CATEGORY_FIELDS) + list(DATE_FIELDS)}
+        self.issue_blob = _map_file(os.path.join(path, "issues.json.bin"))
+        self.issue_offsets = load("issues.offsets")
+        self.changelog_blob = _map_file(os.path.join(path, "changelogs.json.bin"))
+        self.changelog_offsets = load("changelogs.offsets")
+        self.field_bounds = load("issues.fields")
+
+
+class SnapshotIssueStore(ColumnarIssueStore):
+    """Read-only IssueStore serving a memory-mapped snapshot.
+
+    Issues are never decoded to dicts on the read path: responses are sliced
+    straight out of the mapped JSON blobs, so every process serving the same
+    snapshot shares one physical copy of the data through the page cache.
+    """
+    read_only = True
+
+    def __init__(self, snapshot, base_url, categories=None):
+        self.snapshot = snapshot
+        super().__init__(snapshot.dataset, base_url, categories, snapshot.orders,
+                         modified=os.path.getmtime(os.path.join(snapshot.path, "meta.json")))
+        self.field_names = snapshot.meta["fields"]
+        self.field_columns = {name: column for column, name in enumerate(self.field_names)}
+
+    def rebuild_indexes(self):
+        self.load_indexes(self.dataset.index_columns(), self.snapshot.orders)
+
+    def encode_issue(self, pos):
+        offsets = self.snapshot.issue_offsets
+        return self.snapshot.issue_blob[offsets[pos]:offsets[pos + 1]]
+
+    def encode_changelog(self, pos):
+        with phase("changelog"):
+            offsets = self.snapshot.changelog_offsets
+            return self.snapshot.changelog_blob[offsets[pos]:offsets[pos + 1]]
+
+    def project_issue(self, pos, fields):
+        start = int(self.snapshot.issue_offsets[pos])
+        bounds = self.snapshot.field_bounds[pos].tolist()
+        blob = self.snapshot.issue_blob
+        fragments = []
+        for name in fields:
+            column = self.field_columns.get(name)
+            if column is not None:
+                fragments.append(blob[start + bounds[column]:start + bounds[column + 1] - 1])
+        return join_issue(blob[start:start + bounds[0]], fragments)
+
+    def issues_json(self, positions, changelog=False, fields=None):
+        return [self.issue_json_at(pos, changelog, fields) for pos in positions]
+
+    def replace_issue(self, *args, **kwargs):
+        raise ReadOnlyStore("Snapshot-backed stores are read-only")
+
+    add_issues = append_history = set_watchers = replace_issue
+
+
+def load_snapshot_store(path, settings, build_dataset, base_url, categories=None):
+    """Open the snapshot for settings at path, generating it first if it is missing or stale"""
+    ensure_snapshot(path, settings, build_dataset, base_url)
+    return SnapshotIssueStore(Snapshot(path), base_url, categories)
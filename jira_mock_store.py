@@ -0,0 +1,717 @@
+import copy
+import json
+import time
+import datetime
+import itertools
+import threading
+
+import numpy as np
+
+from jira_mock_jql import JQLError, parse_jql, evaluate_jql
+from jira_mock_profile import phase
+
+
+def _path(*parts):
+    """Build an extractor that walks parts through an issue dict, returning None when missing"""
+    def extract(issue):
+        value = issue
+        for part in parts:
+            if isinstance(value, list):
+                value = value[0] if value else None
+            if value is None:
+                return None
+            value = value.get(part)
+        return value
+    return extract
+
+
+# Searchable fields: id -> (JQL names, extractor, strict values)
+# Strict fields reject unknown values the way Jira does for projects and statuses.
+CATEGORY_FIELDS = {
+    "project": (["project"], _path("fields", "project", "name"), True),
+    "customfield_10001": (["team", "cf[10001]"], _path("fields", "customfield_10001", "name"), False),
+    "status": (["status"], _path("fields", "status", "name"), True),
+    "priority": (["priority"], _path("fields", "priority", "name"), True),
+    "assignee": (["assignee"], _path("fields", "assignee", "displayName"), False),
+    "reporter": (["reporter"], _path("fields", "reporter", "displayName"), False),
+    "creator": (["creator"], _path("fields", "creator", "displayName"), False),
+    "customfield_10078": (["category", "cf[10078]"], _path("fields", "customfield_10078", "value"), False),
+    "customfield_10046": (["group", "cf[10046]"], _path("fields", "customfield_10046", "value"), False),
+    "customfield_10045": (["site", "cf[10045]"], _path("fields", "customfield_10045", "value"), False),
+}
+
+DATE_FIELDS = {
+    "created": (["createddate"], _path("fields", "created")),
+    "updated": (["updateddate"], _path("fields", "updated")),
+    "duedate": (["due"], _path("fields", "duedate")),
+}
+
+# Issue keys are searched through the store's key lookup rather than an inverted index
+KEY_FIELDS = {
+    "issuekey": (["key"], _path("key")),
+}
+
+# JQL name (lower case) -> field id
+FIELD_ALIASES = {name: field for field, (names, *_) in
+                 list(CATEGORY_FIELDS.items()) + list(DATE_FIELDS.items()) + list(KEY_FIELDS.items())
+                 for name in [field] + names}
+
+# Histories embedded in issue and search responses; longer changelogs are paged via /changelog
+CHANGELOG_PAGE_SIZE = 100
+
+# Fields Jira leaves out of *navigable (none of them are generated, but a replaced issue may carry them)
+NON_NAVIGABLE_FIELDS = {"comment", "worklog", "attachment", "timetracking"}
+
+
+def build_histories(changes, history_ids, start=0):
+    """Build the Jira-shaped changelog histories for a list of status changes.
+
+    history_ids is an iterator of integers so that ids are assigned once and stay
+    stable; start is the position of the first change within the issue's history.
+    """
+    histories = []
+    for idx, change in enumerate(changes, start):
+        histories.append({
+            "id": str(next(history_ids)),
+            "author": {"displayName": change["Author"]},
+            "created": change["DateTime"],
+            "items": [
+                {
+                    "field": "status",
+                    "fieldtype": "jira",
+                    "from": f"{idx}",
+                    "fromString": change["FromStatus"],
+                    "to": f"{idx+1}",
+                    "toString": change["ToStatus"]
+                }
+            ]
+        })
+    return histories
+
+
+def encode_issue_parts(issue):
+    """Encode an issue as (head, names, fragments) for field projections.
+
+    head opens the issue up to its fields object and each fragment is one
+    "name":value member of it, so any projection is a join of fragments and
+    joining all of them reproduces json.dumps(issue) when fields is the last key.
+    """
+    top = json.dumps({name: value for name, value in issue.items() if name != "fields"},
+                     separators=(",", ":")).encode()[:-1]
+    head = top + (b',' if len(top) > 1 else b'') + b'"fields":{'
+    names = list(issue.get("fields", {}))
+    fragments = [json.dumps(name).encode() + b':' + json.dumps(issue["fields"][name], separators=(",", ":")).encode()
+                 for name in names]
+    return head, names, fragments
+
+
+def join_issue(head, fragments):
+    return head + b','.join(fragments) + b'}}'
+
+
+def parse_fields(spec, available, default="*all"):
+    """Resolve a Jira fields parameter to the field ids to return, in issue order.
+
+    spec is a comma separated string or a list of ids, "*all", "*navigable"
+    and "-id" exclusions; with no positive entries the default applies. Unknown
+    ids are ignored. Returns None when every available field is selected.
+    """
+    if isinstance(spec, str):
+        spec = spec.split(",")
+    entries = [entry.strip() for entry in spec or [] if entry and entry.strip()]
+    excluded = {entry[1:].lower() for entry in entries if entry.startswith("-")}
+    included = [entry for entry in entries if not entry.startswith("-")] or [default]
+    selected = set()
+    for entry in included:
+        if entry == "*all":
+            selected.update(name.lower() for name in available)
+        elif entry == "*navigable":
+            selected.update(name.lower() for name in available if name not in NON_NAVIGABLE_FIELDS)
+        else:
+            selected.add(entry.lower())
+    selected -= excluded
+    fields = tuple(name for name in available if name.lower() in selected)
+    return None if len(fields) == len(available) else fields
+
+
+def jira_now():
+    """The current time as a Jira timestamp"""
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f+0000")
+
+
+def changelog_page(histories, start_at, max_results, total):
+    """Wrap a page of histories the way Jira embeds a changelog in an issue"""
+    return {"startAt": start_at, "maxResults": len(histories), "total": total, "histories": histories}
+
+
+def parse_jira_timestamps(values):
+    """Convert Jira timestamps ("2024-01-31T10:00:00.000000+0000" or "2024-01-31") to epoch ms.
+
+    Returns (keys, nulls) where nulls flags missing values.
+    """
+    nulls = np.array([not value for value in values], dtype=bool)
+    stamps = [value[:-5] if value and len(value) > 10 else value or "1970-01-01" for value in values]
+    keys = np.array(stamps, dtype="datetime64[ms]").astype(np.int64)
+    # Offsets are minutes east of UTC taken from the "+hhmm" suffix
+    offsets = np.array([int(value[-5] + "1") * (int(value[-4:-2]) * 60 + int(value[-2:]))
+                        if value and len(value) > 10 else 0 for value in values], dtype=np.int64)
+    keys -= offsets * 60000
+    keys[nulls] = 0
+    return keys, nulls
+
+
+class CategoryIndex:
+    """Inverted index from a categorical value to the sorted positions holding it"""
+    kind = "category"
+
+    def __init__(self, field, values, categories=(), strict=False, codes=None, ordered=True, order=None):
+        self.field = field
+        self.strict = strict
+        self.declared = len(categories) if ordered else 0
+        self.categories = list(categories)
+        self.lookup = {name.lower(): code for code, name in enumerate(self.categories)}
+        if codes is not None:
+            # Codes already assigned by the dataset generator, possibly with a prebuilt order
+            self.codes = codes
+            self.reindex(order)
+            return
+        codes = np.empty(len(values), dtype=np.int32)
+        for pos, value in enumerate(values):
+            codes[pos] = self.encode(value)
+        self.codes = codes
+        self.reindex()
+
+    def encode(self, value):
+        """Code of value, adding it as a new category when unseen; None is -1"""
+        if value is None:
+            return -1
+        code = self.lookup.get(value.lower())
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(value)
+            self.lookup[value.lower()] = code
+        return code
+
+    def reindex(self, order=None, bounds=None):
+        # A stable argsort groups positions by code while keeping each group in position order
+        if order is None:
+            order = np.argsort(self.codes, kind="stable")
+        if bounds is None:
+            counts = np.bincount(self.codes + 1, minlength=len(self.categories) + 1)
+            bounds = np.concatenate(([0], np.cumsum(counts)))
+        self.order = order
+        self.bounds = bounds
+        # Declared categories (e.g. priorities) sort in declared order, the rest by name; empty sorts last
+        ranked = list(range(self.declared)) + sorted(range(self.declared, len(self.categories)),
+                                                     key=lambda code: self.categories[code].lower())
+        ranks = np.empty(len(self.categories) + 1, dtype=np.int32)
+        ranks[ranked] = np.arange(len(ranked))
+        ranks[-1] = len(ranked)
+        self.ranks = ranks
+
+    def with_values(self, positions, values):
+        """A copy of the index with positions set to values; positions past the end extend it.
+
+        The copy shares no mutable state with this index, so searches holding
+        the old one are unaffected. Changed positions are merged into the
+        existing order rather than re-sorting every position.
+        """
+        index = copy.copy(self)
+        index.categories = list(self.categories)
+        index.lookup = dict(self.lookup)
+        positions = np.asarray(positions, dtype=np.int64)
+        size = max(len(self.codes), int(positions.max()) + 1)
+        codes = np.full(size, -1, dtype=np.int32)
+        codes[:len(self.codes)] = self.codes
+        codes[positions] = [index.encode(value) for value in values]
+        index.codes = codes
+        changed = np.union1d(positions, np.arange(len(self.codes), size))
+        # Each group of the order is in position order, so positions are found and placed by binary search
+        existing = changed[changed < len(self.codes)]
+        old_codes = self.codes[existing]
+        slots = [self.bounds[code + 1] + np.searchsorted(self.postings(code), pos)
+                 for pos, code in zip(existing.tolist(), old_codes.tolist())]
+        keep = np.delete(self.order, slots)
+        removed = np.bincount(old_codes + 1, minlength=len(self.bounds) - 1)
+        bounds = self.bounds - np.concatenate(([0], np.cumsum(removed)))
+        bounds = np.concatenate((bounds, np.full(len(index.categories) + 2 - len(bounds), bounds[-1])))
+        changed = changed[np.lexsort((changed, codes[changed]))]
+        slots = [bounds[code + 1] + np.searchsorted(keep[bounds[code + 1]:bounds[code + 2]], pos)
+                 for pos, code in zip(changed.tolist(), codes[changed].tolist())]
+        added = np.bincount(codes[changed] + 1, minlength=len(bounds) - 1)
+        index.reindex(np.insert(keep, slots, changed), bounds + np.concatenate(([0], np.cumsum(added))))
+        return index
+
+    def with_categories(self, values):
+        """A copy of the index that also knows values, with no positions holding them"""
+        index = copy.copy(self)
+        index.categories = list(self.categories)
+        index.lookup = dict(self.lookup)
+        for value in values:
+            index.encode(value)
+        added = len(index.categories) - len(self.categories)
+        index.reindex(self.order, np.concatenate((self.bounds, np.full(added, self.bounds[-1]))))
+        return index
+
+    def codes_for(self, values):
+        codes = []
+        for value in values:
+            code = self.lookup.get(value.lower())
+            if code is None:
+                if self.strict:
+                    raise JQLError(f"The value '{value}' does not exist for the field '{self.field}'.")
+                continue
+            codes.append(code)
+        return codes
+
+    def postings(self, code):
+        return self.order[self.bounds[code + 1]:self.bounds[code + 2]]
+
+    def posting_size(self, code):
+        return int(self.bounds[code + 2] - self.bounds[code + 1])
+
+    def null_count(self):
+        return int(self.bounds[1] - self.bounds[0])
+
+    def null_positions(self):
+        return self.order[self.bounds[0]:self.bounds[1]]
+
+    def null_mask(self, positions):
+        return self.codes[positions] < 0
+
+    def sort_keys(self, positions):
+        return self.ranks[self.codes[positions]]
+
+
+class DateIndex:
+    """Sorted index of epoch ms timestamps supporting range lookups"""
+    kind = "date"
+
+    def __init__(self, field, values, keys=None, nulls=None, order=None):
+        self.field = field
+        if keys is None:
+            keys, nulls = parse_jira_timestamps(values)
+        self.keys, self.nulls = keys, nulls
+        self.reindex(order)
+
+    def reindex(self, order=None):
+        if order is None:
+            present = np.flatnonzero(~self.nulls)
+            order = present[np.argsort(self.keys[present], kind="stable")]
+        self.order = order
+        self.sorted_keys = self.keys[self.order]
+
+    def with_values(self, positions, values):
+        """A copy of the index with positions set to values; positions past the end extend it"""
+        index = copy.copy(self)
+        positions = np.asarray(positions, dtype=np.int64)
+        size = max(len(self.keys), int(positions.max()) + 1)
+        keys = np.zeros(size, dtype=np.int64)
+        nulls = np.ones(size, dtype=bool)
+        keys[:len(self.keys)] = self.keys
+        nulls[:len(self.nulls)] = self.nulls
+        keys[positions], nulls[positions] = parse_jira_timestamps(values)
+        changed = np.union1d(positions, np.arange(len(self.keys), size))
+        existing = changed[changed < len(self.keys)]
+        slots = []
+        for pos in existing[~self.nulls[existing]].tolist():
+            # Equal keys are few; scan them for the position
+            start, end = np.searchsorted(self.sorted_keys, self.keys[pos], side="left"), \
+                np.searchsorted(self.sorted_keys, self.keys[pos], side="right")
+            slots.append(start + int(np.flatnonzero(self.order[start:end] == pos)[0]))
+        keep, keep_keys = np.delete(self.order, slots), np.delete(self.sorted_keys, slots)
+        changed = changed[~nulls[changed]]
+        changed = changed[np.lexsort((changed, keys[changed]))]
+        slots = np.searchsorted(keep_keys, keys[changed], side="right")
+        index.keys, index.nulls = keys, nulls
+        index.order = np.insert(keep, slots, changed)
+        index.sorted_keys = np.insert(keep_keys, slots, keys[changed])
+        return index
+
+    def _range(self, low, high):
+        start = 0 if low is None else np.searchsorted(self.sorted_keys, low, side="left")
+        end = len(self.sorted_keys) if high is None else np.searchsorted(self.sorted_keys, high, side="right")
+        return start, max(start, end)
+
+    def range_count(self, low, high):
+        start, end = self._range(low, high)
+        return int(end - start)
+
+    def range_positions(self, low, high):
+        start, end = self._range(low, high)
+        return np.sort(self.order[start:end])
+
+    def null_count(self):
+        return int(self.nulls.sum())
+
+    def null_positions(self):
+        return np.flatnonzero(self.nulls)
+
+    def null_mask(self, positions):
+        return self.nulls[positions]
+
+    def sort_keys(self, positions):
+        return self.keys[positions]
+
+
+def key_number(key):
+    """The number of an issue key ("MOCK-12" -> 12), or None when it has none"""
+    number = key.rpartition("-")[2] if isinstance(key, str) else ""
+    return int(number) if number.isdigit() else None
+
+
+class KeyIndex:
+    """Issue keys of one project: clauses resolve keys through lookup (a store's position), sorts use numbers.
+
+    numbers holds the number of the key at each position; None means it is
+    the position + 1, as in generated datasets, so no array is kept at all.
+    """
+    kind = "key"
+
+    def __init__(self, field, lookup, size, numbers=None):
+        self.field = field
+        self.lookup = lookup
+        self.size = size
+        self.numbers = numbers
+
+    def with_values(self, positions, values):
+        """A copy of the index with the keys at positions set to values; positions past the end extend it"""
+        index = copy.copy(self)
+        positions = np.asarray(positions, dtype=np.int64)
+        numbers = np.array([key_number(key) or 0 for key in values], dtype=np.int64)
+        index.size = max(self.size, int(positions.max()) + 1)
+        if self.numbers is not None or (numbers != positions + 1).any():
+            index.numbers = np.zeros(index.size, dtype=np.int64)
+            index.numbers[:self.size] = np.arange(1, self.size + 1) if self.numbers is None else self.numbers
+            index.numbers[positions] = numbers
+        return index
+
+    def positions_for(self, values):
+        """Sorted positions of the keys in values; keys unknown to this version of the store match nothing"""
+        positions = {self.lookup(value.upper()) for value in values}
+        return np.array(sorted(pos for pos in positions if pos is not None and pos < self.size), dtype=np.int64)
+
+    def null_count(self):
+        return 0
+
+    def null_positions(self):
+        return np.empty(0, dtype=np.int64)
+
+    def null_mask(self, positions):
+        return np.zeros(len(positions), dtype=bool)
+
+    def sort_keys(self, positions):
+        positions = np.asarray(positions, dtype=np.int64)
+        return positions + 1 if self.numbers is None else self.numbers[positions]
+
+
+class StoreView:
+    """The indexes and positions of one published version of a store.
+
+    Writers publish a new view with a single assignment, so a search holding
+    a view sees one consistent version however many writes land meanwhile.
+    """
+
+    def __init__(self, indexes, positions):
+        self.indexes = indexes
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def all_positions(self):
+        return self.positions
+
+    def index_for(self, field):
+        return self.indexes.get(FIELD_ALIASES.get(field.lower()))
+
+
+class IssueStore:
+    """Holds the mock issues and the indexes used to answer JQL searches.
+
+    Reads take no locks. Writes are serialized by write_lock and never modify
+    anything a reader may hold: issues, histories and indexes are replaced by
+    new versions, and cached encodings are tagged with the issue revision
+    they were built from.
+    """
+    read_only = False
+    # Id of the first issue and of the first history row
+    first_id = 10000
+
+    def __init__(self, issues, issue_history, issue_changelogs, categories=None, columns=None):
+        self.issues = issues
+        self.issue_history = issue_history
+        self.issue_changelogs = issue_changelogs
+        self.key_index = {issue["key"]: pos for pos, issue in enumerate(issues)}
+        self.init_state(categories, list(issues[0]["fields"]) if issues else [])
+        if columns is None:
+            self.rebuild_indexes()
+        else:
+            self.load_indexes(columns)
+
+    def init_state(self, categories, field_names, modified=None):
+        """Set up the caches, change counters and write state shared by every kind of store"""
+        self.categories = categories or {}
+        self.field_names = field_names
+        # (position, with changelog) -> (revision, encoded JSON bytes), filled on first request
+        self.json_cache = {}
+        # position -> (revision, (head, {field: fragment})) for projected responses, filled on first request
+        self.fragment_cache = {}
+        # Watchers of issues whose watchers were changed; the rest are generated by the app
+        self.watcher_lists = {}
+        self.write_lock = threading.RLock()
+        self.next_history_id = None
+        # Change counters for ETags: generation moves on any change, revisions per changed position
+        self.generation = 0
+        self.revisions = {}
+        self.modified = time.time() if modified is None else modified
+
+    def __len__(self):
+        return len(self.issues)
+
+    def issue_at(self, pos):
+        """The issue at pos as a dict; callers must not modify it"""
+        return self.issues[pos]
+
+    def set_issue(self, pos, issue):
+        self.issues[pos] = issue
+
+    def rebuild_indexes(self):
+        indexes = {}
+        for field, (_, extract, strict) in CATEGORY_FIELDS.items():
+            values = [extract(issue) for issue in self.issues]
+            indexes[field] = CategoryIndex(field, values, self.categories.get(field, ()), strict)
+        for field, (_, extract) in DATE_FIELDS.items():
+            indexes[field] = DateIndex(field, [extract(issue) for issue in self.issues])
+        numbers = np.array([key_number(issue["key"]) or 0 for issue in self.issues], dtype=np.int64)
+        indexes["issuekey"] = KeyIndex("issuekey", self.position, len(self.issues), numbers)
+        self.view = StoreView(indexes, np.arange(len(self.issues)))
+
+    def load_indexes(self, columns, orders=None):
+        """Build the indexes from generated columns: {field: (codes, categories)} and {date: (keys, nulls)}.
+
+        orders optionally maps fields to prebuilt index orders, e.g. from a snapshot.
+        """
+        orders = orders or {}
+        indexes = {}
+        for field, (_, _, strict) in CATEGORY_FIELDS.items():
+            codes, categories = columns[field]
+            indexes[field] = CategoryIndex(field, None, categories, strict, codes=codes,
+                                           ordered=field in self.categories, order=orders.get(field))
+        for field in DATE_FIELDS:
+            keys, nulls = columns[field]
+            indexes[field] = DateIndex(field, None, keys, nulls, order=orders.get(field))
+        # Generated issue n is at position n - 1
+        indexes["issuekey"] = KeyIndex("issuekey", self.position, len(self))
+        self.view = StoreView(indexes, np.arange(len(self)))
+
+    def all_positions(self):
+        return self.view.all_positions()
+
+    def index_for(self, field):
+        return self.view.index_for(field)
+
+    def search(self, jql, now=None):
+        """Return the positions of the issues matching jql (text or a parsed Query), in result order"""
+        query = parse_jql(jql) if isinstance(jql, str) else jql
+        return evaluate_jql(query, self.view, now)
+
+    def position(self, key):
+        return self.key_index.get(key)
+
+    def key_at(self, pos):
+        return self.issues[pos]["key"]
+
+    def get(self, key):
+        pos = self.position(key)
+        return None if pos is None else self.issue_at(pos)
+
+    def changelog(self, key, start_at=0, max_results=CHANGELOG_PAGE_SIZE):
+        """Return a page of an issue's precomputed changelog.
+
+        The page is a new dict over a slice of the stored histories, so callers
+        can never modify the shared changelog through it.
+        """
+        histories = self.issue_changelogs.get(key, [])
+        return changelog_page(histories[start_at:start_at + max_results], start_at, max_results, len(histories))
+
+    def encode_issue(self, pos):
+        return json.dumps(self.issues[pos], separators=(",", ":")).encode()
+
+    def encode_changelog(self, pos):
+        with phase("changelog"):
+            return json.dumps(self.changelog(self.key_at(pos)), separators=(",", ":")).encode()
+
+    def issue_json(self, key, changelog=False, fields=None):
+        """Return the encoded JSON for an issue, or None if the key is unknown"""
+        pos = self.position(key)
+        return None if pos is None else self.issue_json_at(pos, changelog, fields)
+
+    def issue_fragments(self, pos):
+        # Read the revision before the issue: an entry tagged with the current revision is never stale
+        revision = self.revisions.get(pos, 0)
+        cached = self.fragment_cache.get(pos)
+        if cached is not None and cached[0] == revision:
+            return cached[1]
+        head, names, fragments = encode_issue_parts(self.issue_at(pos))
+        parts = (head, dict(zip(names, fragments)))
+        self.fragment_cache[pos] = (revision, parts)
+        return parts
+
+    def project_issue(self, pos, fields):
+        """Encoded JSON of the issue at pos with only the given fields"""
+        head, fragments = self.issue_fragments(pos)
+        return join_issue(head, [fragments[name] for name in fields if name in fragments])
+
+    def select_fields(self, spec, default="*all"):
+        """Resolve a fields parameter against this store's fields (None selects them all)"""
+        return parse_fields(spec, self.field_names, default)
+
+    def issue_json_at(self, pos, changelog=False, fields=None):
+        if fields is not None:
+            # Projections are joined from cached per-field fragments instead of being cached whole
+            body = self.project_issue(pos, fields)
+            if changelog:
+                body = body[:-1] + b',"changelog":' + self.encode_changelog(pos) + b'}'
+            return body
+        revision = self.revisions.get(pos, 0)
+        cached = self.json_cache.get((pos, changelog))
+        if cached is not None and cached[0] == revision:
+            return cached[1]
+        if changelog:
+            body = self.issue_json_at(pos)[:-1] + b',"changelog":' + self.encode_changelog(pos) + b'}'
+        else:
+            body = self.encode_issue(pos)
+        self.json_cache[(pos, changelog)] = (revision, body)
+        return body
+
+    def issues_json(self, positions, changelog=False, fields=None):
+        """Return the encoded JSON of the issues at positions, in order"""
+        return [self.issue_json_at(pos, changelog, fields) for pos in positions]
+
+    def history_count(self):
+        """Number of changelog histories across all issues"""
+        return sum(len(histories) for histories in self.issue_changelogs.values())
+
+    def revision(self, pos):
+        """Number of times the issue at pos has changed since the store was loaded"""
+        return self.revisions.get(pos, 0)
+
+    def invalidate(self, key):
+        """Move an issue to a new revision after it or its history changed, dropping its cached encodings.
+
+        Called after the new version is in place, so a reader that sees the
+        new revision also sees the new data.
+        """
+        pos = self.position(key)
+        self.revisions[pos] = self.revisions.get(pos, 0) + 1
+        self.json_cache.pop((pos, False), None)
+        self.json_cache.pop((pos, True), None)
+        self.fragment_cache.pop(pos, None)
+        self.generation += 1
+        self.modified = time.time()
+
+    def publish(self, positions, previous=()):
+        """Reindex the issues at positions and publish the result as the new view.
+
+        previous holds the versions the issues replaced, so only fields whose
+        values changed are reindexed; new positions are indexed in every field.
+        """
+        issues = [self.issue_at(pos) for pos in positions]
+        indexes = dict(self.view.indexes)
+        extractors = [(field, extract) for field, (_, extract, _) in CATEGORY_FIELDS.items()] + \
+                     [(field, extract) for field, (_, extract) in DATE_FIELDS.items()] + \
+                     [(field, extract) for field, (_, extract) in KEY_FIELDS.items()]
+        for field, extract in extractors:
+            values = [extract(issue) for issue in issues]
+            if previous and values == [extract(issue) for issue in previous]:
+                continue
+            indexes[field] = indexes[field].with_values(positions, values)
+        positions = self.view.positions
+        if len(positions) != len(self):
+            positions = np.arange(len(self))
+        self.view = StoreView(indexes, positions)
+
+    def declare_values(self, field, values):
+        """Make values valid in JQL on a category field although no issue holds them, e.g. other projects' keys"""
+        with self.write_lock:
+            indexes = dict(self.view.indexes)
+            indexes[field] = indexes[field].with_categories(values)
+            self.view = StoreView(indexes, self.view.positions)
+
+    def add_field_names(self, issues):
+        names = [name for issue in issues for name in issue["fields"] if name not in self.field_names]
+        if names:
+            self.field_names = self.field_names + list(dict.fromkeys(names))
+
+    def replace_issue(self, issue, changes=(), now=None):
+        """Swap in a new version of an existing issue and refresh everything derived from it.
+
+        changes are status change rows appended to the issue's history with
+        it: the new history is built first and put in place next to the new
+        issue, and both move to one new revision, so no version of the issue
+        is ever published with a history it does not have. Like Jira, the
+        store stamps the new version's updated field with the time of the
+        change: now (a Jira timestamp), or the current time.
+        """
+        with self.write_lock:
+            pos = self.position(issue["key"])
+            previous = self.issue_at(pos)
+            issue = dict(issue, fields=dict(issue["fields"], updated=now or jira_now()))
+            history = self.extended_history(issue["key"], changes) if changes else None
+            self.set_issue(pos, issue)
+            if history is not None:
+                self.set_history(issue["key"], history)
+            self.add_field_names([issue])
+            self.publish([pos], [previous])
+            self.invalidate(issue["key"])
+
+    def add_issues(self, issues):
+        """Append new issues with empty histories and index them; returns their positions"""
+        with self.write_lock:
+            start = len(self.issues)
+            positions = list(range(start, start + len(issues)))
+            for issue in issues:
+                self.issue_history[issue["key"]] = []
+                self.issue_changelogs[issue["key"]] = []
+            self.issues.extend(issues)
+            self.add_field_names(issues)
+            self.publish(positions)
+            for pos, issue in zip(positions, issues):
+                self.key_index[issue["key"]] = pos
+            self.generation += 1
+            self.modified = time.time()
+            return positions
+
+    def append_history(self, key, changes):
+        """Append flat status change rows to an issue's history and changelog"""
+        with self.write_lock:
+            self.set_history(key, self.extended_history(key, changes))
+            self.invalidate(key)
+
+    def extended_history(self, key, changes):
+        """An issue's (history, changelog) with changes appended, for set_history.
+
+        Both are longer copies, so a reader paging the old changelog never
+        sees it change underneath. Called under write_lock.
+        """
+        if self.next_history_id is None:
+            # Generated history ids are first_id + the global history row
+            self.next_history_id = self.first_id + self.history_count()
+        history = self.issue_history.get(key, [])
+        histories = build_histories(changes, itertools.count(self.next_history_id), len(history))
+        self.next_history_id += len(changes)
+        return history + changes, self.issue_changelogs.get(key, []) + histories
+
+    def set_history(self, key, history):
+        self.issue_history[key], self.issue_changelogs[key] = history
+
+    def watchers(self, key):
+        """Stored watchers of an issue, or None if they were never changed"""
+        return self.watcher_lists.get(key)
+
+    def set_watchers(self, key, watchers):
+        """Store an issue's watchers; like any other change this stamps the issue's updated field"""
+        with self.write_lock:
+            self.watcher_lists[key] = watchers
+            self.replace_issue(self.get(key))
@@ -0,0 +1,187 @@
+import os
+import json
+import math
+import time
+import random
+import datetime
+import threading
+from collections import OrderedDict
+
+# Built-in traffic profiles; JIRA_MOCK_TRAFFIC names one of these or points at a JSON file of the same shape.
+#
+# routes maps endpoint names (e.g. search_issues, get_issue, "default") to
+#   latency: {"type": "fixed", "ms": 20}
+#            {"type": "normal", "meanMs": 40, "stddevMs": 10}
+#            {"type": "percentiles", "p50": 120, "p90": 300, "p99": 1200, "max": 4000}
+#   perIssueMs / perChangelogMs: extra delay per issue / per expanded changelog in the payload
+#   perKbMs: extra delay per KB of a non-streamed body
+# rateLimit is a token bucket: {"requestsPerSecond": 10, "burst": 100, "scope": "client" | "global"}
+PROFILES = {
+    "none": {"routes": {}},
+    "cloud": {
+        "routes": {
+            "default": {"latency": {"type": "percentiles", "p50": 60, "p90": 150, "p99": 600, "max": 2000}},
+            "search_issues": {"latency": {"type": "percentiles", "p50": 250, "p90": 700, "p99": 2500, "max": 8000},
+                              "perIssueMs": 2, "perChangelogMs": 4},
+            "search_issues_jql": {"latency": {"type": "percentiles", "p50": 250, "p90": 700, "p99": 2500,
+                                              "max": 8000},
+                                  "perIssueMs": 2, "perChangelogMs": 4},
+            "get_issue": {"latency": {"type": "normal", "meanMs": 80, "stddevMs": 25}, "perChangelogMs": 4},
+            "get_watchers": {"latency": {"type": "normal", "meanMs": 70, "stddevMs": 20}},
+            "healthcheck": {"latency": {"type": "fixed", "ms": 0}}
+        },
+        "rateLimit": {"requestsPerSecond": 10, "burst": 100, "scope": "client"}
+    }
+}
+
+
+class LatencyDistribution:
+    """Samples a delay in seconds from a fixed, normal or percentile-table distribution"""
+
+    def __init__(self, config, rng):
+        self.rng = rng
+        self.kind = config.get("type", "fixed")
+        if self.kind == "fixed":
+            self.ms = float(config.get("ms", 0))
+        elif self.kind == "normal":
+            self.mean = float(config["meanMs"])
+            self.stddev = float(config.get("stddevMs", 0))
+        elif self.kind == "percentiles":
+            # Piecewise-linear inverse CDF through (quantile, ms) points, e.g. p50 -> (0.5, ms)
+            points = {0.0: float(config.get("min", 0))}
+            for name, value in config.items():
+                if name.startswith("p") and name[1:].replace(".", "", 1).isdigit():
+                    points[float(name[1:]) / 100] = float(value)
+            points[1.0] = float(config.get("max", max(points.values())))
+            self.quantiles = sorted(points)
+            self.values = [points[q] for q in self.quantiles]
+        else:
+            raise ValueError(f"Unknown latency distribution type '{self.kind}'")
+
+    def sample(self):
+        if self.kind == "fixed":
+            ms = self.ms
+        elif self.kind == "normal":
+            ms = max(0.0, self.rng.gauss(self.mean, self.stddev))
+        else:
+            u = self.rng.random()
+            for i in range(1, len(self.quantiles)):
+                if u <= self.quantiles[i]:
+                    low, high = self.quantiles[i - 1], self.quantiles[i]
+                    share = (u - low) / (high - low) if high > low else 1.0
+                    ms = self.values[i - 1] + share * (self.values[i] - self.values[i - 1])
+                    break
+            else:
+                ms = self.values[-1]
+        return ms / 1000
+
+
+class TokenBucket:
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now):
+        """Take a token; returns seconds until one is available (0 if taken)"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class TrafficProfile:
+    """Per-route simulated latency and token-bucket rate limiting.
+
+    The profile only decides how long to wait; callers sleep (time.sleep under
+    WSGI, asyncio.sleep under ASGI) so no CPU is spent on the delay. Buckets
+    are kept per client in order of last use; a bucket idle long enough to be
+    full again is dropped, since a new one starts full as well.
+    """
+
+    def __init__(self, config, rng=None, clock=time.monotonic):
+        self.rng = rng or random.Random()
+        self.clock = clock
+        self.routes = {}
+        for endpoint, route in config.get("routes", {}).items():
+            latency = route.get("latency")
+            self.routes[endpoint] = {
+                "latency": LatencyDistribution(latency, self.rng) if latency else None,
+                "perIssueMs": float(route.get("perIssueMs", 0)),
+                "perChangelogMs": float(route.get("perChangelogMs", 0)),
+                "perKbMs": float(route.get("perKbMs", 0)),
+            }
+        limit = config.get("rateLimit")
+        self.rate = float(limit["requestsPerSecond"]) if limit else None
+        self.burst = float(limit.get("burst", self.rate)) if limit else None
+        self.scope = limit.get("scope", "client") if limit else None
+        # client -> TokenBucket, least recently used first
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.routes) or self.rate is not None
+
+    def admit(self, req):
+        """Apply the rate limit to a request.
+
+        Returns (allowed, headers); rejected requests get Jira Cloud's
+        Retry-After and X-RateLimit-* headers for a 429 response.
+        """
+        if self.rate is None:
+            return True, {}
+        client = "global" if self.scope == "global" else req.headers.get("Authorization", "anonymous")
+        now = self.clock()
+        with self.lock:
+            bucket = self.buckets.get(client)
+            if bucket is None:
+                bucket = self.buckets[client] = TokenBucket(self.rate, self.burst, now)
+            else:
+                self.buckets.move_to_end(client)
+            wait = bucket.take(now)
+            remaining = int(bucket.tokens)
+            self.evict(now)
+        headers = {"X-RateLimit-Limit": str(int(self.burst)), "X-RateLimit-Remaining": str(remaining)}
+        if wait == 0:
+            return True, headers
+        reset = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=wait)
+        headers["Retry-After"] = str(math.ceil(wait))
+        headers["X-RateLimit-Reset"] = reset.strftime("%Y-%m-%dT%H:%MZ")
+        headers["RateLimit-Reason"] = "jira-burst-based"
+        return False, headers
+
+    def evict(self, now):
+        """Drop buckets that have refilled completely; the least recently used are at the front"""
+        idle = now - self.burst / self.rate
+        while self.buckets:
+            oldest = next(iter(self.buckets.values()))
+            if oldest.updated > idle:
+                return
+            self.buckets.popitem(last=False)
+
+    def delay(self, endpoint, response):
+        """Seconds to hold a response for: route latency plus payload-dependent time"""
+        route = self.routes.get(endpoint) or self.routes.get("default")
+        if route is None:
+            return 0.0
+        seconds = route["latency"].sample() if route["latency"] else 0.0
+        ms = route["perIssueMs"] * response.issues + route["perChangelogMs"] * response.changelogs
+        if route["perKbMs"] and isinstance(response.body, bytes):
+            ms += route["perKbMs"] * len(response.body) / 1024
+        return seconds + ms / 1000
+
+
+def load_profile(name_or_path):
+    """Load a built-in profile by name or a JSON profile from a file"""
+    if not name_or_path:
+        return TrafficProfile(PROFILES["none"])
+    if name_or_path in PROFILES:
+        return TrafficProfile(PROFILES[name_or_path])
+    if not os.path.exists(name_or_path):
+        raise ValueError(f"Unknown traffic profile '{name_or_path}'")
+    with open(name_or_path) as f:
+        return TrafficProfile(json.load(f))
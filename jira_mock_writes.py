@@ -0,0 +1,189 @@
+import datetime
+
+# Editable fields -> how a value is stored, matching the layout MockDataset.to_issues generates
+FIELD_SHAPES = {
+    "summary": "text",
+    "description": "text",
+    "duedate": "date",
+    "priority": "name",
+    "customfield_10001": "name",
+    "assignee": "user",
+    "reporter": "user",
+    "customfield_10078": "option",
+    "customfield_10046": "option",
+    "customfield_10045": "options",
+}
+# Accepted and ignored: the mock has a single issue type
+IGNORED_FIELDS = {"issuetype"}
+# Jira caps bulk create requests at this many issues
+BULK_CREATE_LIMIT = 50
+
+
+class WriteError(Exception):
+    """A rejected write, reported the way Jira does: error messages plus per-field errors"""
+
+    def __init__(self, errors=None, messages=None):
+        self.errors = errors or {}
+        self.messages = messages or []
+        super().__init__("; ".join(self.messages + [f"{field}: {error}" for field, error in self.errors.items()]))
+
+    def body(self):
+        return {"errorMessages": self.messages, "errors": self.errors}
+
+
+class ReadOnlyStore(Exception):
+    """Raised by a store that cannot be written to, e.g. one serving a memory-mapped snapshot"""
+
+
+def _name(value, *attributes):
+    # Jira clients send objects ({"name": ...}, {"value": ...}) or plain strings for the same fields
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        for attribute in attributes:
+            if isinstance(value.get(attribute), str):
+                return value[attribute]
+    return None
+
+
+def shape_value(field, value, categories):
+    """Convert a value sent for field to the stored shape; raises ValueError with Jira's message"""
+    shape = FIELD_SHAPES[field]
+    if value is None:
+        if field == "summary":
+            raise ValueError("You must specify a summary of the issue.")
+        return None
+    if shape == "text":
+        if not isinstance(value, str) or (field == "summary" and not value.strip()):
+            raise ValueError("You must specify a summary of the issue." if field == "summary" else
+                             f"Field '{field}' must be a string.")
+        return value
+    if shape == "date":
+        try:
+            day = datetime.date.fromisoformat(value[:10])
+        except (TypeError, ValueError):
+            raise ValueError("Error parsing date string. Expected format is yyyy-MM-dd.") from None
+        return f"{day.isoformat()}T00:00:00.000000+0000"
+    if shape == "options":
+        values = value if isinstance(value, list) else [value]
+        names = [_name(item, "value") for item in values]
+        if None in names:
+            raise ValueError(f"Specify the value for {field} in a valid format.")
+        return [{"value": name} for name in names]
+    name = _name(value, *{"name": ("name", "id"), "user": ("displayName", "name", "accountId"),
+                          "option": ("value",)}[shape])
+    if name is None:
+        raise ValueError(f"Specify the value for {field} in a valid format.")
+    allowed = categories.get(field)
+    if allowed:
+        match = next((option for option in allowed if option.lower() == name.lower()), None)
+        if match is None:
+            raise ValueError(f"Specify a valid value for {field}: '{name}' is not one of {', '.join(allowed)}.")
+        name = match
+    return {"name": name} if shape == "name" else {"displayName": name} if shape == "user" else {"value": name}
+
+
+def apply_updates(fields, body, categories):
+    """Return a copy of an issue's fields with a request's "fields" and "update" applied.
+
+    "update" supports set on every editable field and add/remove on
+    multi-value fields. Anything invalid raises WriteError with every
+    field error found, and nothing is applied.
+    """
+    if not isinstance(body, dict):
+        raise WriteError(messages=["The request body must be a JSON object."])
+    fields = dict(fields)
+    errors = {}
+
+    def assign(field, value):
+        if field in IGNORED_FIELDS:
+            return
+        if field not in FIELD_SHAPES:
+            errors[field] = f"Field '{field}' cannot be set. It is not on the appropriate screen, or unknown."
+            return
+        try:
+            fields[field] = shape_value(field, value, categories)
+        except ValueError as e:
+            errors[field] = str(e)
+
+    for field, value in (body.get("fields") or {}).items():
+        assign(field, value)
+    for field, operations in (body.get("update") or {}).items():
+        for operation in operations if isinstance(operations, list) else [operations]:
+            for verb, value in (operation.items() if isinstance(operation, dict) else [(None, None)]):
+                if verb == "set":
+                    assign(field, value)
+                elif verb in ("add", "remove") and FIELD_SHAPES.get(field) == "options":
+                    try:
+                        (item,) = shape_value(field, value, categories)
+                    except ValueError as e:
+                        errors[field] = str(e)
+                        continue
+                    current = [option for option in fields.get(field) or [] if option != item]
+                    fields[field] = current + [item] if verb == "add" else current
+                else:
+                    errors[field] = f"Operation '{verb}' is not supported for field '{field}'."
+    if errors:
+        raise WriteError(errors)
+    return fields
+
+
+def requested_project(body):
+    """The project key, name or id a create request names, or None"""
+    if not isinstance(body, dict) or not isinstance(body.get("fields"), dict):
+        return None
+    return _name(body["fields"].get("project"), "key", "name", "id")
+
+
+def new_issue(number, body, project, base_url, user, now, categories):
+    """Build issue number (1-based position in its project) from a create request, laid out like a generated issue"""
+    if not isinstance(body, dict) or not isinstance(body.get("fields"), dict):
+        raise WriteError(messages=["The request body must be a JSON object with a fields object."])
+    requested = dict(body["fields"])
+    target = _name(requested.pop("project", None), "key", "name", "id")
+    if target is None or target.lower() not in (project.key.lower(), project.name.lower(), project.id):
+        raise WriteError({"project": "valid project is required"})
+    if "summary" not in requested and "summary" not in (body.get("update") or {}):
+        raise WriteError({"summary": "You must specify a summary of the issue."})
+    key = f"{project.key}-{number}"
+    priorities = categories.get("priority") or ["Medium"]
+    fields = {
+        "project": {"name": project.key},
+        "customfield_10001": {"name": project.values("team")[0]},
+        "created": now,
+        "updated": now,
+        "creator": {"displayName": user},
+        "reporter": {"displayName": user},
+        "assignee": None,
+        "status": {"name": categories["status"][0]},
+        "priority": {"name": "Medium" if "Medium" in priorities else priorities[0]},
+        "customfield_10078": None,
+        "summary": None,
+        "description": None,
+        "customfield_10046": None,
+        "customfield_10045": None,
+        "duedate": None,
+        "watches": {"self": f"{base_url}/rest/api/2/issue/{key}/watchers"},
+    }
+    fields = apply_updates(fields, dict(body, fields=requested), categories)
+    return {"id": str(project.first_id + number - 1), "key": key, "fields": fields}
+
+
+def transition_id(statuses, status):
+    return str(11 + 10 * statuses.index(status))
+
+
+def transitions(statuses, current):
+    """The transitions available from status current: the mock workflow allows moving to any other status"""
+    return [{"id": transition_id(statuses, status), "name": status,
+             "to": {"id": str(statuses.index(status) + 1), "name": status}}
+            for status in statuses if status != current]
+
+
+def transition_target(statuses, current, transition):
+    """Status a transition request ({"id": ...} or {"name": ...}) leads to from current, or None if invalid"""
+    for option in transitions(statuses, current):
+        if isinstance(transition, dict) and (str(transition.get("id")) == option["id"] or
+                                             transition.get("name") == option["name"]):
+            return option["name"]
+    return None
@@ -1 +1,4 @@
-gunicorn -w 4 -b 0.0.0.0:8000 app:app
+# Generate the dataset once into a snapshot that every worker memory-maps. Snapshots are read-only
+# and each worker has its own store, so for write tests run JIRA_MOCK_SNAPSHOT= JIRA_MOCK_WORKERS=1
+export JIRA_MOCK_SNAPSHOT=${JIRA_MOCK_SNAPSHOT-/tmp/jira-mock-snapshot}
+gunicorn --preload -w ${JIRA_MOCK_WORKERS:-4} -b 0.0.0.0:8000 app:app
@@ -0,0 +1,4 @@
+# Serve the same routes from an event loop; each worker handles thousands of keep-alive connections.
+# As with startup.sh, write tests need JIRA_MOCK_SNAPSHOT= JIRA_MOCK_WORKERS=1
+export JIRA_MOCK_SNAPSHOT=${JIRA_MOCK_SNAPSHOT-/tmp/jira-mock-snapshot}
+uvicorn asgi_app:app --host 0.0.0.0 --port 8000 --workers ${JIRA_MOCK_WORKERS:-4}
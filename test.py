@@ -8,6 +8,7 @@ from jira_mock_config import Config, setup_logger
 # You may need to adjust the import path based on your file structure
 # sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from BAJiraHelper import BAJiraHelper
+from BAJiraAnalytics import BAJiraAnalytics
 
 def main():
     # Setup logger and config
@@ -40,6 +41,13 @@ def main():
         history_df = jira_helper.getAllIssueHistoryDF(start_date)
         logger.info(f"Retrieved {len(history_df)} history records")
         logger.info(f"Sample history:\n{history_df.head()}")
+
+        # Test the status analytics on the pulled issues and history
+        analytics = BAJiraAnalytics(config, logger)
+        metrics_df = analytics.getIssueMetricsDF(issues_df, history_df)
+        logger.info(f"Sample issue metrics:\n{metrics_df.head()}")
+        throughput_df = analytics.getThroughputDF(metrics_df)
+        logger.info(f"Weekly throughput:\n{throughput_df.tail()}")
         
         logger.info("All tests completed successfully")
     except Exception as e:
@@ -0,0 +1,80 @@
+import os
+import sys
+import datetime
+import threading
+
+import pytest
+
+# The server and helper modules live at the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jira_mock_generator import generate_dataset  # noqa: E402
+from jira_mock_columnar import ColumnarIssueStore  # noqa: E402
+
+ANCHOR = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+BASE_URL = "http://localhost:5000"
+
+
+@pytest.fixture
+def dataset():
+    return generate_dataset(200, seed=7, anchor=ANCHOR)
+
+
+@pytest.fixture
+def store(dataset):
+    return ColumnarIssueStore(dataset, BASE_URL)
+
+
+def partitioned_store(base_url, spec=None, issues=100):
+    """A PartitionedIssueStore of the projects in spec (one project, MOCK, by default) generated from ANCHOR"""
+    from jira_mock_partitions import PartitionedIssueStore, load_projects
+
+    projects = load_projects(spec, issues, 7)
+    partitions = [ColumnarIssueStore(generate_dataset(project.issues, seed=project.seed,
+                                                      distributions=project.distributions, project=project.key,
+                                                      anchor=ANCHOR, first_id=project.first_id), base_url,
+                                     {"status": project.values("status"), "priority": project.values("priority")})
+                  for project in projects]
+    return PartitionedIssueStore(projects, partitions)
+
+
+@pytest.fixture
+def app_module(monkeypatch):
+    """The app module with its store swapped for a fresh one per test; handlers are called through RESPONDERS"""
+    import app
+
+    monkeypatch.setattr(app, "store", partitioned_store(BASE_URL))
+    return app
+
+
+@pytest.fixture
+def live_server(monkeypatch):
+    """The Flask app served over HTTP on a free port; returns the app module, base_url set to the server.
+
+    Issue and watcher URLs in responses point at the server, and the caches
+    are fresh, so nothing served for another test's store is reused.
+    """
+    import app
+    from werkzeug.serving import make_server
+    from jira_mock_cursor import SearchCursors
+    from jira_mock_http import CompressedCache
+
+    server = make_server("127.0.0.1", 0, app.app, threaded=True)
+    url = f"http://127.0.0.1:{server.server_port}"
+    # Two teams, so a helper pulling one of them has issues to filter out
+    spec = '[{"key": "MOCK", "teams": {"Toasted Snow": 2, "Red": 1}}]'
+    monkeypatch.setattr(app, "store", partitioned_store(url, spec, 230))
+    monkeypatch.setattr(app, "base_url", url)
+    monkeypatch.setattr(app, "compressed_cache", CompressedCache(1 << 20))
+    monkeypatch.setattr(app, "cursors", SearchCursors(1 << 20, 60))
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield app
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+def call(app, endpoint, method="GET", data=None, args=None, headers=None, **view_args):
+    """Call a route handler of app directly"""
+    return app.RESPONDERS[endpoint](app.MockRequest(method, args or {}, data, headers or {}), **view_args)
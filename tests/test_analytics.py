@@ -0,0 +1,46 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from BAJiraAnalytics import BAJiraAnalytics
+from jira_mock_config import Config
+
+
+@pytest.fixture
+def analytics():
+    return BAJiraAnalytics(Config(), logging.getLogger("test"))
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2025-01-31T09:30:00.000000+0000", "2025-01-31T09:30:00"),      # the mock's 6 fraction digits
+    ("2025-01-31T09:30:00.123+0000", "2025-01-31T09:30:00.123"),     # Jira's 3
+    ("2025-01-31T09:30:00.5-0130", "2025-01-31T11:00:00.5"),
+    ("2025-01-31T09:30:00+0545", "2025-01-31T03:45:00"),
+    ("2025-01-31T09:30:00Z", "2025-01-31T09:30:00"),
+    (None, "NaT"),
+    ("unknown", "NaT"),
+    ("2025-02-30T09:30:00.000+0000", "NaT"),
+])
+def test_parse_times(analytics, value, expected):
+    times = analytics.parseTimes(["2025-01-01T00:00:00.000+0000", value])
+    assert times.dtype == np.dtype("datetime64[ns]")
+    np.testing.assert_array_equal(times, np.array(["2025-01-01T00:00:00", expected], dtype="datetime64[ns]"))
+
+
+def test_metrics(analytics):
+    issues = pd.DataFrame({
+        "Key": ["A-1", "A-2", "A-3"], "ProjectName": "A", "Team": "Red", "Status": ["Done", "In Progress", "To Do"],
+        "Created": ["2025-01-01T00:00:00.000000+0000", "2025-01-02T00:00:00.000+0000",
+                    "2025-01-03T00:00:00.000+0000"]})
+    history = pd.DataFrame({
+        "Key": ["A-1", "A-1", "A-2"], "Author": "Jane Smith",
+        "DateTime": ["2025-01-02T00:00:00.000000+0000", "2025-01-05T12:00:00.000000+0000",
+                     "2025-01-04T02:00:00.000+0200"],
+        "FromStatus": ["To Do", "In Progress", "To Do"], "ToStatus": ["In Progress", "Done", "In Progress"]})
+    metrics = analytics.getIssueMetricsDF(issues, history, pAsOf="2025-01-10")
+    assert metrics["LeadTimeDays"].tolist()[0] == 4.5
+    assert metrics["CycleTimeDays"].tolist()[0] == 3.5
+    assert metrics[["LeadTimeDays", "CycleTimeDays"]].iloc[1:].isna().all().all()
+    assert metrics[["To Do", "In Progress", "Done"]].values.tolist() == [[1, 3.5, 4.5], [2, 6, 0], [7, 0, 0]]
@@ -0,0 +1,104 @@
+import time
+import json
+import asyncio
+
+import pytest
+
+from jira_mock_throttle import TrafficProfile
+
+
+@pytest.fixture
+def asgi(app_module):
+    import asgi_app
+    return asgi_app
+
+
+async def serve(asgi, method, path, query=b"", body=b"", headers=()):
+    """The messages the ASGI app sends for one request"""
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+    scope = {"type": "http", "method": method, "path": path, "query_string": query,
+             "headers": [(name.lower().encode(), value.encode()) for name, value in headers]}
+    await asgi.app(scope, receive, send)
+    return sent
+
+
+def asgi_request(asgi, *args):
+    """Run one request through the ASGI app; returns (status, headers, body)"""
+    return response_of(asyncio.run(serve(asgi, *args)))
+
+
+def response_of(sent):
+    start, parts = sent[0], sent[1:]
+    assert start["type"] == "http.response.start" and not parts[-1].get("more_body")
+    headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    return start["status"], headers, b"".join(part["body"] for part in parts)
+
+
+@pytest.mark.parametrize("method, path, query, data", [
+    ("GET", "/rest/api/2/search", "jql=status%20%3D%20Done&maxResults=120", None),
+    ("GET", "/rest/api/2/search", "jql=status%20%3D%20Nope", None),
+    ("POST", "/rest/api/2/search", "", {"jql": "order by created desc", "maxResults": 30, "fields": ["summary"]}),
+    ("GET", "/rest/api/2/issue/MOCK-7", "expand=changelog", None),
+    ("GET", "/rest/api/2/issue/MOCK-999", "", None),
+    ("GET", "/rest/api/2/project", "", None),
+    ("PUT", "/rest/api/2/issue/MOCK-4", "", {"fields": {"priority": {"name": "Low"}}}),
+    ("POST", "/healthcheck", "", None),
+])
+def test_responses_match_flask(app_module, asgi, monkeypatch, method, path, query, data):
+    # The healthcheck body carries the time
+    monkeypatch.setitem(app_module.RESPONDERS, "healthcheck", lambda req: app_module.json_response({"status": "UP"}))
+    client = app_module.app.test_client()
+    body = json.dumps(data).encode() if data is not None else b""
+    headers = [("Content-Type", "application/json")] if data is not None else []
+    expected = client.open(path, method=method, query_string=query, data=body, headers=headers)
+    status, got_headers, got = asgi_request(asgi, method, path, query.encode(), body, headers)
+    assert status == expected.status_code
+    if status == 405:
+        return
+    assert got == expected.get_data()
+    for name in ("ETag", "Content-Type"):
+        assert got_headers.get(name.lower()) == expected.headers.get(name)
+
+
+def test_streamed_bodies_match_flask(app_module, asgi, monkeypatch):
+    monkeypatch.setattr(app_module, "STREAM_MIN_RESULTS", 0)
+    monkeypatch.setattr(app_module, "STREAM_CHUNK_BYTES", 1024)
+    expected = app_module.app.test_client().get("/rest/api/2/search?maxResults=100").get_data()
+    sent = asyncio.run(serve(asgi, "GET", "/rest/api/2/search", b"maxResults=100"))
+    assert len(sent) > 3
+    assert response_of(sent)[2] == expected
+
+
+def finish_times(asgi, requests):
+    """Seconds from the start until each of requests, served concurrently, is complete"""
+    async def run():
+        started = time.perf_counter()
+
+        async def timed(request):
+            await serve(asgi, *request)
+            return time.perf_counter() - started
+        return await asyncio.gather(*(timed(request) for request in requests))
+    return asyncio.run(run())
+
+
+def test_a_slow_handler_does_not_hold_up_others(app_module, asgi, monkeypatch):
+    def slow_search(req):
+        time.sleep(0.5)
+        return app_module.json_response({"issues": []})
+    monkeypatch.setitem(app_module.RESPONDERS, "search_issues", slow_search)
+    slow, quick = finish_times(asgi, [("GET", "/rest/api/2/search"), ("GET", "/healthcheck")])
+    assert quick < 0.25 < slow
+
+
+def test_simulated_latency_is_awaited(app_module, asgi, monkeypatch):
+    monkeypatch.setattr(app_module, "traffic",
+                        TrafficProfile({"routes": {"healthcheck": {"latency": {"type": "fixed", "ms": 300}}}}))
+    times = finish_times(asgi, [("GET", "/healthcheck")] * 10)
+    assert 0.3 <= min(times) and max(times) < 1.0
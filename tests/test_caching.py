@@ -0,0 +1,63 @@
+import datetime
+import json
+
+import pytest
+
+from jira_mock_jql import parse_jql, query_clock
+
+from conftest import call
+
+NOW = datetime.datetime(2025, 3, 4, 10, 15, 42, 123456, tzinfo=datetime.timezone.utc)
+
+
+@pytest.mark.parametrize("jql", [
+    "created >= -30d",
+    "status = Done and updated > '-2h'",
+    "not (duedate < now())",
+    "created >= startOfDay() order by created",
+])
+def test_relative_queries_have_a_clock(jql):
+    assert query_clock(parse_jql(jql), NOW) == NOW.replace(second=0, microsecond=0)
+
+
+@pytest.mark.parametrize("jql", ["", "status = Done", "created >= '2025-01-01' order by updated",
+                                 "team = '-30d days'"])
+def test_absolute_queries_have_none(jql):
+    assert query_clock(parse_jql(jql), NOW) is None
+
+
+def search(app, jql, headers=None):
+    return call(app, "search_issues", args={"jql": jql}, headers=headers)
+
+
+def test_relative_search_is_revalidated_when_the_clock_moves(app_module, monkeypatch):
+    clock = [datetime.datetime.now(datetime.timezone.utc)]
+    monkeypatch.setattr(app_module, "query_clock", lambda query: query_clock(query, clock[0]))
+    first = search(app_module, "created >= -30d")
+    assert first.status == 200
+    assert search(app_module, "created >= -30d", {"If-None-Match": first.headers["ETag"]}).status == 304
+    clock[0] += datetime.timedelta(days=1)
+    later = search(app_module, "created >= -30d", {"If-None-Match": first.headers["ETag"]})
+    assert later.status == 200 and later.headers["ETag"] != first.headers["ETag"]
+    since = {"If-Modified-Since": first.headers["Last-Modified"]}
+    assert search(app_module, "created >= -30d", since).status == 200
+
+
+@pytest.mark.parametrize("endpoint", ["search_issues", "search_issues_jql"])
+def test_relative_search_is_evaluated_at_its_tagged_minute(app_module, monkeypatch, endpoint):
+    # An issue created within the minute the clock is truncated to: one day later, "created >= -1d" resolves
+    # to the start of that minute and so includes it, though a day before the exact clock does not
+    store = app_module.store
+    key = next(key for key in map(store.key_at, store.search(""))
+               if store.get(key)["fields"]["created"][17:23] != "00.000")
+    created = datetime.datetime.strptime(store.get(key)["fields"]["created"], "%Y-%m-%dT%H:%M:%S.%f%z")
+    now = created + datetime.timedelta(days=1, milliseconds=1)
+    monkeypatch.setattr(app_module, "query_clock", lambda query: query_clock(query, now))
+    monkeypatch.setattr(app_module, "STREAM_MIN_RESULTS", 1 << 30)
+    response = call(app_module, endpoint, args={"jql": "created >= -1d", "maxResults": 1000, "fields": "created"})
+    assert key in [issue["key"] for issue in json.loads(response.body)["issues"]]
+
+
+def test_absolute_search_keeps_its_tag(app_module):
+    first = search(app_module, "status = Done")
+    assert search(app_module, "status = Done", {"If-None-Match": first.headers["ETag"]}).status == 304
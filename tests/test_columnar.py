@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from jira_mock_columnar import ColumnarIssueStore
+from jira_mock_partitions import load_projects
+from jira_mock_store import IssueStore
+from jira_mock_writes import new_issue
+
+from conftest import BASE_URL
+
+NOW = "2025-01-02T03:04:05.678000+0000"
+CATEGORIES = {"status": ["To Do", "In Progress", "Code Review", "Testing", "Done"],
+              "priority": ["High", "Medium", "Low"]}
+
+
+def change(store, key, target, author="Test User"):
+    issue = store.get(key)
+    return [{"Key": key, "Author": author, "DateTime": NOW, "FromStatus": issue["fields"]["status"]["name"],
+             "ToStatus": target}]
+
+
+def apply_changes(store):
+    """The same edits, transitions and new issues, in the same order, on any kind of store"""
+    issue = store.get("MOCK-3")
+    store.replace_issue(dict(issue, fields=dict(issue["fields"], priority={"name": "Low"})), now=NOW)
+    issue = store.get("MOCK-10")
+    store.replace_issue(dict(issue, fields=dict(issue["fields"], status={"name": "Done"})),
+                        change(store, "MOCK-10", "Done"), NOW)
+    project = load_projects(None, 200, 7)[0]
+    created = [new_issue(len(store) + number, {"fields": {"summary": f"New {number}", "project": {"key": "MOCK"}}},
+                         project, BASE_URL, "Test User", NOW, CATEGORIES) for number in (1, 2)]
+    store.add_issues(created)
+    issue = store.get("MOCK-201")
+    store.replace_issue(dict(issue, fields=dict(issue["fields"], status={"name": "Testing"})),
+                        change(store, "MOCK-201", "Testing"), NOW)
+    store.append_history("MOCK-12", change(store, "MOCK-12", "Testing", "Jane Smith"))
+
+
+@pytest.fixture
+def stores(dataset):
+    columnar = ColumnarIssueStore(dataset, BASE_URL, CATEGORIES)
+    reference = IssueStore(*dataset.to_issues(BASE_URL), CATEGORIES)
+    apply_changes(columnar)
+    apply_changes(reference)
+    return columnar, reference
+
+
+# Generated, edited, created and appended-to issues, in and out of order
+POSITIONS = [0, 2, 9, 11, 199, 200, 201, 5, 2, 150, 9]
+
+
+@pytest.mark.parametrize("changelog", [False, True])
+@pytest.mark.parametrize("fields", [None, ["summary", "status", "updated"], ["watches"], ["nothing"], []])
+def test_issues_json_matches_the_dict_store(stores, changelog, fields):
+    columnar, reference = stores
+    assert columnar.issues_json(POSITIONS, changelog, fields) == reference.issues_json(POSITIONS, changelog, fields)
+    for pos in POSITIONS:
+        assert columnar.issue_json_at(pos, changelog, fields) == reference.issue_json_at(pos, changelog, fields)
+
+
+def test_generated_issues_alone_match(dataset):
+    columnar = ColumnarIssueStore(dataset, BASE_URL, CATEGORIES)
+    reference = IssueStore(*dataset.to_issues(BASE_URL), CATEGORIES)
+    positions = list(range(len(dataset)))
+    assert columnar.issues_json(positions, True) == reference.issues_json(positions, True)
+    assert columnar.issues_json([], True) == []
+
+
+def test_changelogs_and_lookups_match(stores):
+    columnar, reference = stores
+    assert len(columnar) == len(reference) == 202
+    assert columnar.history_count() == reference.history_count()
+    for key in ("MOCK-1", "MOCK-10", "MOCK-12", "MOCK-201", "MOCK-202"):
+        for start_at, max_results in ((0, 100), (1, 2), (3, 100), (50, 10)):
+            assert columnar.changelog(key, start_at, max_results) == reference.changelog(key, start_at, max_results)
+        assert columnar.get(key) == reference.get(key)
+        assert columnar.position(key) == reference.position(key)
+    assert json.loads(columnar.issue_json("MOCK-10"))["fields"]["updated"] == NOW
+    for key in ("MOCK-0", "MOCK-203", "OTHER-1", "MOCK-x"):
+        assert columnar.position(key) is None and columnar.get(key) is None
+
+
+@pytest.mark.parametrize("jql", ["status = Done order by key desc", "priority = Low", "assignee is empty",
+                                 "updated >= '2025-01-02' order by created", "key in (MOCK-201, MOCK-202, MOCK-3)"])
+def test_searches_match(stores, jql):
+    columnar, reference = stores
+    assert columnar.search(jql).tolist() == reference.search(jql).tolist()
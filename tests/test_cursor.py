@@ -0,0 +1,156 @@
+import base64
+import json
+
+import numpy as np
+import pytest
+
+from jira_mock_cursor import SearchCursors, TokenError, decode_token, encode_token, query_digest
+
+from conftest import call
+
+DIGEST = query_digest("status = Done")
+
+
+def pull(cursors, search, max_results, digest=DIGEST):
+    """Every page of a token-paginated search, as lists of positions"""
+    pages, token = [], None
+    while True:
+        page, token = cursors.page(token, digest, max_results, search)
+        pages.append(page.tolist())
+        if token is None:
+            return pages
+
+
+def test_pages_slice_the_pinned_result():
+    matches = np.arange(0, 100, 3)
+    searches = []
+
+    def search():
+        searches.append(1)
+        return matches
+
+    cursors = SearchCursors(1 << 20, 60)
+    pages = pull(cursors, search, 10)
+    assert sum(pages, []) == matches.tolist()
+    assert [len(page) for page in pages] == [10, 10, 10, 4]
+    assert len(searches) == 1
+    # The last page closes the cursor
+    assert len(cursors) == 0
+
+
+def test_token_round_trip():
+    token = encode_token("abc", 20, 57, DIGEST)
+    assert decode_token(token, DIGEST) == ("abc", 20, 57)
+
+
+def tampered(token, change):
+    raw = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    change(raw)
+    return base64.urlsafe_b64encode(json.dumps(raw).encode()).rstrip(b"=").decode()
+
+
+@pytest.mark.parametrize("token", [
+    "not a token!",
+    base64.urlsafe_b64encode(b"[1, 2]").decode(),
+    base64.urlsafe_b64encode(b'["abc", "x", 1, "d"]').decode(),
+])
+def test_malformed_tokens_are_rejected(token):
+    with pytest.raises(TokenError, match="not valid"):
+        decode_token(token, DIGEST)
+
+
+def test_tokens_of_other_queries_are_rejected():
+    token = encode_token("abc", 20, 57, DIGEST)
+    with pytest.raises(TokenError, match="does not belong"):
+        decode_token(token, query_digest("status = Testing"))
+
+
+def test_tampered_tokens_are_rejected():
+    token = encode_token("abc", 20, 57, DIGEST, b"secret")
+    assert decode_token(token, DIGEST, b"secret") == ("abc", 20, 57)
+    with pytest.raises(TokenError, match="not valid"):
+        decode_token(token, DIGEST, b"another secret")
+    with pytest.raises(TokenError, match="not valid"):
+        decode_token(tampered(token, lambda raw: raw.__setitem__(3, query_digest("other"))), DIGEST, b"secret")
+    with pytest.raises(TokenError, match="not valid"):
+        decode_token(tampered(token, lambda raw: raw.__setitem__(1, 80)), DIGEST, b"secret")
+
+
+def test_expired_cursor_resumes_after_the_last_issue(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("jira_mock_cursor.time.monotonic", lambda: clock[0])
+    matches = [np.arange(20)]
+    cursors = SearchCursors(1 << 20, ttl=60)
+    first, token = cursors.page(None, DIGEST, 5, lambda: matches[0])
+    assert first.tolist() == [0, 1, 2, 3, 4]
+    clock[0] += 61
+    # Issue 2 stopped matching and 100 started: the fresh search resumes after issue 4, the last one served
+    matches[0] = np.concatenate((np.delete(np.arange(20), 2), [100]))
+    cursors.evict()
+    assert len(cursors) == 0
+    page, token = cursors.page(token, DIGEST, 5, lambda: matches[0])
+    assert page.tolist() == [5, 6, 7, 8, 9]
+
+
+def test_expired_cursors_are_evicted_on_lookup(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("jira_mock_cursor.time.monotonic", lambda: clock[0])
+    cursors = SearchCursors(1 << 20, ttl=60)
+    first = cursors.open(np.arange(20))
+    cursors.open(np.arange(10))
+    clock[0] += 61
+    assert cursors.get(first) is None
+    assert len(cursors) == 0 and cursors.size == 0
+
+
+def test_another_worker_resumes_the_pull():
+    matches = np.arange(0, 100, 3)
+    searches = []
+
+    def search():
+        searches.append(1)
+        return matches
+
+    # Two worker processes, each with its own cursors and the shared secret
+    first, second = SearchCursors(1 << 20, 60, b"secret"), SearchCursors(1 << 20, 60, b"secret")
+    page, token = first.page(None, DIGEST, 10, search)
+    pages = [page.tolist()]
+    cursor = decode_token(token, DIGEST, b"secret")[0]
+    for cursors in (second, second, first):
+        page, token = cursors.page(token, DIGEST, 10, search)
+        pages.append(page.tolist())
+        assert token is None or decode_token(token, DIGEST, b"secret")[0] == cursor
+    assert sum(pages, []) == matches.tolist()
+    # The second worker searched once and pinned the result under the same cursor for its next page
+    assert len(searches) == 2
+    assert len(first) == 0 and len(second) == 1
+
+
+def test_cursor_resumes_from_the_offset_when_the_last_issue_is_gone():
+    cursors = SearchCursors(1 << 20, ttl=60)
+    page, token = cursors.page(None, DIGEST, 5, lambda: np.arange(20))
+    cursors.close(decode_token(token, DIGEST)[0])
+    page, token = cursors.page(token, DIGEST, 5, lambda: np.arange(5, 20))
+    assert page.tolist() == [10, 11, 12, 13, 14]
+
+
+def test_cursors_are_evicted_beyond_max_bytes():
+    matches = np.arange(1000)
+    cursors = SearchCursors(matches.nbytes * 2, ttl=60)
+    tokens = [cursors.page(None, DIGEST, 10, lambda: matches)[1] for _ in range(3)]
+    assert len(cursors) == 2
+    assert cursors.size == matches.nbytes * 2
+    # The oldest cursor is gone, but its token still resumes where it left off
+    page, _ = cursors.page(tokens[0], DIGEST, 10, lambda: matches)
+    assert page.tolist() == list(range(10, 20))
+
+
+def test_search_jql_endpoint_rejects_foreign_tokens(app_module):
+    first = json.loads(call(app_module, "search_issues_jql", args={"jql": "order by key", "maxResults": 3}).body)
+    assert not first["isLast"] and [issue["id"] for issue in first["issues"]] == ["10000", "10001", "10002"]
+    args = {"jql": "order by key", "maxResults": 3, "nextPageToken": first["nextPageToken"]}
+    second = json.loads(call(app_module, "search_issues_jql", args=args).body)
+    assert [issue["id"] for issue in second["issues"]] == ["10003", "10004", "10005"]
+    response = call(app_module, "search_issues_jql", args=dict(args, jql="order by key desc"))
+    assert response.status == 400
+    assert json.loads(response.body)["errorMessages"] == ["The nextPageToken does not belong to this query."]
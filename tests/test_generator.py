@@ -0,0 +1,36 @@
+import numpy as np
+
+from jira_mock_generator import generate_dataset
+
+from conftest import ANCHOR, BASE_URL
+
+
+def test_status_is_where_history_ends():
+    dataset = generate_dataset(2000, seed=3, anchor=ANCHOR)
+    lengths = np.diff(dataset.history_offsets)
+    with_history = np.flatnonzero(lengths > 0)
+    last_rows = dataset.history_offsets[1:][with_history] - 1
+    assert (dataset.codes["status"][with_history] == dataset.history_to[last_rows]).all()
+    # Every history starts in the first status and each change moves to the status the previous one reached
+    firsts = dataset.history_offsets[:-1][with_history]
+    assert (dataset.history_from[firsts] == 0).all()
+    follows = np.setdiff1d(np.arange(1, len(dataset.history_to)), firsts)
+    assert (dataset.history_from[follows] == dataset.history_to[follows - 1]).all()
+
+
+def test_issues_agree_with_their_changelogs():
+    issues, history, _ = generate_dataset(300, seed=5, anchor=ANCHOR).to_issues(BASE_URL)
+    for issue in issues:
+        rows = history[issue["key"]]
+        if rows:
+            assert issue["fields"]["status"]["name"] == rows[-1]["ToStatus"]
+            assert issue["fields"]["updated"] == rows[-1]["DateTime"]
+        else:
+            assert issue["fields"]["updated"] == issue["fields"]["created"]
+
+
+def test_seed_gives_the_same_dataset():
+    first, second = (generate_dataset(500, seed=11, anchor=ANCHOR) for _ in range(2))
+    for name in ("created", "updated", "due", "history_offsets", "history_to", "history_created"):
+        assert np.array_equal(getattr(first, name), getattr(second, name))
+    assert all(np.array_equal(first.codes[column], second.codes[column]) for column in first.codes)
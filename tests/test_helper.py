@@ -0,0 +1,290 @@
+import copy
+import json
+import time
+import logging
+
+import pandas as pd
+import pytest
+import requests
+
+import BAJiraHelper as helper_module
+import jira_mock_columnar
+from BAJiraHelper import BAJiraHelper
+from conftest import partitioned_store
+from jira_mock_config import Config
+from jira_mock_throttle import TrafficProfile
+
+START = "2000-01-01"
+TEAM = "Toasted Snow"
+
+
+def make_helper(url, **settings):
+    config = Config()
+    config.setParm("Jira.Server", url)
+    config.setParm("Jira.URL", url + "/rest/api/2/search")
+    config.setParm("Jira.Chunk", 25)
+    config.setParm("Jira.Threads", 4)
+    config.setParm("Jira.Backoff", 0.01)
+    for name, value in settings.items():
+        config.setParm("Jira." + name, value)
+    return BAJiraHelper(config, logging.getLogger("test"))
+
+
+@pytest.fixture
+def helper(live_server):
+    return make_helper(live_server.base_url)
+
+
+def team_keys(store, jql=f"project=MOCK and created>={START}", team=TEAM):
+    """Keys of our team's issues matching jql, in the server's order"""
+    return [store.key_at(pos) for pos in store.search(jql)
+            if store.get(store.key_at(pos))["fields"]["customfield_10001"]["name"] == team]
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Waits of the helper's retries, which are still slept"""
+    waits = []
+    sleep = time.sleep
+
+    def record(seconds):
+        waits.append(seconds)
+        sleep(seconds)
+    monkeypatch.setattr(helper_module.time, "sleep", record)
+    return waits
+
+
+@pytest.mark.parametrize("threads, chunk", [(1, 25), (4, 25), (8, 7), (4, 500)])
+def test_offset_pages_return_every_issue_once_in_order(live_server, threads, chunk):
+    helper = make_helper(live_server.base_url, Threads=threads, Chunk=chunk)
+    keys = helper.getIssuesCreatedAfterDF(START)["Key"].tolist()
+    assert keys == team_keys(live_server.store)
+    assert 100 < len(keys) < 230
+
+
+def test_pages_are_fetched_over_one_pooled_session(helper, monkeypatch):
+    sessions = set()
+    get = requests.Session.get
+
+    def record(session, *args, **kwargs):
+        sessions.add(id(session))
+        return get(session, *args, **kwargs)
+    monkeypatch.setattr(requests.Session, "get", record)
+    helper.getIssuesCreatedAfterDF(START)
+    assert sessions == {id(helper.getSession())}
+
+
+def test_rate_limited_requests_wait_for_retry_after(live_server, helper, monkeypatch, sleeps):
+    monkeypatch.setattr(live_server, "traffic",
+                        TrafficProfile({"rateLimit": {"requestsPerSecond": 4, "burst": 1, "scope": "global"}}))
+    url = live_server.base_url + "/healthcheck"
+    assert helper.getWithRetry(url).status_code == 200
+    assert helper.getWithRetry(url).status_code == 200
+    # The bucket is empty after the first request: the second got a 429 with Retry-After: 1 and waited that long
+    assert sleeps == [1.0]
+
+
+def test_server_errors_back_off_then_give_up(live_server, monkeypatch, sleeps):
+    failures = []
+
+    def unavailable(req):
+        failures.append(req)
+        return live_server.json_response({"errorMessages": ["Try again later."], "errors": {}}, 503)
+    monkeypatch.setitem(live_server.RESPONDERS, "healthcheck", unavailable)
+    helper = make_helper(live_server.base_url, Retries=2)
+    with pytest.raises(requests.HTTPError):
+        helper.getWithRetry(live_server.base_url + "/healthcheck")
+    assert len(failures) == 3
+    assert sleeps == [0.01, 0.02]
+
+
+def test_client_errors_are_not_retried(helper, live_server, sleeps):
+    with pytest.raises(requests.HTTPError):
+        helper.getWithRetry(live_server.base_url + "/rest/api/2/search", {"jql": "status = Nope"})
+    assert sleeps == []
+
+
+def row_by_row(issues, team=TEAM):
+    """The issue DF built one issue at a time by walking each G_Fields path, as the helper once did"""
+    rows = []
+    for issue in issues:
+        row = {}
+        for field in helper_module.G_Fields:
+            try:
+                value = issue[field["Path"][0]]
+                for part in field["Path"][1:]:
+                    value = value[part.replace("[0]", "")][0] if "[0]" in part else value[part]
+            except (KeyError, IndexError, TypeError):
+                value = 'unknown'
+            row[field["Field"]] = value
+        if row["Team"] == team:
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def irregular(issues):
+    """Copies of issues with values missing in every way a path walk can hit"""
+    first, second, third, fourth = (copy.deepcopy(issue) for issue in issues[:4])
+    del first["fields"]["assignee"]
+    first["fields"]["customfield_10045"] = []
+    second["fields"]["assignee"] = None
+    second["fields"]["priority"] = {}
+    third["fields"]["customfield_10045"] = None
+    del third["fields"]["watches"]
+    fourth["fields"]["duedate"] = None
+    fourth["fields"]["summary"] = ""
+    return [first, second, third, fourth]
+
+
+def all_issues(store):
+    return [json.loads(body) for body in store.issues_json(range(len(store)))]
+
+
+def test_extractor_columns_match_a_per_issue_build(store):
+    issues = all_issues(store)
+    issues = issues[:50] + irregular(issues) + issues[50:]
+    for field in helper_module.G_Fields:
+        extract, _ = helper_module.compileExtractor(field["Path"])
+        assert helper_module.G_Extractors[field["Field"]](issues) == [extract(issue) for issue in issues]
+    helper = make_helper("http://localhost:5000")
+    pd.testing.assert_frame_equal(helper.buildIssuesDFFromList(issues), row_by_row(issues))
+    assert (helper.buildIssuesDFFromList(issues)["Assignee"] == 'unknown').sum() == 2
+
+
+def test_other_teams_are_filtered_out(store):
+    issues = all_issues(store)
+    issues[3]["fields"]["customfield_10001"] = {"name": "Red"}
+    del issues[7]["fields"]["customfield_10001"]
+    frame = make_helper("http://localhost:5000").buildIssuesDFFromList(issues)
+    assert len(frame) == len(issues) - 2
+    pd.testing.assert_frame_equal(frame, row_by_row(issues))
+    assert make_helper("http://localhost:5000").buildIssuesDFFromList(issues[3:4]).empty
+
+
+def test_watchers_match_the_server(live_server, helper):
+    issues = helper.getIssuesCreatedAfterDF(START)
+    keys = issues["Key"].tolist()
+    assert requests.post(f"{live_server.base_url}/rest/api/2/issue/{keys[1]}/watchers", json="someone").ok
+    expected = [(key, watcher["displayName"]) for key in keys for watcher in live_server.issue_watchers(key)]
+    assert len(expected) > len(keys)
+    watchers = helper.getWatchersDF(issues)
+    assert list(zip(watchers["Issue key"], watchers["Watchers"])) == expected
+    assert "someone" in watchers[watchers["Issue key"] == keys[1]]["Watchers"].tolist()
+    pages = list(helper.iterWatchersDF([issues[:40], issues[40:]]))
+    pd.testing.assert_frame_equal(pd.concat(pages, ignore_index=True), watchers)
+    assert helper.getWatchersDF(pd.DataFrame()).empty
+
+
+def server_history(store, keys):
+    rows = []
+    for key in keys:
+        for history in store.changelog(key, 0, 1000)["histories"]:
+            for item in history["items"]:
+                if item["field"] == "status":
+                    rows.append((key, history["author"]["displayName"], history["created"], item["fromString"],
+                                 item["toString"]))
+    return rows
+
+
+def history_rows(frame):
+    return list(frame[helper_module.G_HistoryColumns].itertuples(index=False, name=None))
+
+
+@pytest.mark.parametrize("embedded", [100, 2])
+def test_history_matches_the_server(live_server, helper, monkeypatch, embedded):
+    # Search embeds at most this many histories per issue; the helper pages through the rest
+    monkeypatch.setattr(jira_mock_columnar, "CHANGELOG_PAGE_SIZE", embedded)
+    store = live_server.store
+    key = team_keys(store)[0]
+    transitions = requests.get(f"{live_server.base_url}/rest/api/2/issue/{key}/transitions").json()["transitions"]
+    for transition in transitions[:3]:
+        response = requests.post(f"{live_server.base_url}/rest/api/2/issue/{key}/transitions",
+                                 json={"transition": {"id": transition["id"]}})
+        assert response.status_code == 204
+    expected = server_history(store, team_keys(store))
+    assert len(expected) > len(team_keys(store))
+    history = helper.getAllIssueHistoryDF(START)
+    assert history_rows(history) == expected
+    assert len(history[history["Key"] == key]) == store.changelog(key)["total"]
+    pages = list(helper.iterAllIssueHistoryDF(START))
+    assert len(pages) > 1
+    assert history_rows(pd.concat(pages)) == expected
+
+
+def test_only_the_fields_read_are_requested(live_server, helper, monkeypatch):
+    requested = []
+    get = helper.getWithRetry
+
+    def record(url, params=None):
+        response = get(url, params)
+        requested.append((params, response.json()))
+        return response
+    monkeypatch.setattr(helper, "getWithRetry", record)
+    issues = helper.getIssuesCreatedAfterDF(START)
+
+    wanted = set(helper_module.G_FieldList.split(","))
+    assert wanted == {"project", "customfield_10001", "created", "creator", "reporter", "assignee", "status",
+                      "priority", "customfield_10078", "summary", "description", "customfield_10046",
+                      "customfield_10045", "duedate", "watches"}
+    assert requested and all(params["fields"] == helper_module.G_FieldList for params, _ in requested)
+    assert all(set(issue["fields"]) == wanted for _, page in requested for issue in page["issues"])
+    # The projection changes nothing in the result
+    store = live_server.store
+    full = [json.loads(body) for body in store.issues_json(store.search(f"project=MOCK and created>={START}"))]
+    pd.testing.assert_frame_equal(issues, helper.buildIssuesDFFromList(full))
+
+
+def read_parts(directory):
+    frame = pd.read_parquet(directory)
+    return frame.astype(object).where(frame.notna(), None)
+
+
+def test_parquet_export_matches_the_whole_frames(live_server, helper, tmp_path):
+    stale = tmp_path / "issues" / "part-00099.parquet"
+    stale.parent.mkdir()
+    stale.write_bytes(b"left by an earlier export")
+    rows = helper.exportToParquet(START, str(tmp_path))
+
+    issues = helper.getIssuesCreatedAfterDF(START)
+    watchers = helper.getWatchersDF(issues)
+    history = helper.getAllIssueHistoryDF(START)
+    assert rows == {"issues": len(issues), "watchers": len(watchers), "history": len(history)}
+    for table, frame in (("issues", issues), ("watchers", watchers), ("history", history)):
+        parts = sorted(path.name for path in (tmp_path / table).iterdir())
+        # One part per page (watchers of a page without any have none), none left half written
+        assert parts and all(name.startswith("part-") and name.endswith(".parquet") for name in parts)
+        assert len(parts) > 1
+        pd.testing.assert_frame_equal(read_parts(tmp_path / table), frame.astype(object))
+
+
+def test_record_batches_share_one_schema(helper):
+    frames = [pd.DataFrame({"Key": ["A-1"], "DueDate": ["2025-01-01"]}),
+              pd.DataFrame({"Key": ["A-2"], "DueDate": [None]})]
+    batches = list(helper.iterRecordBatches(frames))
+    assert batches[0].schema == batches[1].schema
+    assert batches[1].column(1).null_count == 1
+
+
+def test_sync_quotes_the_team_and_filters_each_page_once(live_server, monkeypatch, tmp_path):
+    team = 'Toasted "Snow" \\'
+    spec = json.dumps([{"key": "MOCK", "teams": {team: 2, "Red": 1}}])
+    monkeypatch.setattr(live_server, "store", partitioned_store(live_server.base_url, spec, 120))
+    helper = make_helper(live_server.base_url, Team=team, SyncPath=str(tmp_path))
+    pages = []
+    filter_team = BAJiraHelper.filterTeam
+
+    def record(self, issues):
+        pages.append(len(issues))
+        return filter_team(self, issues)
+    monkeypatch.setattr(BAJiraHelper, "filterTeam", record)
+
+    issues, watchers, history = helper.syncIncremental(START)
+    assert issues["Key"].tolist() == team_keys(live_server.store, team=team)
+    assert set(issues["Team"]) == {team}
+    # Every issue fetched went through filterTeam once
+    assert sum(pages) == len(issues)
+
+    # The second run only asks for issues updated since the mark, which the server still parses
+    again, _, _ = helper.syncIncremental(START)
+    assert sorted(again["Key"]) == sorted(issues["Key"])
+    assert json.loads((tmp_path / "state.json").read_text())["watermark"]
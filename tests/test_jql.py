@@ -0,0 +1,114 @@
+import re
+
+import pytest
+
+from jira_mock_jql import JQLError, Query, Clause, And, Or, Not, SortKey, parse_jql
+from jira_mock_store import IssueStore, CATEGORY_FIELDS, DATE_FIELDS, FIELD_ALIASES
+
+from conftest import BASE_URL
+
+
+def field_value(issue, field):
+    field = FIELD_ALIASES[field.lower()]
+    if field == "issuekey":
+        return issue["key"]
+    extract = CATEGORY_FIELDS[field][1] if field in CATEGORY_FIELDS else DATE_FIELDS[field][1]
+    return extract(issue)
+
+
+def matches(issue, node):
+    """Reference evaluation of a category or key clause tree against one issue"""
+    if isinstance(node, And):
+        return all(matches(issue, child) for child in node.children)
+    if isinstance(node, Or):
+        return any(matches(issue, child) for child in node.children)
+    if isinstance(node, Not):
+        return not matches(issue, node.child)
+    value = field_value(issue, node.field)
+    if node.op in ("is", "is not"):
+        return (value is None) == (node.op == "is")
+    found = value is not None and value.lower() in [v.lower() for v in node.values]
+    return found if node.op in ("=", "in") else value is not None and not found
+
+
+@pytest.mark.parametrize("jql, expected", [
+    ("", Query(None, [])),
+    ("status = Done", Query(Clause("status", "=", ["Done"]), [])),
+    ('project = MOCK AND cf[10001] = "Toasted Snow"',
+     Query(And([Clause("project", "=", ["MOCK"]), Clause("cf[10001]", "=", ["Toasted Snow"])]), [])),
+    ("status in (Done, 'In Progress') or not priority = High",
+     Query(Or([Clause("status", "in", ["Done", "In Progress"]), Not(Clause("priority", "=", ["High"]))]), [])),
+    ("assignee is not EMPTY and (site not in (\"Site A\") or due is null)",
+     Query(And([Clause("assignee", "is not", []),
+                Or([Clause("site", "not in", ["Site A"]), Clause("due", "is", [])])]), [])),
+    ("created >= -30d ORDER BY priority DESC, key",
+     Query(Clause("created", ">=", ["-30d"]), [SortKey("priority", True), SortKey("key", False)])),
+    ('summary ~ "a \\"quoted\\" word"', Query(Clause("summary", "~", ['a "quoted" word']), [])),
+])
+def test_parse(jql, expected):
+    assert parse_jql(jql) == expected
+
+
+@pytest.mark.parametrize("jql", [
+    "status =",
+    "status = Done and",
+    "(status = Done",
+    "status Done",
+    "status in Done",
+    "assignee is maybe",
+    "order status",
+    "status = Done )",
+])
+def test_parse_errors(jql):
+    with pytest.raises(JQLError):
+        parse_jql(jql)
+
+
+@pytest.mark.parametrize("jql", [
+    "status = Done",
+    "status != Done",
+    "status in ('To Do', Testing) and priority = high",
+    "not (status = Done or assignee = 'John Doe')",
+    "assignee is empty or site not in ('Site A', 'Site B')",
+    "team = 'Toasted Snow' and not category in (Bug, Task)",
+    "reporter = 'Nobody At All'",
+    "key = MOCK-7 or issuekey in (mock-12, MOCK-500, OTHER-1)",
+    "key not in (MOCK-1, MOCK-2) and status = Testing",
+])
+def test_search_matches_reference(store, jql):
+    issues = [store.issue_at(pos) for pos in range(len(store))]
+    expected = [pos for pos, issue in enumerate(issues) if matches(issue, parse_jql(jql).where)]
+    assert store.search(jql).tolist() == expected
+
+
+def test_columnar_and_dict_stores_agree(store, dataset):
+    issues, history, changelogs = dataset.to_issues(BASE_URL)
+    reference = IssueStore(issues, history, changelogs)
+    for jql in ["status = Done order by key desc", "order by priority, created desc",
+                "created >= '2024-12-01' and created < '2024-12-15'", "duedate is empty order by updated",
+                "key in (MOCK-3, MOCK-1, MOCK-2) order by key desc"]:
+        assert store.search(jql).tolist() == reference.search(jql).tolist(), jql
+
+
+def test_order_by_key(store):
+    assert store.search("key in (MOCK-10, MOCK-2, MOCK-33) order by key desc").tolist() == [32, 9, 1]
+    assert store.search("status = Done order by key").tolist() == store.search("status = Done").tolist()
+
+
+def test_key_clause_sees_created_issues(store):
+    issue = dict(store.issue_at(0), key=f"MOCK-{len(store) + 1}", id="99999")
+    (pos,) = store.add_issues([issue])
+    assert store.search(f"key = {issue['key']}").tolist() == [pos]
+    assert store.search("order by key desc")[0] == pos
+
+
+@pytest.mark.parametrize("jql, message", [
+    ("status = Doing", "The value 'Doing' does not exist for the field 'status'."),
+    ("flavour = sweet", "Field 'flavour' does not exist or you do not have permission to view it."),
+    ("status > Done", "The operator '>' is not supported by the 'status' field."),
+    ("key ~ MOCK", "The operator '~' is not supported by the 'key' field."),
+    ("created >= yesterday", "Date value 'yesterday' for JQL is invalid."),
+])
+def test_search_errors(store, jql, message):
+    with pytest.raises(JQLError, match=re.escape(message)):
+        store.search(jql)
@@ -0,0 +1,76 @@
+import re
+
+import pytest
+
+from jira_mock_metrics import AccessLog, Histogram, Metrics
+
+
+@pytest.fixture
+def metrics(app_module, monkeypatch):
+    metrics = Metrics()
+    metrics.gauge("dataset_issues", "Issues in the dataset", lambda: len(app_module.store))
+    monkeypatch.setattr(app_module, "metrics", metrics)
+    return metrics
+
+
+def scrape(client):
+    text = client.get("/metrics").get_data(as_text=True)
+    return {name: float(value) for name, value in re.findall(r"^(\S+) (\S+)$", text, re.M)}
+
+
+def test_counters_increase_with_requests(app_module, metrics, monkeypatch):
+    monkeypatch.setattr(app_module, "STREAM_MIN_RESULTS", 50)
+    client = app_module.app.test_client()
+    ok = 'jira_mock_requests_total{endpoint="get_issue",method="GET",status="200"}'
+    missing = 'jira_mock_requests_total{endpoint="get_issue",method="GET",status="404"}'
+    streamed = 'jira_mock_requests_total{endpoint="search_issues",method="GET",status="200"}'
+    assert ok not in scrape(client)
+    client.get("/rest/api/2/issue/MOCK-1")
+    client.get("/rest/api/2/issue/MOCK-2")
+    client.get("/rest/api/2/issue/MOCK-999")
+    first = scrape(client)
+    assert (first[ok], first[missing]) == (2, 1)
+    # A streamed search is recorded once its body is out, with the bytes sent
+    body = client.get("/rest/api/2/search?maxResults=100").get_data()
+    client.get("/rest/api/2/issue/MOCK-1")
+    second = scrape(client)
+    assert (second[ok], second[streamed]) == (3, 1)
+    sizes = 'jira_mock_response_size_bytes_sum{endpoint="search_issues",method="GET",status="200"}'
+    assert second[sizes] == len(body)
+    latency = 'jira_mock_request_duration_seconds_count{endpoint="get_issue",method="GET",status="200"}'
+    assert second[latency] == 3
+    assert second['jira_mock_request_duration_seconds_bucket{endpoint="get_issue",method="GET",status="200",'
+                  'le="+Inf"}'] == 3
+    assert second["jira_mock_dataset_issues"] == 100
+    # Scrapes are not counted themselves
+    assert not any("prometheus_metrics" in name for name in second)
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((1, 10, 100))
+    for value in (0.5, 1, 5, 50, 500):
+        histogram.observe(value)
+    lines = histogram.render("size", '{route="x"}')
+    assert lines[:4] == ['size_bucket{route="x",le="1"} 2', 'size_bucket{route="x",le="10"} 3',
+                         'size_bucket{route="x",le="100"} 4', 'size_bucket{route="x",le="+Inf"} 5']
+    assert lines[-2:] == ['size_sum{route="x"} 556.5', 'size_count{route="x"} 5']
+
+
+def test_access_log_is_off_by_default():
+    log = AccessLog(0, name="test.access.off")
+    assert log.listener is None
+    log.record("get_issue", "GET", {"issue_key": "MOCK-1"}, {}, 200, 0.001, 100)
+
+
+def test_access_log_records_a_sampled_share(monkeypatch, capsys):
+    log = AccessLog(0.5, name="test.access.sampled")
+    draws = iter([0.1, 0.9, 0.4, 0.6])
+    monkeypatch.setattr("jira_mock_metrics.random.random", lambda: next(draws))
+    for number in range(4):
+        log.record("get_issue", "GET", {"issue_key": f"MOCK-{number}"}, {}, 200, 0.0012, 100)
+    # Records are written by the listener thread; stopping it flushes the queue
+    log.listener.stop()
+    lines = capsys.readouterr().err.splitlines()
+    assert len(lines) == 2
+    assert "GET get_issue {'issue_key': 'MOCK-0'} {} -> 200 1.2ms 100B" in lines[0]
+    assert "MOCK-2" in lines[1]
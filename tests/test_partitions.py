@@ -0,0 +1,129 @@
+import json
+
+import pytest
+
+from jira_mock_columnar import ColumnarIssueStore
+from jira_mock_generator import generate_dataset
+from jira_mock_jql import JQLError, parse_jql
+from jira_mock_partitions import PartitionedIssueStore, load_projects
+from jira_mock_store import IssueStore
+
+from conftest import ANCHOR, BASE_URL, call
+
+SPEC = json.dumps([
+    {"key": "WEB", "name": "Web", "issues": 60, "teams": {"Red": 2, "Blue": 1}, "category": "Products"},
+    {"key": "OPS", "issues": 40, "distributions": {"status": ["Open", "Doing", "Closed"]}},
+    {"key": "APP", "name": "Apps", "issues": 30, "category": "Products"},
+])
+
+
+def generate(project):
+    return generate_dataset(project.issues, seed=project.seed, distributions=project.distributions,
+                            project=project.key, anchor=ANCHOR, first_id=project.first_id)
+
+
+def categories(project):
+    return {"status": project.values("status"), "priority": project.values("priority")}
+
+
+@pytest.fixture
+def projects():
+    return load_projects(SPEC, 100, 7)
+
+
+@pytest.fixture
+def partitioned(projects):
+    return PartitionedIssueStore(projects, [ColumnarIssueStore(generate(project), BASE_URL, categories(project))
+                                            for project in projects])
+
+
+@pytest.fixture
+def merged(projects):
+    """One store holding every project's issues, in partition order, to check merged searches against"""
+    issues, history, changelogs = [], {}, {}
+    for project in projects:
+        part = generate(project).to_issues(BASE_URL)
+        issues += part[0]
+        history.update(part[1])
+        changelogs.update(part[2])
+    return IssueStore(issues, history, changelogs, categories(projects[0]))
+
+
+def scope(store, jql):
+    return store.scope(store.resolve_projects(parse_jql(jql).where))
+
+
+@pytest.mark.parametrize("jql, expected", [
+    ("", {0, 1, 2}),
+    ("status = Done", {0, 1, 2}),
+    ("project = WEB", {0}),
+    ("project in (ops, Apps) and status = Open", {1, 2}),
+    ("project != WEB", {1, 2}),
+    ("project not in (WEB, 10002)", {1}),
+    ("project = WEB or project = APP", {0, 2}),
+    ("project = WEB or status = Done", {0, 1, 2}),
+    ("project = WEB and project = OPS", set()),
+    ("not project = WEB", {1, 2}),
+    ("not (project = WEB or project = OPS)", {2}),
+    ("not (project = WEB and status = Done)", {0, 1, 2}),
+    ("not not project = OPS", {1}),
+    ("project is empty", set()),
+    ("project is not empty", {0, 1, 2}),
+    ("key in (OPS-3, APP-1, NOPE-1)", {1, 2}),
+    ("key != OPS-3", {0, 1, 2}),
+])
+def test_scope(partitioned, jql, expected):
+    assert scope(partitioned, jql) == expected
+
+
+def test_unknown_projects_are_errors(partitioned):
+    with pytest.raises(JQLError, match="The value 'NOPE' does not exist for the field 'project'."):
+        partitioned.search("project = NOPE")
+
+
+@pytest.mark.parametrize("jql", [
+    "",
+    "project = Web order by created desc",
+    "project in (WEB, APP) and status in (\"In Progress\", Done) order by status, created desc",
+    "not project = OPS and team = Red",
+    "status = Doing",
+    "project = WEB and project = OPS",
+    "order by priority desc, status, updated",
+    "key in (OPS-3, APP-1, WEB-60) or (project = APP and assignee is empty)",
+    "order by project, team, created",
+])
+def test_search_matches_one_merged_store(partitioned, merged, jql):
+    assert [partitioned.key_at(pos) for pos in partitioned.search(jql)] == \
+        [merged.key_at(pos) for pos in merged.search(jql)]
+
+
+def split_key(key):
+    project, number = key.split("-")
+    return project, int(number)
+
+
+@pytest.mark.parametrize("jql, reverse", [("order by key", False), ("order by issuekey desc", True)])
+def test_keys_sort_by_project_then_number(partitioned, jql, reverse):
+    keys = [partitioned.key_at(pos) for pos in partitioned.search(jql)]
+    assert keys == sorted(keys, key=split_key, reverse=reverse)
+    assert keys[0] == ("WEB-60" if reverse else "APP-1")
+
+
+def test_ids_and_keys_stay_unique(partitioned):
+    bodies = [json.loads(body) for body in partitioned.issues_json(partitioned.search(""))]
+    assert len({body["id"] for body in bodies}) == len({body["key"] for body in bodies}) == len(partitioned)
+    assert partitioned.get("OPS-1")["id"] == str(10000 + 10 ** 8)
+
+
+def test_projects_endpoint_lists_names_and_categories(app_module, monkeypatch, projects, partitioned):
+    monkeypatch.setattr(app_module, "PROJECTS", projects)
+    monkeypatch.setattr(app_module, "store", partitioned)
+    listed = json.loads(call(app_module, "get_projects").body)
+    assert [(project["key"], project["name"], project["projectCategory"]["name"], project["projectCategory"]["id"])
+            for project in listed] == [("WEB", "Web", "Products", "10000"), ("OPS", "OPS", "OPS Category", "10001"),
+                                       ("APP", "Apps", "Products", "10000")]
+
+
+def test_default_project_keeps_its_category(app_module):
+    (listed,) = json.loads(call(app_module, "get_projects").body)
+    assert (listed["key"], listed["projectCategory"]["name"]) == ("MOCK", "MOCK Category")
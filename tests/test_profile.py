@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from jira_mock_profile import PROFILE_HEADER, Profiler
+
+
+@pytest.fixture
+def profiler(app_module, monkeypatch, tmp_path):
+    profiler = Profiler(str(tmp_path))
+    monkeypatch.setattr(app_module, "profiler", profiler)
+    return profiler
+
+
+def respond(app, args, headers=None):
+    req = app.MockRequest("GET", args, None, dict(headers or {}, **{PROFILE_HEADER: "1"}))
+    return app.respond("search_issues", req, {})[0]
+
+
+def profiled_requests(profiler):
+    return profiler.summary()["endpoints"]["search_issues"]["requests"]
+
+
+def test_a_failing_handler_ends_its_session(app_module, profiler):
+    with pytest.raises(ValueError):
+        respond(app_module, {"startAt": "abc"})
+    assert not profiler.busy.locked()
+    assert profiled_requests(profiler) == 1
+    assert "Server-Timing" in respond(app_module, {"maxResults": "5"}).headers
+    assert profiled_requests(profiler) == 2
+
+
+def test_a_streamed_body_closed_unread_ends_its_session(app_module, profiler, monkeypatch):
+    monkeypatch.setattr(app_module, "STREAM_MIN_RESULTS", 0)
+    response = respond(app_module, {"maxResults": "5"})
+    assert profiler.busy.locked()
+    response.body.close()
+    assert not profiler.busy.locked()
+    assert profiled_requests(profiler) == 1
+
+
+def test_a_streamed_body_ends_its_session_once(app_module, profiler, monkeypatch):
+    monkeypatch.setattr(app_module, "STREAM_MIN_RESULTS", 0)
+    response = respond(app_module, {"maxResults": "5"})
+    assert len(json.loads(b"".join(response.body))["issues"]) == 5
+    assert not profiler.busy.locked()
+    response.body.close()
+    assert profiled_requests(profiler) == 1
+
+
+def test_a_dropped_flask_response_ends_its_session(app_module, profiler, monkeypatch):
+    monkeypatch.setattr(app_module, "STREAM_MIN_RESULTS", 0)
+    client = app_module.app.test_client()
+    response = client.get("/rest/api/2/search?maxResults=5", headers={PROFILE_HEADER: "1"}, buffered=False)
+    response.close()
+    assert not profiler.busy.locked()
+    response = client.get("/rest/api/2/search?startAt=abc", headers={PROFILE_HEADER: "1"})
+    assert response.status_code == 500
+    assert not profiler.busy.locked()
+    assert profiled_requests(profiler) == 2
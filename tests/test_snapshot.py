@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from jira_mock_partitions import PartitionedIssueStore, load_projects
+from jira_mock_snapshot import SnapshotIssueStore, Snapshot, load_snapshot_store
+from jira_mock_store import IssueStore
+from jira_mock_writes import ReadOnlyStore
+
+from conftest import BASE_URL, call
+
+SETTINGS = {"count": 200, "seed": 7}
+
+
+@pytest.fixture
+def snapshot_store(tmp_path, dataset):
+    return load_snapshot_store(str(tmp_path / "snapshot"), SETTINGS, lambda: dataset, BASE_URL)
+
+
+def test_snapshot_serves_the_same_bytes(snapshot_store, store, dataset):
+    issues, history, changelogs = dataset.to_issues(BASE_URL)
+    reference = IssueStore(issues, history, changelogs)
+    positions = list(range(len(reference)))
+    for changelog in (False, True):
+        for fields in (None, ("status", "created"), ("summary",), ()):
+            expected = reference.issues_json(positions, changelog, fields)
+            assert snapshot_store.issues_json(positions, changelog, fields) == expected
+            assert store.issues_json(positions, changelog, fields) == expected
+    assert snapshot_store.field_names == reference.field_names
+    assert json.loads(snapshot_store.issue_json("MOCK-5")) == reference.get("MOCK-5")
+
+
+def test_snapshot_searches_and_pages_like_memory(snapshot_store, store):
+    for jql in ["", "status = Done order by created desc", "assignee is empty or priority in (High, Low)",
+                "key in (MOCK-4, MOCK-40) order by key desc", "not site = 'Site A' order by team, updated"]:
+        assert snapshot_store.search(jql).tolist() == store.search(jql).tolist(), jql
+    for key in ("MOCK-1", "MOCK-77", "MOCK-200"):
+        for start_at, max_results in ((0, 100), (1, 2), (3, 100)):
+            assert snapshot_store.changelog(key, start_at, max_results) == store.changelog(key, start_at, max_results)
+    assert snapshot_store.history_count() == store.history_count()
+
+
+def test_snapshot_is_reused_until_settings_change(tmp_path, dataset):
+    path = str(tmp_path / "snapshot")
+    builds = []
+
+    def build():
+        builds.append(1)
+        return dataset
+
+    for settings in (SETTINGS, SETTINGS, dict(SETTINGS, seed=8)):
+        load_snapshot_store(path, settings, build, BASE_URL)
+    assert len(builds) == 2
+    assert isinstance(SnapshotIssueStore(Snapshot(path), BASE_URL), SnapshotIssueStore)
+
+
+def test_snapshot_rejects_writes(snapshot_store):
+    issue = snapshot_store.issue_at(0)
+    for write in (lambda: snapshot_store.replace_issue(issue), lambda: snapshot_store.add_issues([issue]),
+                  lambda: snapshot_store.append_history("MOCK-1", []), lambda: snapshot_store.set_watchers("MOCK-1", [])):
+        with pytest.raises(ReadOnlyStore):
+            write()
+
+
+def test_write_endpoints_answer_405_on_a_snapshot(app_module, monkeypatch, snapshot_store):
+    project = load_projects(None, 200, 7)[0]
+    categories = {"status": project.values("status"), "priority": project.values("priority")}
+    partition = SnapshotIssueStore(snapshot_store.snapshot, BASE_URL, categories)
+    monkeypatch.setattr(app_module, "store", PartitionedIssueStore([project], [partition]))
+    writes = [
+        ("create_issue", "POST", {"fields": {"project": {"key": "MOCK"}, "summary": "New"}}, {}),
+        ("create_issues", "POST", {"issueUpdates": [{"fields": {"project": {"key": "MOCK"}, "summary": "New"}}]}, {}),
+        ("edit_issue", "PUT", {"fields": {"summary": "Changed"}}, {"issue_key": "MOCK-1"}),
+        ("issue_transitions", "POST", {"transition": {"name": "Done"}}, {"issue_key": "MOCK-2"}),
+        ("add_watcher", "POST", "someone", {"issue_key": "MOCK-1"}),
+    ]
+    for endpoint, method, data, view_args in writes:
+        assert call(app_module, endpoint, method, data, **view_args).status == 405, endpoint
+    assert call(app_module, "remove_watcher", "DELETE", args={"username": "someone"}, issue_key="MOCK-1").status == 405
+    assert call(app_module, "issue_transitions", issue_key="MOCK-2").status == 200
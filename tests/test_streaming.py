@@ -0,0 +1,56 @@
+import gzip
+import json
+
+import pytest
+
+from conftest import call
+
+
+def body_of(response):
+    return response.body if isinstance(response.body, bytes) else b"".join(response.body)
+
+
+@pytest.mark.parametrize("endpoint, args", [
+    ("search_issues", {"jql": "order by created desc", "maxResults": "80"}),
+    ("search_issues", {"jql": "status = Done", "maxResults": "1000", "expand": "changelog"}),
+    ("search_issues", {"startAt": "95", "fields": "summary,status"}),
+    ("search_issues", {"jql": "created < 2000-01-01"}),
+    ("search_issues_jql", {"maxResults": "1000", "fields": "*all"}),
+])
+def test_streamed_search_bodies_match_buffered_ones(app_module, monkeypatch, endpoint, args):
+    monkeypatch.setattr(app_module, "STREAM_MIN_RESULTS", 10 ** 6)
+    buffered = call(app_module, endpoint, args=args)
+    assert isinstance(buffered.body, bytes)
+    monkeypatch.setattr(app_module, "STREAM_MIN_RESULTS", 0)
+    # Small chunks, so a page spans many of them
+    monkeypatch.setattr(app_module, "STREAM_CHUNK_BYTES", 512)
+    monkeypatch.setattr(app_module, "ENCODE_BATCH", 3)
+    streamed = call(app_module, endpoint, args=args)
+    assert not isinstance(streamed.body, bytes)
+    assert body_of(streamed) == buffered.body
+    json.loads(buffered.body)
+    assert (streamed.status, streamed.issues, streamed.changelogs) == \
+        (buffered.status, buffered.issues, buffered.changelogs)
+
+
+def test_streamed_pages_go_out_in_chunks(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "STREAM_MIN_RESULTS", 0)
+    monkeypatch.setattr(app_module, "STREAM_CHUNK_BYTES", 4096)
+    monkeypatch.setattr(app_module, "ENCODE_BATCH", 4)
+    chunks = list(call(app_module, "search_issues", args={"maxResults": "100"}).body)
+    # Chunks close once they reach STREAM_CHUNK_BYTES, at the end of a batch of issues
+    assert len(chunks) > 5
+    assert all(len(chunk) < 4096 + 4 * 1024 for chunk in chunks)
+    assert len(json.loads(b"".join(chunks))["issues"]) == 100
+
+
+def test_streamed_responses_over_http(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "STREAM_MIN_RESULTS", 50)
+    client = app_module.app.test_client()
+    small = client.get("/rest/api/2/search?maxResults=49")
+    large = client.get("/rest/api/2/search?maxResults=100", headers={"Accept-Encoding": "gzip"})
+    assert small.headers.get("Content-Length")
+    assert "Content-Length" not in large.headers
+    assert large.headers["Content-Encoding"] == "gzip"
+    monkeypatch.setattr(app_module, "STREAM_MIN_RESULTS", 10 ** 6)
+    assert gzip.decompress(large.get_data()) == client.get("/rest/api/2/search?maxResults=100").get_data()
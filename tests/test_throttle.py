@@ -0,0 +1,127 @@
+import random
+
+import pytest
+
+from jira_mock_throttle import LatencyDistribution, TrafficProfile, load_profile
+
+from conftest import call
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def limited(clock, scope="client", rate=2, burst=3):
+    return TrafficProfile({"rateLimit": {"requestsPerSecond": rate, "burst": burst, "scope": scope}}, clock=clock)
+
+
+class Request:
+    def __init__(self, client=None):
+        self.headers = {"Authorization": client} if client else {}
+
+
+def test_requests_over_the_burst_get_429_headers():
+    clock = Clock()
+    profile = limited(clock)
+    admitted = [profile.admit(Request("a")) for _ in range(3)]
+    assert [allowed for allowed, _ in admitted] == [True] * 3
+    assert [headers["X-RateLimit-Remaining"] for _, headers in admitted] == ["2", "1", "0"]
+    allowed, headers = profile.admit(Request("a"))
+    assert not allowed
+    assert headers["Retry-After"] == "1" and headers["X-RateLimit-Limit"] == "3"
+    # Half a second later, at 2 requests a second, one token is back
+    clock.now += 0.5
+    assert profile.admit(Request("a"))[0]
+    assert not profile.admit(Request("a"))[0]
+
+
+def test_buckets_are_per_client_unless_global():
+    clock = Clock()
+    profile = limited(clock, burst=1)
+    assert profile.admit(Request("a"))[0] and profile.admit(Request("b"))[0] and profile.admit(Request())[0]
+    assert not profile.admit(Request("a"))[0]
+    shared = limited(clock, scope="global", burst=1)
+    assert shared.admit(Request("a"))[0]
+    assert not shared.admit(Request("b"))[0]
+
+
+def test_idle_buckets_are_dropped():
+    clock = Clock()
+    profile = limited(clock)
+    for client in range(1000):
+        profile.admit(Request(str(client)))
+        clock.now += 0.001
+    assert len(profile.buckets) == 1000
+    # burst / rate = 1.5 s after its last request a bucket is full again, the same as a new one
+    clock.now += 0.6005
+    profile.admit(Request("999"))
+    # Clients 0 to 100 were last seen at least 1.5 s ago
+    assert len(profile.buckets) == 899 and "100" not in profile.buckets and "101" in profile.buckets
+    clock.now += 2
+    profile.admit(Request("new"))
+    assert list(profile.buckets) == ["new"]
+
+
+def test_a_dropped_bucket_comes_back_full():
+    clock = Clock()
+    profile = limited(clock)
+    for _ in range(3):
+        profile.admit(Request("a"))
+    clock.now += 1.5
+    profile.admit(Request("b"))
+    assert "a" not in profile.buckets
+    assert [profile.admit(Request("a"))[0] for _ in range(4)] == [True, True, True, False]
+
+
+class FixedRandom:
+    def __init__(self, values):
+        self.values = list(values)
+
+    def random(self):
+        return self.values.pop(0)
+
+
+def test_latency_distributions():
+    rng = random.Random(1)
+    assert LatencyDistribution({"type": "fixed", "ms": 20}, rng).sample() == 0.02
+    normal = [LatencyDistribution({"type": "normal", "meanMs": 40, "stddevMs": 50}, rng).sample()
+              for _ in range(2000)]
+    assert min(normal) == 0.0 and 0.035 < sum(normal) / len(normal) < 0.06
+    quantiles = [0.0, 0.25, 0.5, 0.9, 0.95, 1.0]
+    table = LatencyDistribution({"type": "percentiles", "p50": 100, "p90": 300, "max": 1000},
+                                FixedRandom(quantiles))
+    # Linear between the configured percentiles
+    assert [table.sample() for _ in quantiles] == pytest.approx([0.0, 0.05, 0.1, 0.3, 0.65, 1.0])
+    with pytest.raises(ValueError):
+        LatencyDistribution({"type": "uniform"}, rng)
+
+
+def test_payload_dependent_delay(app_module):
+    profile = TrafficProfile({"routes": {
+        "default": {"latency": {"type": "fixed", "ms": 5}},
+        "search_issues": {"latency": {"type": "fixed", "ms": 10}, "perIssueMs": 2, "perChangelogMs": 3},
+        "get_fields": {"perKbMs": 1000}}})
+    response = app_module.MockResponse(200, b"x" * 512, {}, 4, 2)
+    assert profile.delay("search_issues", response) == pytest.approx(0.010 + 0.008 + 0.006)
+    assert profile.delay("get_issue", response) == pytest.approx(0.005)
+    assert profile.delay("get_fields", response) == pytest.approx(0.5)
+    assert load_profile(None).delay("search_issues", response) == 0.0
+    assert load_profile("cloud").rate == 10
+    with pytest.raises(ValueError):
+        load_profile("nowhere.json")
+
+
+def test_the_app_answers_over_the_limit_with_429(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "traffic", limited(Clock(), burst=1))
+    req = app_module.MockRequest("GET", {}, None, {"Authorization": "Basic a"})
+    assert app_module.respond("get_fields", req, {})[0].status == 200
+    response, delay = app_module.respond("get_fields", req, {})
+    assert (response.status, delay) == (429, 0.0)
+    assert response.headers["Retry-After"] == "1"
+    # Internal endpoints are never limited
+    assert app_module.respond("prometheus_metrics", req, {})[0].status == 200
+    assert call(app_module, "get_fields").status == 200
@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from jira_mock_writes import WriteError, apply_updates, new_issue
+from jira_mock_partitions import load_projects
+
+from conftest import call
+
+CATEGORIES = {"status": ["To Do", "Done"], "priority": ["High", "Medium", "Low"]}
+FIELDS = {"summary": "Old", "priority": {"name": "Medium"}, "customfield_10045": [{"value": "Site A"}]}
+
+
+def test_apply_updates_sets_fields_and_options():
+    body = {"fields": {"summary": "New", "priority": "high", "duedate": "2025-02-03"},
+            "update": {"customfield_10045": [{"add": {"value": "Site B"}}, {"remove": "Site A"}],
+                       "assignee": [{"set": {"name": "Jane Smith"}}]}}
+    fields = apply_updates(FIELDS, body, CATEGORIES)
+    assert fields == {"summary": "New", "priority": {"name": "High"}, "customfield_10045": [{"value": "Site B"}],
+                      "duedate": "2025-02-03T00:00:00.000000+0000", "assignee": {"displayName": "Jane Smith"}}
+    assert FIELDS["summary"] == "Old"
+
+
+def test_apply_updates_reports_every_error_and_applies_nothing():
+    body = {"fields": {"summary": " ", "priority": "Urgent", "duedate": "soon", "resolution": "Fixed",
+                       "issuetype": {"name": "Bug"}},
+            "update": {"customfield_10046": [{"add": "Design"}], "customfield_10045": [{"add": 5}]}}
+    with pytest.raises(WriteError) as raised:
+        apply_updates(FIELDS, body, CATEGORIES)
+    assert sorted(raised.value.errors) == ["customfield_10045", "customfield_10046", "duedate", "priority",
+                                           "resolution", "summary"]
+    assert raised.value.body() == {"errorMessages": [], "errors": raised.value.errors}
+
+
+@pytest.mark.parametrize("body", [None, "", [], "text"])
+def test_apply_updates_needs_an_object(body):
+    with pytest.raises(WriteError, match="The request body must be a JSON object."):
+        apply_updates(FIELDS, body, CATEGORIES)
+
+
+def test_new_issue_checks_project_and_summary():
+    project = load_projects(None, 10, 1)[0]
+    args = (11, project, "http://localhost:5000", "Test User", "2025-01-01T00:00:00.000000+0000", CATEGORIES)
+    issue = new_issue(args[0], {"fields": {"project": {"key": "MOCK"}, "summary": "Hi"}}, *args[1:])
+    assert (issue["key"], issue["id"], issue["fields"]["status"]) == ("MOCK-11", "10010", {"name": "To Do"})
+    with pytest.raises(WriteError) as raised:
+        new_issue(args[0], {"fields": {"project": "OTHER", "summary": "Hi"}}, *args[1:])
+    assert raised.value.errors == {"project": "valid project is required"}
+    with pytest.raises(WriteError) as raised:
+        new_issue(args[0], {"fields": {"project": "MOCK"}}, *args[1:])
+    assert raised.value.errors == {"summary": "You must specify a summary of the issue."}
+
+
+@pytest.mark.parametrize("data", [None, {}, {"transition": {"id": "21"}}, ["fields"], {"fields": {}},
+                                  {"fields": None, "update": {}}])
+def test_edit_without_changes_is_rejected(app_module, data):
+    store = app_module.store
+    generation, issue = store.generation, store.get("MOCK-5")
+    response = call(app_module, "edit_issue", "PUT", data, issue_key="MOCK-5")
+    assert response.status == 400
+    assert json.loads(response.body)["errorMessages"]
+    assert (store.generation, store.get("MOCK-5")) == (generation, issue)
+
+
+def test_edit_stamps_and_reindexes(app_module):
+    store = app_module.store
+    response = call(app_module, "edit_issue", "PUT", {"fields": {"priority": {"name": "Low"}}}, issue_key="MOCK-5")
+    assert response.status == 204
+    assert store.get("MOCK-5")["fields"]["priority"] == {"name": "Low"}
+    assert store.position("MOCK-5") in store.search("priority = Low").tolist()
+
+
+def test_transition_publishes_status_and_changelog_together(app_module, monkeypatch):
+    store = app_module.store
+    partition = store.partitions[0]
+    key = "MOCK-6"
+    before = store.changelog(key)["total"]
+    current = store.get(key)["fields"]["status"]["name"]
+    target = next(status for status in partition.categories["status"] if status != current)
+    published = []
+    invalidate = partition.invalidate
+
+    def record(changed):
+        # Whenever the issue moves to a new revision its status and changelog already agree
+        published.append((store.get(changed)["fields"]["status"]["name"],
+                          store.changelog(changed)["histories"][-1]["items"][0]["toString"]))
+        invalidate(changed)
+    monkeypatch.setattr(partition, "invalidate", record)
+
+    response = call(app_module, "issue_transitions", "POST", {"transition": {"name": target}}, issue_key=key)
+    assert response.status == 204
+    assert published == [(target, target)]
+    assert store.changelog(key)["total"] == before + 1
+    assert store.revision(store.position(key)) == 1
+    # The changelog entry and the updated stamp are the same instant
+    assert store.changelog(key)["histories"][-1]["created"] == store.get(key)["fields"]["updated"]
+
+
+def test_watcher_changes_stamp_updated(app_module):
+    store = app_module.store
+    before = store.get("MOCK-3")["fields"]["updated"]
+    assert call(app_module, "add_watcher", "POST", "someone", issue_key="MOCK-3").status == 204
+    updated = store.get("MOCK-3")["fields"]["updated"]
+    assert updated > before
+    # An incremental sync asking for issues updated since the change finds the issue
+    mark = updated[:10].replace("-", "/") + " " + updated[11:16]
+    assert "MOCK-3" in [store.key_at(pos) for pos in store.search(f'updated >= "{mark}"')]
+    assert [watcher["name"] for watcher in store.watchers("MOCK-3")][-1] == "someone"
+
+    assert call(app_module, "remove_watcher", "DELETE", args={"username": "someone"}, issue_key="MOCK-3").status == 204
+    assert store.get("MOCK-3")["fields"]["updated"] >= updated
+    assert "someone" not in [watcher["name"] for watcher in store.watchers("MOCK-3")]